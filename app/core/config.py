@@ -17,8 +17,19 @@ class Settings:
     # Mercado
     MARKET_INTERVALS: List[int] = [5, 15, 60]  # minutos
     MARKET_API_TIMEOUT: int = 10  # segundos
+    # TTL do cache de candles em memória (segundos): intraday x diário
+    MARKET_CACHE_TTL: int = int(os.getenv("MARKET_CACHE_TTL", "30"))
+    MARKET_CACHE_TTL_DAILY: int = int(os.getenv("MARKET_CACHE_TTL_DAILY", "600"))
     PREFERRED_MARKET: str = "binance"  # binance ou polygon
 
+    # Nível do logger do scheduler (DEBUG inclui o "Loop tick" de cada volta)
+    SCHEDULER_LOG_LEVEL: str = os.getenv("SCHEDULER_LOG_LEVEL", "INFO")
+
+    # CORS — origens exatas extras (ex.: previews do Railway), separadas por vírgula
+    CORS_EXTRA_ORIGINS: List[str] = [
+        o.strip().rstrip("/") for o in os.getenv("CORS_EXTRA_ORIGINS", "").split(",") if o.strip()
+    ]
+
     # Bot - Configurações de trading
     INITIAL_CAPITAL: float = float(os.getenv("INITIAL_CAPITAL", "2770"))
     MAX_POSITION_PERCENTAGE: float = 0.30  # máximo 30% por ativo
@@ -93,6 +104,9 @@ class Settings:
     CRYPTO_CYCLE_MINUTES: int = int(os.getenv("CRYPTO_CYCLE_MINUTES", "10"))
     B3_CYCLE_MINUTES: int = int(os.getenv("B3_CYCLE_MINUTES", "10"))  # era 30, reduzido para capturar movimentos intraday
 
+    # Ciclos de performance mantidos em memória (histórico completo fica no log de ciclos)
+    MAX_IN_MEMORY_CYCLES: int = int(os.getenv("MAX_IN_MEMORY_CYCLES", "500"))
+
     # Banco de Dados
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./data/daytrade.db")
 
@@ -5,17 +5,54 @@ Estratégia:
   - Se DATABASE_URL começa com "postgres", usa PostgreSQL via psycopg2
   - Caso contrário, salva em JSON local (data/<key>.json)
 
-Tabela criada automaticamente:
+Tabelas criadas automaticamente:
   bot_kv (key TEXT PRIMARY KEY, value TEXT)
+  bot_cycles (id BIGSERIAL PRIMARY KEY, value TEXT) — log append-only de ciclos
 """
 
 import json
 import os
 import logging
+import tempfile
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from itertools import islice
 from pathlib import Path
 
 log = logging.getLogger("db_state")
 
+# orjson é opcional — serializa ~5x mais rápido que json stdlib
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+
+def _default(obj):
+    """Buffers limitados (deque) e sets viram lista; o resto, str."""
+    if isinstance(obj, (deque, set, frozenset)):
+        return list(obj)
+    return str(obj)
+
+
+def dumps_compact(obj) -> str:
+    """Serializa estado em JSON compacto (sem indent) — caminho quente de persistência."""
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+        except TypeError:
+            pass
+    return json.dumps(obj, separators=(",", ":"), default=_default)
+
+
+def loads(data):
+    """Desserializa JSON (str ou bytes) com orjson quando disponível."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
 _DEFAULT_DATA_DIR = Path(__file__).parent.parent / "data"
 _STATE_DIR_ENV = os.getenv("STATE_DIR") or os.getenv("RENDER_DISK_PATH")
 if _STATE_DIR_ENV:
@@ -92,6 +129,14 @@ def load_state(key: str, default: dict) -> dict:
 
 def save_state(key: str, obj: dict):
     """Salva estado no PostgreSQL e também no JSON local (backup)."""
+    save_state_text(key, dumps_compact(obj))
+
+
+def save_state_text(key: str, text: str):
+    """
+    Mesmo destino de save_state com o estado já serializado — permite serializar
+    no event loop (snapshot consistente) e fazer o I/O numa thread.
+    """
     if _USE_PG:
         try:
             _ensure_table()
@@ -102,21 +147,180 @@ def save_state(key: str, obj: dict):
                         INSERT INTO bot_kv (key, value)
                         VALUES (%s, %s)
                         ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value
-                    """, (key, json.dumps(obj, default=str)))
+                    """, (key, text))
             conn.close()
         except Exception as e:
             log.error(f"db_state save_state({key}) PG error: {e} — falling back to JSON")
 
-    # Sempre salva JSON local como backup
+    # Sempre salva JSON local como backup (tmp único + os.replace: nunca fica pela
+    # metade, nem quando duas escritas da mesma chave se sobrepõem)
     try:
         _DATA_DIR.mkdir(parents=True, exist_ok=True)
     except OSError:
         pass  # Permission denied on Railway (non-root user)
     try:
-        path = _DATA_DIR / f"{key}.json"
-        path.write_text(json.dumps(obj, indent=2, default=str), encoding="utf-8")
+        fd, tmp = tempfile.mkstemp(dir=_DATA_DIR, prefix=f"{key}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp, _DATA_DIR / f"{key}.json")
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    except Exception:
+        pass
+
+
+# ─── Log append-only de ciclos ─────────────────────────────────────────────────
+# Os ciclos de performance não vão mais dentro do blob "performance" (que era
+# reescrito inteiro a cada save): cada ciclo é anexado uma vez aqui e o boot
+# lê só a cauda. PG: tabela bot_cycles; JSON: data/cycles.jsonl.
+_cycles_table_ready = False
+
+
+def _ensure_cycles_table():
+    global _cycles_table_ready
+    if _cycles_table_ready:
+        return
+    try:
+        conn = _pg_conn()
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS bot_cycles (
+                        id    BIGSERIAL PRIMARY KEY,
+                        value TEXT NOT NULL
+                    )
+                """)
+        conn.close()
+        _cycles_table_ready = True
+        log.info("bot_cycles table ready")
+    except Exception as e:
+        log.error(f"db_state _ensure_cycles_table error: {e}")
+
+
+# ── Formato dos registros (compartilhado por app/main.py e run_cycle.py) ─────
+BRT = timezone(timedelta(hours=-3))
+TRADE_LOG_MAX = 200
+# cycles.jsonl é compactado para os últimos CYCLES_LOG_KEEP ciclos quando passa
+# de _CYCLES_LOG_MAX_BYTES (o job do GitHub Actions commita data/ a cada ciclo)
+CYCLES_LOG_KEEP = 5000
+_CYCLES_LOG_MAX_BYTES = 8 * 1024 * 1024
+
+
+def new_cycle(now: datetime = None, **fields) -> dict:
+    """Registro de ciclo do log: timestamp BRT, dia ordinal (chave do bisect) e epoch + campos."""
+    now = now or datetime.now(BRT)
+    return {"timestamp": now.isoformat(), "day": now.toordinal(), "ts": int(now.timestamp()), **fields}
+
+
+def trade_log_buffer(log=None) -> deque:
+    """Log de eventos (mais recente à esquerda) como deque limitado a TRADE_LOG_MAX."""
+    return deque(islice(log or (), TRADE_LOG_MAX), maxlen=TRADE_LOG_MAX)
+
+
+def equity_buffer(equity=None, keep: int = 500) -> deque:
+    """Equity curve (mais recente à direita) como deque com os últimos `keep` pontos."""
+    return deque(equity or (), maxlen=keep)
+
+
+def compact_cycles(keep: int = CYCLES_LOG_KEEP):
+    """Regrava cycles.jsonl só com os últimos `keep` ciclos (tmp único + os.replace)."""
+    path = _DATA_DIR / "cycles.jsonl"
+    try:
+        with open(path, encoding="utf-8") as f:
+            tail = deque((l for l in f if l.strip()), maxlen=keep)
+        fd, tmp = tempfile.mkstemp(dir=_DATA_DIR, prefix="cycles.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.writelines(tail)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    except Exception as e:
+        log.error(f"db_state compact_cycles error: {e}")
+
+
+def append_cycles(cycles: list):
+    """Anexa ciclos ao log (PG + JSONL local de backup)."""
+    if not cycles:
+        return
+    lines = [dumps_compact(c) for c in cycles]
+    if _USE_PG:
+        try:
+            _ensure_cycles_table()
+            conn = _pg_conn()
+            with conn:
+                with conn.cursor() as cur:
+                    cur.executemany("INSERT INTO bot_cycles (value) VALUES (%s)", [(l,) for l in lines])
+            conn.close()
+        except Exception as e:
+            log.error(f"db_state append_cycles PG error: {e} — falling back to JSON")
+    try:
+        _DATA_DIR.mkdir(parents=True, exist_ok=True)
+    except OSError:
+        pass
+    path = _DATA_DIR / "cycles.jsonl"
+    try:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        if path.stat().st_size > _CYCLES_LOG_MAX_BYTES:
+            compact_cycles()
+    except Exception:
+        pass
+
+
+def append_cycle(cycle: dict):
+    append_cycles([cycle])
+
+
+def load_cycles(limit: int) -> list:
+    """Retorna os últimos `limit` ciclos do log, em ordem cronológica."""
+    if _USE_PG:
+        try:
+            _ensure_cycles_table()
+            conn = _pg_conn()
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT value FROM (
+                        SELECT id, value FROM bot_cycles ORDER BY id DESC LIMIT %s
+                    ) t ORDER BY id
+                """, (limit,))
+                rows = cur.fetchall()
+            conn.close()
+            if rows:
+                return [loads(r[0]) for r in rows]
+        except Exception as e:
+            log.error(f"db_state load_cycles PG error: {e} — falling back to JSON")
+    path = _DATA_DIR / "cycles.jsonl"
+    try:
+        if path.exists():
+            with open(path, encoding="utf-8") as f:
+                tail = deque((l for l in f if l.strip()), maxlen=limit)
+            return [loads(l) for l in tail]
+    except Exception:
+        pass
+    return []
+
+
+def reset_cycles(cycles: list = None):
+    """Apaga o log de ciclos (reset/restore) e regrava `cycles`, se informado."""
+    if _USE_PG:
+        try:
+            _ensure_cycles_table()
+            conn = _pg_conn()
+            with conn:
+                with conn.cursor() as cur:
+                    cur.execute("TRUNCATE bot_cycles")
+            conn.close()
+        except Exception as e:
+            log.error(f"db_state reset_cycles PG error: {e}")
+    try:
+        (_DATA_DIR / "cycles.jsonl").unlink(missing_ok=True)
     except Exception:
         pass
+    append_cycles(cycles or [])
 
 
 def is_using_postgres() -> bool:
@@ -17,6 +17,7 @@ Só considera entrada válida quando:
   - Score total >= BO_THRESHOLD (0.60)
 """
 
+import heapq
 from typing import Dict, List
 
 
@@ -222,9 +223,5 @@ class BreakoutAnalyzer:
                 results[asset] = result
 
         # Ordenar por score e limitar a top_n
-        sorted_results = sorted(
-            results.items(),
-            key=lambda x: x[1]["breakout_score"],
-            reverse=True
-        )
-        return dict(sorted_results[:top_n])
+        top = heapq.nlargest(top_n, results.items(), key=lambda x: x[1]["breakout_score"])
+        return dict(top)
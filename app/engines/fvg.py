@@ -33,6 +33,7 @@ Aproximação com close-only:
 Score final 0-1; entry_valid quando score >= 0.60
 """
 
+import heapq
 from typing import Dict, List
 import math
 
@@ -277,9 +278,5 @@ class FVGAnalyzer:
             if result["entry_valid"]:
                 results[asset] = result
 
-        sorted_results = sorted(
-            results.items(),
-            key=lambda x: x[1]["fvg_score"],
-            reverse=True,
-        )
-        return dict(sorted_results[:top_n])
+        top = heapq.nlargest(top_n, results.items(), key=lambda x: x[1]["fvg_score"])
+        return dict(top)
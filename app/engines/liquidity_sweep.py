@@ -25,6 +25,7 @@ Edge estrutural: muito forte em cripto e forex onde stops são concentrados em n
 Score 0-1; entry_valid quando score >= 0.60
 """
 
+import heapq
 from typing import Dict, List
 
 
@@ -231,9 +232,5 @@ class LiquiditySweepAnalyzer:
             if result["entry_valid"]:
                 results[asset] = result
 
-        sorted_results = sorted(
-            results.items(),
-            key=lambda x: x[1]["sweep_score"],
-            reverse=True
-        )
-        return dict(sorted_results[:top_n])
+        top = heapq.nlargest(top_n, results.items(), key=lambda x: x[1]["sweep_score"])
+        return dict(top)
@@ -21,6 +21,7 @@ Indicadores:
   6. BB Width — detecção de squeeze/expansão
 """
 
+import heapq
 from typing import Dict, List
 
 
@@ -286,6 +287,6 @@ class MeanReversionAnalyzer:
             if result["entry_valid"]:
                 results[asset] = result
 
-        # Ordenar por score e limitar a top_n
-        sorted_results = sorted(results.items(), key=lambda x: x[1]["mr_score"], reverse=True)
-        return dict(sorted_results[:top_n])
+        # Top-N por score — seleção parcial O(N log n), sem ordenar todos os candidatos
+        top = heapq.nlargest(top_n, results.items(), key=lambda x: x[1]["mr_score"])
+        return dict(top)
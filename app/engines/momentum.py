@@ -12,6 +12,8 @@ Indicadores:
 
 from typing import Dict, List
 
+from app.indicators_nb import as_close_array, ema_nb, wilder_rsi_nb
+
 # ── Clusters de correlação ───────────────────────────────────────────────────
 # Ativos dentro do mesmo cluster têm correlação histórica > 0.80.
 # Regra: no máximo 1 sinal de entrada por cluster por ciclo.
@@ -59,27 +61,18 @@ _ASSET_TO_CLUSTER: Dict[str, str] = {
 
 
 def _ema(prices: List[float], period: int) -> float:
-    if not prices:
+    if not len(prices):
         return 0.0
     if len(prices) < period:
         return sum(prices) / len(prices)
-    k = 2.0 / (period + 1)
-    ema = sum(prices[:period]) / period
-    for p in prices[period:]:
-        ema = p * k + ema * (1 - k)
-    return ema
+    return float(ema_nb(prices, period))
 
 
 def _rsi(prices: List[float], period: int = 14) -> float:
     if len(prices) < period + 1:
         return 50.0
-    deltas = [prices[i] - prices[i - 1] for i in range(1, len(prices))]
-    warm = deltas[-period * 2:] if len(deltas) >= period * 2 else deltas
-    avg_gain = sum(d for d in warm[:period] if d > 0) / period
-    avg_loss = sum(-d for d in warm[:period] if d < 0) / period
-    for d in warm[period:]:
-        avg_gain = (avg_gain * (period - 1) + max(0, d)) / period
-        avg_loss = (avg_loss * (period - 1) + max(0, -d)) / period
+    # Aquecimento de Wilder só nos últimos 2×period deltas (2×period+1 closes)
+    avg_gain, avg_loss = wilder_rsi_nb(prices[-(period * 2 + 1):], period)
     if avg_loss == 0:
         return 100.0
     return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
@@ -133,6 +126,8 @@ class MomentumAnalyzer:
             }
 
         price = prices[-1]
+        # Closes como float64[:] uma vez para os kernels de RSI/EMA (lista sem numba)
+        closes = as_close_array(prices)
 
         # 1. ROC multi-periodo
         roc3  = _roc(prices, 3)
@@ -146,12 +141,12 @@ class MomentumAnalyzer:
         return_pct = roc5
 
         # 2. RSI-trend (>50 bullish, <50 bearish)
-        rsi = _rsi(prices, min(14, len(prices) - 2))
+        rsi = _rsi(closes, min(14, len(prices) - 2))
         rsi_score = _clamp((rsi - 50) / 30)
 
         # 3. EMA5 slope
-        ema5_now  = _ema(prices, min(5, len(prices)))
-        ema5_prev = _ema(prices[:-3], min(5, len(prices) - 3)) if len(prices) > 8 else ema5_now
+        ema5_now  = _ema(closes, min(5, len(prices)))
+        ema5_prev = _ema(closes[:-3], min(5, len(prices) - 3)) if len(prices) > 8 else ema5_now
         slope = (ema5_now - ema5_prev) / ema5_prev if ema5_prev > 0 else 0.0
         trend_score = _clamp(slope / 0.005)
 
@@ -224,7 +219,7 @@ class MomentumAnalyzer:
             "valid":           True,
             "current_price":   float(price),
             "ma_short":        float(ema5_now),
-            "ma_long":         float(_ema(prices, min(21, len(prices)))),
+            "ma_long":         float(_ema(closes, min(21, len(prices)))),
             "rsi":             float(rsi),
             "atr":             float(atr),
             "atr_pct":         float(atr_pct),
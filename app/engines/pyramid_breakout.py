@@ -38,6 +38,7 @@ Perfil esperado:
   Win rate: 30-40%  |  R/R: 4:1 a 8:1  |  PF: 1.8-2.5  |  DD: 10-18%
 """
 
+import heapq
 from typing import Dict, List
 import math
 
@@ -363,9 +364,5 @@ class PyramidBreakoutAnalyzer:
             if result["entry_valid"]:
                 results[asset] = result
 
-        sorted_results = sorted(
-            results.items(),
-            key=lambda x: x[1]["pb_score"],
-            reverse=True
-        )
-        return dict(sorted_results[:top_n])
+        top = heapq.nlargest(top_n, results.items(), key=lambda x: x[1]["pb_score"])
+        return dict(top)
@@ -11,6 +11,38 @@ Melhorias:
 import math
 from typing import Dict, List
 from app.core.config import settings
+from app.indicators_nb import as_close_array, ema_nb, volatility_nb, wilder_rsi_nb
+
+
+# ── Níveis de proteção por IRQ ──────────────────────────────────────────────
+# Limiares e reduções vêm do settings (fixos em runtime): a tabela é montada uma
+# vez no import e get_protection_level só compara e copia o dict do nível.
+_PROTECTION_LEVELS = (
+    (settings.IRQ_THRESHOLD_CRITICAL, {
+        "level": "CRÍTICO",
+        "reduction_percentage": 1.0,  # 100% - sair totalmente
+        "allow_new_positions": False,
+        "color": "🔴",
+    }),
+    (settings.IRQ_THRESHOLD_VERY_HIGH, {
+        "level": "MUITO_ALTO",
+        "reduction_percentage": settings.IRQ_REDUCTION_HIGH,
+        "allow_new_positions": False,
+        "color": "🟠",
+    }),
+    (settings.IRQ_THRESHOLD_HIGH, {
+        "level": "ALTO",
+        "reduction_percentage": settings.IRQ_REDUCTION_MODERATE,
+        "allow_new_positions": True,
+        "color": "🟡",
+    }),
+)
+_PROTECTION_NORMAL = {
+    "level": "NORMAL",
+    "reduction_percentage": 0.0,
+    "allow_new_positions": True,
+    "color": "🟢",
+}
 
 
 class RiskAnalyzer:
@@ -20,12 +52,7 @@ class RiskAnalyzer:
     def calculate_rsi(prices: List[float], period: int = 14) -> float:
         if len(prices) < period + 1:
             return 50.0
-        deltas = [prices[i] - prices[i - 1] for i in range(1, len(prices))]
-        avg_gain = sum(max(0, d) for d in deltas[:period]) / period
-        avg_loss = sum(max(0, -d) for d in deltas[:period]) / period
-        for d in deltas[period:]:
-            avg_gain = (avg_gain * (period - 1) + max(0, d))  / period
-            avg_loss = (avg_loss * (period - 1) + max(0, -d)) / period
+        avg_gain, avg_loss = wilder_rsi_nb(as_close_array(prices), period)
         if avg_loss == 0:
             return 100.0
         return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
@@ -62,17 +89,10 @@ class RiskAnalyzer:
     def calculate_volatility(prices: List[float], period: int = 20) -> float:
         if len(prices) < period:
             return 0.0
-        recent = prices[-period:]
-        returns = [
-            (recent[i] - recent[i - 1]) / recent[i - 1]
-            for i in range(1, len(recent))
-            if recent[i - 1] != 0
-        ]
-        if not returns:
+        std = volatility_nb(as_close_array(prices), period)
+        if std < 0:
             return 0.0
-        mean = sum(returns) / len(returns)
-        variance = sum((r - mean) ** 2 for r in returns) / len(returns)
-        return min(1.0, (variance ** 0.5) / 0.05)
+        return min(1.0, std / 0.05)
 
     @staticmethod
     def dynamic_stop_loss(prices: List[float], atr_multiple: float = 2.0) -> float:
@@ -119,15 +139,10 @@ class RiskAnalyzer:
                 "valid": False,
             }
 
-        # EMA curta vs longa
-        k_fast = 2.0 / (period_short + 1)
-        k_slow = 2.0 / (period_long + 1)
-        ema_fast = sum(prices[:period_short]) / period_short
-        ema_slow = sum(prices[:period_long]) / period_long
-        for p in prices[period_short:]:
-            ema_fast = p * k_fast + ema_fast * (1 - k_fast)
-        for p in prices[period_long:]:
-            ema_slow = p * k_slow + ema_slow * (1 - k_slow)
+        # EMA curta vs longa (closes convertidos uma vez para os kernels)
+        closes = as_close_array(prices)
+        ema_fast = ema_nb(closes, period_short)
+        ema_slow = ema_nb(closes, period_long)
 
         # S1: EMA lenta > EMA rápida = tendência negativa
         s1 = max(0.0, (ema_slow - ema_fast) / ema_slow) if ema_slow > 0 else 0.0
@@ -140,10 +155,10 @@ class RiskAnalyzer:
         s2 = min(1.0, max(0.0, abs(recent_return) * vol_ratio * 10)) if recent_return < 0 else 0.0
 
         # S3: Volatilidade
-        s3 = RiskAnalyzer.calculate_volatility(prices, period_long)
+        s3 = RiskAnalyzer.calculate_volatility(closes, period_long)
 
         # S4: RSI divergência
-        rsi = RiskAnalyzer.calculate_rsi(prices)
+        rsi = RiskAnalyzer.calculate_rsi(closes)
         s4 = max(0.0, (40.0 - rsi) / 40.0) if rsi < 40 else 0.0  # só ativa abaixo de 40
 
         # S5: Sequência de quedas
@@ -212,31 +227,7 @@ class RiskAnalyzer:
         Returns:
             Dict com nível de proteção e redução recomendada
         """
-        if irq_score >= settings.IRQ_THRESHOLD_CRITICAL:
-            return {
-                "level": "CRÍTICO",
-                "reduction_percentage": 1.0,  # 100% - sair totalmente
-                "allow_new_positions": False,
-                "color": "🔴",
-            }
-        elif irq_score >= settings.IRQ_THRESHOLD_VERY_HIGH:
-            return {
-                "level": "MUITO_ALTO",
-                "reduction_percentage": settings.IRQ_REDUCTION_HIGH,
-                "allow_new_positions": False,
-                "color": "🟠",
-            }
-        elif irq_score >= settings.IRQ_THRESHOLD_HIGH:
-            return {
-                "level": "ALTO",
-                "reduction_percentage": settings.IRQ_REDUCTION_MODERATE,
-                "allow_new_positions": True,
-                "color": "🟡",
-            }
-        else:
-            return {
-                "level": "NORMAL",
-                "reduction_percentage": 0.0,
-                "allow_new_positions": True,
-                "color": "🟢",
-            }
+        for threshold, protection in _PROTECTION_LEVELS:
+            if irq_score >= threshold:
+                return dict(protection)
+        return dict(_PROTECTION_NORMAL)
@@ -18,6 +18,7 @@ Correlação baixa com Momentum e MR = diversificação real de edge.
 Threshold: score >= 0.58 para entry_valid = True
 """
 
+import heapq
 from typing import Dict, List
 
 
@@ -315,9 +316,5 @@ class SqueezeAnalyzer:
             if result["entry_valid"]:
                 results[asset] = result
 
-        sorted_results = sorted(
-            results.items(),
-            key=lambda x: x[1]["squeeze_score"],
-            reverse=True
-        )
-        return dict(sorted_results[:top_n])
+        top = heapq.nlargest(top_n, results.items(), key=lambda x: x[1]["squeeze_score"])
+        return dict(top)
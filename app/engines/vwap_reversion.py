@@ -26,6 +26,7 @@ Perfil esperado:
   Win rate: 55-65%  |  R/R: 1.2-1.8  |  Trades/dia: 5-15
 """
 
+import heapq
 from typing import Dict, List
 import math
 
@@ -316,9 +317,5 @@ class VWAPReversionAnalyzer:
             if result["entry_valid"]:
                 results[asset] = result
 
-        sorted_results = sorted(
-            results.items(),
-            key=lambda x: x[1]["vr_score"],
-            reverse=True
-        )
-        return dict(sorted_results[:top_n])
+        top = heapq.nlargest(top_n, results.items(), key=lambda x: x[1]["vr_score"])
+        return dict(top)
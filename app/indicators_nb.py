@@ -0,0 +1,238 @@
+"""
+indicators_nb.py — Kernels numéricos dos indicadores (RSI, EMA, MACD, ATR, Bollinger, volatilidade)
+
+Compilados com numba (@njit, cache em disco, sem GIL) quando disponível; sem numba os
+mesmos loops rodam como Python puro. Recebem closes como float64[:] (ou lista)
+e usam só escalares — nenhuma lista é criada dentro dos loops.
+Com TA-Lib instalado, RSI e Bollinger (mesma matemática) delegam para o C dela.
+"""
+
+import os
+import tempfile
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+# cache=True grava ao lado do módulo ou no home do usuário; num container sem
+# nenhum dos dois gravável o numba falha no import. O Dockerfile aponta
+# NUMBA_CACHE_DIR para /app/data; fora dele o padrão é o tmp do sistema.
+os.environ.setdefault("NUMBA_CACHE_DIR", os.path.join(tempfile.gettempdir(), "numba_cache"))
+
+try:
+    from numba import njit as _numba_njit
+    NUMBA_AVAILABLE = NUMPY_AVAILABLE
+
+    def njit(*args, **kwargs):
+        """@njit que, sem local de cache utilizável, compila sem cache em vez de derrubar o import."""
+        def deco(fn):
+            try:
+                return _numba_njit(**kwargs)(fn)
+            except RuntimeError as e:
+                if not kwargs.get("cache"):
+                    raise
+                print(f"[indicators] cache numba indisponível ({e}) — {fn.__name__} sem cache", flush=True)
+                return _numba_njit(**{**kwargs, "cache": False})(fn)
+        if len(args) == 1 and callable(args[0]):
+            return deco(args[0])
+        return deco
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda fn: fn
+
+try:
+    import talib
+    TALIB_AVAILABLE = NUMPY_AVAILABLE
+except ImportError:
+    talib = None
+    TALIB_AVAILABLE = False
+
+
+def as_close_array(prices):
+    """
+    Converte closes para float64[:] quando os kernels estão compilados. Sem numba os
+    loops são Python puro, onde indexar ndarray elemento a elemento é 2-5× mais lento
+    que lista — então ndarrays (prices_np do ciclo) voltam como lista.
+    """
+    if NUMBA_AVAILABLE:
+        if not isinstance(prices, np.ndarray):
+            return np.asarray(prices, dtype=np.float64)
+        return prices
+    if NUMPY_AVAILABLE and isinstance(prices, np.ndarray):
+        return prices.tolist()
+    return prices
+
+
+@njit(cache=True, fastmath=True, nogil=True)
+def wilder_rsi_nb(prices, period):
+    """
+    Médias de ganho/perda de Wilder numa única passada sobre os closes:
+    semente = média dos `period` primeiros deltas, depois avg = (avg*(p-1) + x) / p.
+    """
+    avg_gain = 0.0
+    avg_loss = 0.0
+    for i in range(1, period + 1):
+        d = prices[i] - prices[i - 1]
+        if d > 0:
+            avg_gain += d
+        else:
+            avg_loss -= d
+    avg_gain /= period
+    avg_loss /= period
+    for i in range(period + 1, len(prices)):
+        d = prices[i] - prices[i - 1]
+        g = d if d > 0 else 0.0
+        l = -d if d < 0 else 0.0
+        avg_gain = (avg_gain * (period - 1) + g) / period
+        avg_loss = (avg_loss * (period - 1) + l) / period
+    return avg_gain, avg_loss
+
+
+@njit(cache=True, fastmath=True, nogil=True)
+def ema_nb(prices, period):
+    """EMA do último close: semente = média simples dos `period` primeiros, depois ema = p*k + ema*(1-k)."""
+    k = 2.0 / (period + 1)
+    ema = 0.0
+    for i in range(period):
+        ema += prices[i]
+    ema /= period
+    for i in range(period, len(prices)):
+        ema = prices[i] * k + ema * (1 - k)
+    return ema
+
+
+@njit(cache=True, fastmath=True, nogil=True)
+def volatility_nb(prices, period):
+    """
+    Desvio padrão populacional dos retornos simples nos últimos `period` closes
+    (pula divisões por zero). Retorna -1.0 se não houver retorno válido.
+    """
+    start = len(prices) - period
+    n = 0
+    total = 0.0
+    for i in range(start + 1, len(prices)):
+        if prices[i - 1] != 0:
+            total += (prices[i] - prices[i - 1]) / prices[i - 1]
+            n += 1
+    if n == 0:
+        return -1.0
+    mean = total / n
+    var = 0.0
+    for i in range(start + 1, len(prices)):
+        if prices[i - 1] != 0:
+            var += ((prices[i] - prices[i - 1]) / prices[i - 1] - mean) ** 2
+    return (var / n) ** 0.5
+
+
+@njit(cache=True, fastmath=True, nogil=True)
+def macd_nb(prices, fast, slow, signal):
+    """
+    MACD numa única passada: EMA rápida, EMA lenta e sinal atualizadas juntas
+    (sementes = média simples dos primeiros valores, como em ema_series).
+    Retorna (macd, sinal, hist, hist_anterior, nº de pontos do histograma).
+    """
+    kf = 2.0 / (fast + 1)
+    ks = 2.0 / (slow + 1)
+    kg = 2.0 / (signal + 1)
+    ema_f = ema_s = sig = 0.0
+    sum_f = sum_s = sum_m = 0.0
+    macd = hist = hist_prev = 0.0
+    n_macd = 0
+    for i in range(len(prices)):
+        p = prices[i]
+        if i < fast:
+            sum_f += p
+            if i == fast - 1:
+                ema_f = sum_f / fast
+        else:
+            ema_f = p * kf + ema_f * (1 - kf)
+        if i < slow:
+            sum_s += p
+            if i < slow - 1:
+                continue
+            ema_s = sum_s / slow
+        else:
+            ema_s = p * ks + ema_s * (1 - ks)
+        macd = ema_f - ema_s
+        n_macd += 1
+        if n_macd < signal:
+            sum_m += macd
+            continue
+        if n_macd == signal:
+            sig = (sum_m + macd) / signal
+        else:
+            sig = macd * kg + sig * (1 - kg)
+        hist_prev = hist
+        hist = macd - sig
+    return macd, sig, hist, hist_prev, n_macd - signal + 1
+
+
+@njit(cache=True, fastmath=True, nogil=True)
+def atr_nb(prices, n):
+    """
+    ATR de Wilder (RMA) sobre closes: TR_t = |close_t - close_{t-1}|,
+    semente = média dos n primeiros TR, depois atr = (atr*(n-1) + tr) / n.
+    """
+    atr = 0.0
+    for i in range(1, n + 1):
+        atr += abs(prices[i] - prices[i - 1])
+    atr /= n
+    for i in range(n + 1, len(prices)):
+        atr = (atr * (n - 1) + abs(prices[i] - prices[i - 1])) / n
+    return atr
+
+
+@njit(cache=True, fastmath=True, nogil=True)
+def bollinger_nb(prices, window, k):
+    """
+    Bandas de Bollinger da última janela (desvio populacional, duas passadas).
+    Retorna (inferior, média, superior, desvio).
+    """
+    start = len(prices) - window
+    sma = 0.0
+    for i in range(start, len(prices)):
+        sma += prices[i]
+    sma /= window
+    var = 0.0
+    for i in range(start, len(prices)):
+        var += (prices[i] - sma) ** 2
+    std = (var / window) ** 0.5
+    return sma - k * std, sma, sma + k * std, std
+
+
+def rsi_talib(prices, period):
+    """RSI de Wilder via talib.RSI (sem arredondar); série toda parada = 100, como wilder_rsi_nb."""
+    arr = np.asarray(prices, dtype=np.float64)
+    value = float(talib.RSI(arr, timeperiod=period)[-1])
+    if value == 0.0 and arr.max() == arr.min():
+        return 100.0
+    return value
+
+
+def bollinger_talib(prices, window, k):
+    """Mesmo retorno de bollinger_nb via talib.BBANDS (média simples, desvio populacional)."""
+    upper, middle, lower = talib.BBANDS(
+        np.asarray(prices, dtype=np.float64), timeperiod=window, nbdevup=k, nbdevdn=k, matype=0,
+    )
+    sma = float(middle[-1])
+    return float(lower[-1]), sma, float(upper[-1]), (float(upper[-1]) - sma) / k
+
+
+def warmup():
+    """Força a compilação dos kernels (e grava o cache) antes do primeiro request."""
+    if not NUMBA_AVAILABLE:
+        return
+    dummy = np.linspace(100.0, 110.0, 100)
+    wilder_rsi_nb(dummy, 14)
+    ema_nb(dummy, 9)
+    volatility_nb(dummy, 20)
+    macd_nb(dummy, 12, 26, 9)
+    atr_nb(dummy, 14)
+    bollinger_nb(dummy, 20, 2.0)
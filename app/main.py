@@ -13,20 +13,37 @@ from contextlib import asynccontextmanager
 from pydantic import BaseModel
 from fastapi import FastAPI, HTTPException, Depends, Request, Security
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 from fastapi.security import APIKeyHeader
 from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import JSONResponse
-from datetime import datetime
+from starlette.responses import JSONResponse, Response
+from datetime import datetime, date, timezone, timedelta
 from pathlib import Path
+from typing import Optional
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from enum import IntEnum
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from logging.handlers import QueueHandler, QueueListener
+from operator import itemgetter
 import asyncio
+import heapq
 import json
+import logging
+import queue
+import sys
 import random as _rnd
 import os
 import hashlib
 import secrets
+import statistics as _stats
+import struct
 import time
+import httpx
 
 from app.core.config import settings
 from app import db_state
@@ -51,10 +68,11 @@ except Exception:
 
 # Market Data (Binance)
 try:
-    from app.market_data import market_data_service, MARKET_DATA_AVAILABLE
+    from app.market_data import market_data_service, MARKET_DATA_AVAILABLE, HTTP2_AVAILABLE
 except ImportError:
     market_data_service = None
     MARKET_DATA_AVAILABLE = False
+    HTTP2_AVAILABLE = False
 
 # Imports opcionais: falham graciosamente se dependências não instaladas
 try:
@@ -72,6 +90,89 @@ except ImportError:
     MLEnsemble = None
     ML_AVAILABLE = False
 
+# NumPy: reduções vetorizadas sobre preços/volumes (fallback em listas puras)
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+# Kernels dos indicadores (numba quando disponível; fallback = Python puro)
+from app.indicators_nb import (
+    NUMBA_AVAILABLE, TALIB_AVAILABLE, as_close_array, wilder_rsi_nb, macd_nb, atr_nb, bollinger_nb,
+    rsi_talib, bollinger_talib, warmup as _indicators_warmup,
+)
+
+# Backtest walk-forward (módulo na raiz do projeto)
+try:
+    from backtest import run_real_backtest
+except ImportError:
+    run_real_backtest = None
+
+# Fuso BRT (UTC-3) — criado uma vez no import em vez de a cada request
+_BRT = timezone(timedelta(hours=-3))
+
+# uvloop (libuv) como event loop: menos overhead por await/callback. Já vem com
+# uvicorn[standard]; no Windows não existe e o loop padrão do asyncio segue valendo.
+# Só a detecção — quem escolhe o loop é o uvicorn (--loop uvloop / uvicorn.run);
+# instalar a policy no import afetaria run_cycle.py, backtest.py e os testes.
+try:
+    import uvloop  # noqa: F401
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+
+# aiofiles: escrita do audit log sem bloquear o event loop (fallback = asyncio.to_thread)
+try:
+    import aiofiles
+    AIOFILES_AVAILABLE = True
+except ImportError:
+    aiofiles = None
+    AIOFILES_AVAILABLE = False
+
+# Cliente HTTP compartilhado pelo módulo (Yahoo Finance, self-ping): reaproveita
+# conexões TCP/TLS entre requests (e multiplexa com HTTP/2) em vez de um handshake
+# por chamada. Fechado no shutdown do lifespan.
+_http_client = httpx.AsyncClient(
+    http2=HTTP2_AVAILABLE,
+    timeout=10,
+    headers={"User-Agent": "Mozilla/5.0"},
+    limits=httpx.Limits(max_keepalive_connections=64),
+)
+
+# Pool dedicado às chamadas CPU das engines (momentum, IRQ, alocação, ML): um
+# worker por núcleo, separado do executor padrão que atende I/O bloqueante
+# (to_thread do PostgreSQL, aiofiles). Com os kernels numba nogil os workers
+# rodam de fato em paralelo. Criado no 1º uso e encerrado no shutdown do
+# lifespan — um lifespan seguinte no mesmo processo (TestClient, reload) recria.
+_engine_pool: Optional[ThreadPoolExecutor] = None
+
+
+def _engine_executor() -> ThreadPoolExecutor:
+    global _engine_pool
+    if _engine_pool is None:
+        _engine_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="engine")
+    return _engine_pool
+
+
+async def _run_engine(fn, *args):
+    """Executa fn(*args) no pool das engines sem bloquear o event loop."""
+    return await asyncio.get_running_loop().run_in_executor(_engine_executor(), fn, *args)
+
+
+# Log do scheduler: o loop só enfileira o registro (QueueHandler) e a escrita no
+# stdout fica na thread do QueueListener — nenhum write()/flush no event loop.
+# Iniciado/parado no lifespan; mensagens mantêm o prefixo "[scheduler]" dos prints.
+_sched_log = logging.getLogger("scheduler")
+_sched_log.setLevel(getattr(logging, settings.SCHEDULER_LOG_LEVEL.upper(), logging.INFO))
+_sched_log.propagate = False
+_sched_log_queue = queue.SimpleQueue()
+_sched_log.addHandler(QueueHandler(_sched_log_queue))
+_sched_log_stream = logging.StreamHandler(sys.stdout)
+_sched_log_stream.setFormatter(logging.Formatter("%(message)s"))
+_sched_log_listener = QueueListener(_sched_log_queue, _sched_log_stream)
+
 # ═══════════════════════════════════════════
 # SEGURANÇA — API KEY AUTHENTICATION
 # ═══════════════════════════════════════════
@@ -170,15 +271,20 @@ _last_scheduler_errors: list = []  # últimos 10 erros do scheduler
 _scheduler_debug = {"step": "init", "ts": "", "loop_count": 0}  # debug tracker
 _consecutive_errors: int = 0  # erros consecutivos do scheduler (global para /diagnostics)
 
-_scheduler_state = {
-    "running": False,
-    "interval_minutes": 30,   # ciclo a cada 30 minutos (B3); mín 60min fora do B3
-    "only_market_hours": True, # mantido por compatibilidade; crypto sempre roda
-    "next_run": None,
-    "total_auto_cycles": 0,
-    "task": None,
-    "session": "",             # sessão atual: "B3+Crypto" ou "Crypto24/7"
-}
+@dataclass(slots=True)
+class _SchedulerState:
+    """Estado do scheduler — slots: leitura de atributo direta no loop, sem hash de chave."""
+    running: bool = False
+    interval_minutes: int = 30        # ciclo a cada 30 minutos (B3); mín 60min fora do B3
+    only_market_hours: bool = True    # mantido por compatibilidade; crypto sempre roda
+    next_run: Optional[str] = None
+    total_auto_cycles: int = 0
+    task: Optional[asyncio.Task] = None
+    session: str = ""                 # sessão atual: "B3+Crypto" ou "Crypto24/7"
+    stop_event: Optional[asyncio.Event] = None  # acorda o loop na hora em stop/shutdown
+
+
+_scheduler_state = _SchedulerState()
 
 _SCHEDULER_PERSIST_KEYS = ("interval_minutes", "only_market_hours", "next_run", "total_auto_cycles", "session")
 
@@ -186,7 +292,7 @@ _SCHEDULER_PERSIST_KEYS = ("interval_minutes", "only_market_hours", "next_run",
 def _persist_scheduler_state():
     global _consecutive_errors
     try:
-        payload = {k: _scheduler_state.get(k) for k in _SCHEDULER_PERSIST_KEYS}
+        payload = {k: getattr(_scheduler_state, k) for k in _SCHEDULER_PERSIST_KEYS}
         payload["consecutive_errors"] = _consecutive_errors  # persiste entre restarts
         db_state.save_state("scheduler_state", payload)
     except Exception:
@@ -483,27 +589,26 @@ def _effective_timeframe_alloc(irq_score: float) -> tuple:
 
     return alloc, regime, _strategy_state["last_reason"], tf_recent
 
-def _is_market_open() -> bool:
-    """Verifica se o mercado B3 está aberto (seg-sex 10:00-17:00 BRT = UTC-3)."""
-    from datetime import timezone, timedelta
-    brt = timezone(timedelta(hours=-3))
-    now = datetime.now(brt)
+def _is_market_open(now: datetime = None) -> bool:
+    """
+    Verifica se o mercado B3 está aberto (seg-sex 10:00-17:00 BRT = UTC-3).
+    `now` (BRT) permite reaproveitar o relógio já lido no tick do scheduler.
+    """
+    now = now or datetime.now(_BRT)
     if now.weekday() >= 5:   # sábado=5, domingo=6
         return False
     return 10 <= now.hour < 17
 
 
-def _current_session() -> tuple:
+def _current_session(now: datetime = None) -> tuple:
     """
-    Retorna (assets, session_label) de acordo com o horário BRT:
+    Retorna (assets, session_label) de acordo com o horário BRT (`now`, se dado):
     - B3 aberta (seg-sex 10-17h)          → B3 + US + Global (todos os ativos)
     - NYSE aberta fora B3 (13h30-20h)     → US + ETFs Int'l + Crypto + Commodities
     - Europa aberta (05h-10h BRT)         → ETFs Int'l + Forex + Crypto + Commodities
     - Fora de horário  (20h-05h BRT)      → Crypto + Commodities agro (CME 23h/dia)
     """
-    from datetime import timezone, timedelta
-    brt = timezone(timedelta(hours=-3))
-    now = datetime.now(brt)
+    now = now or datetime.now(_BRT)
     weekday = now.weekday()  # 0=seg .. 4=sex
     hour    = now.hour
     minute  = now.minute
@@ -551,34 +656,98 @@ def _align_to_candle_close(min_wait_sec: int, candle_minutes: int = 5) -> int:
     return to_next_close
 
 
+# ── Métricas por ciclo: ring buffer binário ─────────────────────────────────
+# Cada ciclo grava (ts, nº do ciclo, pnl, irq, grid_pnl, turbo) como 6 doubles via
+# struct.pack_into num bytearray pré-alocado — nenhuma string nem objeto por ciclo.
+# O texto detalhado do ciclo só sai com o logger "scheduler" em DEBUG.
+_CYCLE_METRICS_RING = 1024
+_CYCLE_METRICS_REC = struct.Struct("<6d")
+_cycle_metrics_buf = bytearray(_CYCLE_METRICS_RING * _CYCLE_METRICS_REC.size)
+_cycle_metrics_count = 0  # total de registros já gravados (posição = count % RING)
+
+
+def _cycle_metrics_push(cycle: int, pnl: float, irq: float, grid_pnl: float, turbo: bool):
+    global _cycle_metrics_count
+    _CYCLE_METRICS_REC.pack_into(
+        _cycle_metrics_buf,
+        (_cycle_metrics_count % _CYCLE_METRICS_RING) * _CYCLE_METRICS_REC.size,
+        time.time(), cycle, pnl, irq, grid_pnl, 1.0 if turbo else 0.0,
+    )
+    _cycle_metrics_count += 1
+
+
+def _cycle_metrics_tail(n: int) -> list:
+    """Últimos n registros do ring buffer, do mais antigo para o mais recente."""
+    n = max(0, min(n, _cycle_metrics_count, _CYCLE_METRICS_RING))
+    size = _CYCLE_METRICS_REC.size
+    start = (_cycle_metrics_count - n) % _CYCLE_METRICS_RING
+    end = start + n
+    if end <= _CYCLE_METRICS_RING:
+        raw = _cycle_metrics_buf[start * size:end * size]
+    else:
+        raw = _cycle_metrics_buf[start * size:] + _cycle_metrics_buf[:(end - _CYCLE_METRICS_RING) * size]
+    return list(_CYCLE_METRICS_REC.iter_unpack(raw))
+
+
+async def _scheduler_wait(seconds: float) -> bool:
+    """
+    Dorme até `seconds` ou até o stop_event ser setado (o que vier antes).
+    Retorna True se foi acordado pelo evento.
+    """
+    event = _scheduler_state.stop_event
+    if event is None:
+        await asyncio.sleep(seconds)
+        return False
+    try:
+        await asyncio.wait_for(event.wait(), timeout=seconds)
+        return True
+    except asyncio.TimeoutError:
+        return False
+
+
+async def _stop_scheduler_task(task, grace: float = 2.0):
+    """Sinaliza o stop_event, dá `grace` s para o loop sair sozinho e só então cancela."""
+    _scheduler_state.running = False
+    event = _scheduler_state.stop_event
+    if event is not None:
+        event.set()
+    if task is None or task.done():
+        return
+    await asyncio.wait({task}, timeout=grace)
+    if not task.done():
+        task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
 async def _auto_cycle_loop():
     """Loop interno do scheduler: executa ciclos de trading automaticamente."""
     global _last_reinvestment_date, _last_daily_summary_date, _consecutive_errors
-    _scheduler_state["running"] = True
+    _scheduler_state.running = True
     _scheduler_debug["step"] = "warmup"
     _scheduler_debug["ts"] = datetime.now().isoformat()
-    print("[scheduler] Iniciado - intervalo:", _scheduler_state["interval_minutes"], "min", flush=True)
+    _sched_log.info(f"[scheduler] Iniciado - intervalo: {_scheduler_state.interval_minutes} min")
     # Aguarda o servidor subir completamente E o DB estar pronto antes do primeiro ciclo
-    await asyncio.sleep(60)
+    await _scheduler_wait(60)
     _scheduler_debug["step"] = "warmup_done"
     _scheduler_debug["ts"] = datetime.now().isoformat()
     _consecutive_errors = 0
-    while _scheduler_state["running"]:
+    while _scheduler_state.running:
       try:
         _scheduler_debug["loop_count"] += 1
         _scheduler_debug["step"] = "loop_tick"
         _scheduler_debug["ts"] = datetime.now().isoformat()
-        print(f"[scheduler] Loop tick - {datetime.now().isoformat()}", flush=True)
-        from datetime import timezone, timedelta
-        brt = timezone(timedelta(hours=-3))
-        now_brt = datetime.now(brt)
+        _sched_log.debug(f"[scheduler] Loop tick - {datetime.now().isoformat()}")
+        now_brt = datetime.now(_BRT)
         today_str = now_brt.strftime("%Y-%m-%d")
 
         # ✨ Resumo diário via WhatsApp: na virada do dia (primeiro ciclo do novo dia)
         if _last_daily_summary_date and _last_daily_summary_date != today_str:
             try:
                 prev_day = _last_daily_summary_date
-                prev_cycles = [c for c in _perf_state.get("cycles", []) if c.get("timestamp", "").startswith(prev_day)]
+                prev_cycles = _cycles_on_day(prev_day)
                 prev_pnl = round(sum(c.get("pnl", 0) for c in prev_cycles), 2)
                 prev_wins = sum(1 for c in prev_cycles if c.get("pnl", 0) > 0)
                 prev_capital = _trade_state.get("capital", 0)
@@ -590,36 +759,35 @@ async def _auto_cycle_loop():
                         win_cycles=prev_wins,
                         date_str=prev_day
                     ))
-                    print(f"[scheduler] 📊 Resumo diário enviado para {prev_day}", flush=True)
+                    _sched_log.info(f"[scheduler] 📊 Resumo diário enviado para {prev_day}")
             except Exception as _e_sum:
-                print(f"[scheduler] Erro no resumo diário: {_e_sum}", flush=True)
+                _sched_log.warning(f"[scheduler] Erro no resumo diário: {_e_sum}")
         _last_daily_summary_date = today_str
 
         # ✨ Reinvestimento automático: após 17h BRT, reinveste lucro do dia
         if now_brt.weekday() < 5 and now_brt.hour == 17 and _last_reinvestment_date != today_str:
             try:
-                today_cycles = [c for c in _perf_state.get("cycles", []) if c.get("timestamp", "").startswith(today_str)]
-                today_pnl = round(sum(c.get("pnl", 0) for c in today_cycles), 2)
+                today_pnl = _today_cycles_pnl(today_str)
                 if today_pnl != 0:
                     reinvest = round(today_pnl * settings.COMPOUNDING_RATE, 2)
                     _trade_state["capital"] = round(_trade_state["capital"] + reinvest, 2)
                     sinal = "⬆ Lucro" if today_pnl > 0 else "⬇ Prejuízo"
                     _trade_log("REINVESTIMENTO", "—", reinvest,
                         f"💰 {sinal} do dia R$ {today_pnl:+.2f} → reinvestido {settings.COMPOUNDING_RATE*100:.0f}%: R$ {reinvest:+.2f}. Capital: R$ {_trade_state['capital']:.2f}")
-                    print(f"[scheduler] Reinvestimento: R$ {today_pnl:+.2f} -> capital agora R$ {_trade_state['capital']:.2f}", flush=True)
+                    _sched_log.info(f"[scheduler] Reinvestimento: R$ {today_pnl:+.2f} -> capital agora R$ {_trade_state['capital']:.2f}")
                 _last_reinvestment_date = today_str
             except Exception as e:
-                print(f"[scheduler] Erro no reinvestimento: {e}", flush=True)
+                _sched_log.warning(f"[scheduler] Erro no reinvestimento: {e}")
 
-        interval_sec = _scheduler_state["interval_minutes"] * 60
-        _scheduler_state["next_run"] = datetime.now().isoformat()
+        interval_sec = _scheduler_state.interval_minutes * 60
+        _scheduler_state.next_run = datetime.now().isoformat()
 
         # Determina sessão: B3+Crypto ou Crypto-only
-        active_assets, session_label, _is_overnight = _current_session()
-        _scheduler_state["session"] = session_label
+        active_assets, session_label, _is_overnight = _current_session(now_brt)
+        _scheduler_state.session = session_label
 
         # Intervalo dinâmico: mais rápido para crypto, mais lento para B3
-        if _is_market_open():
+        if _is_market_open(now_brt):
             interval_sec = settings.B3_CYCLE_MINUTES * 60
         else:
             interval_sec = settings.CRYPTO_CYCLE_MINUTES * 60  # 10min crypto
@@ -631,8 +799,8 @@ async def _auto_cycle_loop():
         if _protection_state.get("hard_stopped", False):
             _scheduler_debug["step"] = "hard_stopped"
             _scheduler_debug["ts"] = datetime.now().isoformat()
-            print(f"[scheduler] 🔴 HARD STOP ativo — drawdown máximo atingido. Aguardando /trade/unfreeze", flush=True)
-            await asyncio.sleep(300)  # verifica a cada 5min
+            _sched_log.warning(f"[scheduler] 🔴 HARD STOP ativo — drawdown máximo atingido. Aguardando /trade/unfreeze")
+            await _scheduler_wait(300)  # verifica a cada 5min
             continue
 
         _scheduler_debug["step"] = "before_cycle"
@@ -642,7 +810,7 @@ async def _auto_cycle_loop():
                 _run_trade_cycle_internal(assets=active_assets),
                 timeout=180  # max 3 min por ciclo
             )
-            _scheduler_state["total_auto_cycles"] += 1
+            _scheduler_state.total_auto_cycles += 1
             _consecutive_errors = 0  # reset on success
             _scheduler_debug["step"] = "cycle_done"
             _scheduler_debug["ts"] = datetime.now().isoformat()
@@ -651,6 +819,9 @@ async def _auto_cycle_loop():
             irq = result.get("irq", 0)
             turbo = result.get("turbo_active", False)
             grid_p = result.get("grid_pnl", 0)
+            # Registro binário do ciclo no ring buffer (/scheduler/metrics) — sem formatar texto
+            _cycle_metrics_push(_scheduler_state.total_auto_cycles, pnl, irq, grid_p, turbo)
+            # Resumo do ciclo em INFO: o ring buffer é só memória, esta linha é o registro durável
             prot = result.get("protection", {})
             prot_info = ""
             if prot.get("paused"):
@@ -661,27 +832,26 @@ async def _auto_cycle_loop():
                 prot_info += f" | 🔻 {prot['consecutive_losses']}x perdas"
             turbo_info = " | 🚀 TURBO" if turbo else ""
             grid_info = f" | Grid: R${grid_p:+.2f}" if grid_p != 0 else ""
-            print(
-                f"[scheduler] Ciclo #{_scheduler_state['total_auto_cycles']} [{session_label}] "
+            _sched_log.info(
+                f"[scheduler] Ciclo #{_scheduler_state.total_auto_cycles} [{session_label}] "
                 f"| P&L: R$ {pnl:.4f} (5m:{result.get('pnl_5m',0):.2f} 1h:{result.get('pnl_1h',0):.2f} 1d:{result.get('pnl_1d',0):.2f})"
-                f" | IRQ: {irq:.3f}{grid_info}{turbo_info}{prot_info}",
-                flush=True,
+                f" | IRQ: {irq:.3f}{grid_info}{turbo_info}{prot_info}"
             )
             # ── Scalping Turbo: se detectado, próximo ciclo será em 2min ──
             if turbo and settings.TURBO_ENABLED:
                 interval_sec = settings.TURBO_CYCLE_SECONDS
-                print(f"[scheduler] 🚀 Turbo Mode! Próximo ciclo em {settings.TURBO_CYCLE_SECONDS}s", flush=True)
+                _sched_log.info(f"[scheduler] 🚀 Turbo Mode! Próximo ciclo em {settings.TURBO_CYCLE_SECONDS}s")
         except asyncio.TimeoutError:
             err_msg = "Ciclo excedeu timeout de 180s"
             _scheduler_debug["step"] = "timeout"
             _scheduler_debug["ts"] = datetime.now().isoformat()
-            print(f"[scheduler] ⏱️ TIMEOUT: {err_msg}", flush=True)
+            _sched_log.warning(f"[scheduler] ⏱️ TIMEOUT: {err_msg}")
             _last_scheduler_errors.append({"time": datetime.now().isoformat(), "error": err_msg, "traceback": "", "count": 0})
             if len(_last_scheduler_errors) > 10:
                 _last_scheduler_errors.pop(0)
         except Exception as e:
             err_msg = str(e)
-            print(f"[scheduler] Erro no ciclo automático: {err_msg}", flush=True)
+            _sched_log.warning(f"[scheduler] Erro no ciclo automático: {err_msg}")
             if ALERTS_AVAILABLE and alert_manager:
                 asyncio.create_task(alert_manager.alert_critical_error(
                     error_msg=err_msg,
@@ -693,13 +863,13 @@ async def _auto_cycle_loop():
         if interval_sec >= 60:  # só alinha se não for turbo (turbo=2min, menor que 1 candle)
             aligned_sec = _align_to_candle_close(interval_sec, candle_minutes=5)
             if aligned_sec != interval_sec:
-                print(f"[scheduler] ⏱ Alinhando candle: dormindo {aligned_sec}s (era {interval_sec}s)", flush=True)
-            await asyncio.sleep(aligned_sec)
+                _sched_log.info(f"[scheduler] ⏱ Alinhando candle: dormindo {aligned_sec}s (era {interval_sec}s)")
+            await _scheduler_wait(aligned_sec)
         else:
-            await asyncio.sleep(interval_sec)
+            await _scheduler_wait(interval_sec)
 
       except asyncio.CancelledError:
-        print("[scheduler] Task cancelada.", flush=True)
+        _sched_log.info("[scheduler] Task cancelada.")
         break
       except Exception as _loop_err:
         _consecutive_errors += 1
@@ -709,18 +879,18 @@ async def _auto_cycle_loop():
         _last_scheduler_errors.append(_err_entry)
         if len(_last_scheduler_errors) > 10:
             _last_scheduler_errors.pop(0)
-        print(f"[scheduler] ❌ Erro GERAL no loop (#{_consecutive_errors}): {_loop_err}\n{_tb}", flush=True)
+        _sched_log.warning(f"[scheduler] ❌ Erro GERAL no loop (#{_consecutive_errors}): {_loop_err}\n{_tb}")
         _persist_scheduler_state()  # persiste erros consecutivos no DB
         # Back-off: espera 30s * n erros consecutivos (max 5min)
         backoff = min(30 * _consecutive_errors, 300)
-        print(f"[scheduler] Aguardando {backoff}s antes de tentar novamente...", flush=True)
-        await asyncio.sleep(backoff)
+        _sched_log.info(f"[scheduler] Aguardando {backoff}s antes de tentar novamente...")
+        await _scheduler_wait(backoff)
         if _consecutive_errors >= 20:
-            print("[scheduler] ❌ 20 erros consecutivos — parando scheduler.", flush=True)
+            _sched_log.warning("[scheduler] ❌ 20 erros consecutivos — parando scheduler.")
             break
         continue
 
-    print("[scheduler] Parado.", flush=True)
+    _sched_log.info("[scheduler] Parado.")
 
 
 # ═══════════════════════════════════════════
@@ -729,7 +899,6 @@ async def _auto_cycle_loop():
 
 async def _keep_alive_loop():
     """Self-ping periódico para manter o serviço Railway ativo."""
-    import httpx
     RAILWAY_URL = os.getenv("RAILWAY_PUBLIC_DOMAIN", "")
     if not RAILWAY_URL:
         return  # não está no Railway, não faz nada
@@ -737,8 +906,7 @@ async def _keep_alive_loop():
     while True:
         await asyncio.sleep(600)  # 10 minutos
         try:
-            async with httpx.AsyncClient(timeout=10) as client:
-                await client.get(url)
+            await _http_client.get(url)
         except Exception:
             pass
 
@@ -807,7 +975,7 @@ async def lifespan(app: FastAPI):
         print("[lifespan] ⚠️ PostgreSQL não respondeu! Usando dados em memória/JSON local.", flush=True)
     
     # ── Recarregar estado do DB com retry (garante persistência entre deploys) ──
-    global _perf_state, _trade_state, _scheduler_state, _consecutive_errors
+    global _perf_state, _trade_state, _scheduler_state, _consecutive_errors, _state_dirty, _engine_pool, _audit_queue
 
     async def _load_with_retry(key: str, default: dict, label: str, retries: int = 10, delay: float = 5.0) -> dict:
         """Tenta carregar estado do DB até `retries` vezes com `delay` segundos entre tentativas."""
@@ -829,6 +997,8 @@ async def lifespan(app: FastAPI):
 
     try:
         saved_perf = await _load_with_retry("performance", {}, "performance")
+        if saved_perf:
+            saved_perf = _perf_with_cycles(saved_perf)
         if saved_perf and "cycles" in saved_perf:
             # Preserva ciclos existentes em memória se o DB retornou menos (evita regressão)
             mem_cycles = len(_perf_state.get("cycles", []))
@@ -864,18 +1034,18 @@ async def lifespan(app: FastAPI):
         if saved_scheduler:
             for key in _SCHEDULER_PERSIST_KEYS:
                 if key in saved_scheduler:
-                    _scheduler_state[key] = saved_scheduler.get(key)
+                    setattr(_scheduler_state, key, saved_scheduler.get(key))
             if "consecutive_errors" in saved_scheduler:
                 _consecutive_errors = int(saved_scheduler.get("consecutive_errors", 0))
             print(
-                f"[lifespan] Scheduler recarregado: ciclos={_scheduler_state.get('total_auto_cycles', 0)} "
-                f"intervalo={_scheduler_state.get('interval_minutes', 30)}min"
+                f"[lifespan] Scheduler recarregado: ciclos={_scheduler_state.total_auto_cycles} "
+                f"intervalo={_scheduler_state.interval_minutes}min"
                 + (f" | erros_consecutivos={_consecutive_errors}" if _consecutive_errors > 0 else ""),
                 flush=True,
             )
 
         # Evita regressão de contador quando houver histórico de performance maior
-        _scheduler_state["total_auto_cycles"] = _effective_total_cycles()
+        _scheduler_state.total_auto_cycles = _effective_total_cycles()
         _persist_scheduler_state()
     except Exception as _e:
         print(f"[lifespan] Aviso ao recarregar estado: {_e}", flush=True)
@@ -892,65 +1062,148 @@ async def lifespan(app: FastAPI):
             print("[alerts] WhatsApp (CallMeBot) configurado", flush=True)
     # ── Auto-trading ativo por padrão ──────────────────────────────────
     _trade_state["auto_trading"] = True
+    # ── Compila os kernels numba antes do primeiro ciclo/request ───────
+    if NUMBA_AVAILABLE:
+        await asyncio.to_thread(_indicators_warmup)
+        print("[lifespan] Kernels de indicadores compilados (numba)", flush=True)
+    # ── Ensemble ML treinado uma vez (dados mock são fixos) ────────────
+    if ML_AVAILABLE:
+        await _run_engine(_trained_ml)
     # ── Reconciliação de posições com brokers ───────────────────────────
     asyncio.get_event_loop().create_task(_reconcile_broker_positions())
     # ── Scheduler de ciclos ────────────────────────────────────────────
+    _sched_log_listener.start()
+    _scheduler_state.stop_event = asyncio.Event()  # precisa do loop rodando
     task = asyncio.create_task(_auto_cycle_loop())
-    _scheduler_state["task"] = task
+    _scheduler_state.task = task
     # ── Keep-alive desativado (bot local) ─────────────────────────────
     keep_alive_task = asyncio.create_task(_keep_alive_loop())
+    # ── Writer do audit log (fila → JSONL em lotes) ────────────────────
+    _audit_queue = asyncio.Queue(maxsize=_AUDIT_QUEUE_MAX)
+    audit_task = asyncio.create_task(_audit_writer())
+    # ── Flusher do estado (trade_state/performance adiados) ────────────
+    _state_dirty = asyncio.Event()
+    state_task = asyncio.create_task(_state_flusher())
     print("[lifespan] Bot 24/7 ativo — scheduler iniciado", flush=True)
     yield
     # Shutdown
-    _scheduler_state["running"] = False
+    _scheduler_state.running = False
+    state_task.cancel()  # o finally do flusher grava o que estiver pendente
+    try:
+        await state_task
+    except asyncio.CancelledError:
+        pass
+    _state_dirty = None  # daqui em diante _mark_state_dirty grava na hora
     try:
         db_state.save_state("trade_state", _trade_state)
-        db_state.save_state("performance", _perf_state)
+        _save_perf()
         _persist_scheduler_state()
     except Exception:
         pass
     _persist_scheduler_state()
-    task.cancel()
+    await _stop_scheduler_task(task)
     keep_alive_task.cancel()
+    audit_task.cancel()
     try:
-        await task
+        await audit_task
     except asyncio.CancelledError:
         pass
+    await _audit_drain()
+    _audit_queue = None  # eventos após o shutdown gravam direto
+    if MARKET_DATA_AVAILABLE and market_data_service:
+        await market_data_service.aclose()
+    await _http_client.aclose()
     try:
         await keep_alive_task
     except asyncio.CancelledError:
         pass
+    if _engine_pool is not None:
+        pool, _engine_pool = _engine_pool, None
+        pool.shutdown(wait=False, cancel_futures=True)
+    _sched_log_listener.stop()  # esvazia a fila antes de sair
 
 
 # Criar aplicação
+def _json_default(obj):
+    """
+    Tipos que o jsonable_encoder convertia e o orjson não conhece — necessário
+    quando o endpoint devolve _FastJSONResponse direto (sem passar pelo encoder).
+    """
+    if isinstance(obj, (set, frozenset, deque)):
+        return list(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    return str(obj)
+
+
+class _FastJSONResponse(JSONResponse):
+    """
+    JSONResponse serializada com orjson (chaves não-str e arrays NumPy aceitos),
+    ~3-10× mais rápido que o json stdlib. Sem orjson cai no json stdlib com o
+    mesmo fallback de tipos.
+    """
+    def render(self, content) -> bytes:
+        if db_state.ORJSON_AVAILABLE:
+            try:
+                return db_state.orjson.dumps(
+                    content,
+                    default=_json_default,
+                    option=db_state.orjson.OPT_NON_STR_KEYS | db_state.orjson.OPT_SERIALIZE_NUMPY,
+                )
+            except TypeError:
+                pass
+        return json.dumps(
+            content, default=_json_default, ensure_ascii=False, allow_nan=False,
+            indent=None, separators=(",", ":"),
+        ).encode("utf-8")
+
+
+def _json_body(content) -> Response:
+    """Response com corpo já serializado (bytes) — para payloads cacheados."""
+    return Response(content=content, media_type="application/json")
+
+
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
     description="Bot de Day Trade Automatizado com Análise de Momentum e Risco",
     lifespan=lifespan,
     dependencies=[Depends(verify_api_key)],
+    default_response_class=_FastJSONResponse,
 )
 
 # ── CORS — restrito ao domínio do Railway + localhost dev ──────────
-_ALLOWED_ORIGINS = [
+# Só origens exatas, num frozenset (membership O(1)) — sem regex/curinga, que no
+# *.up.railway.app liberaria qualquer app de terceiros hospedado no Railway.
+# Previews do projeto entram por CORS_EXTRA_ORIGINS. O dashboard autentica por
+# header X-API-Key (sem cookies), então não há allow_credentials.
+_ALLOWED_ORIGINS = frozenset({
     "https://daytrade-bot-production.up.railway.app",
-    "https://*.up.railway.app",
     "http://localhost:8000",
     "http://localhost:8001",
     "http://127.0.0.1:8000",
     "http://127.0.0.1:8001",
-]
+    *settings.CORS_EXTRA_ORIGINS,
+})
 app.add_middleware(
     CORSMiddleware,
     allow_origins=_ALLOWED_ORIGINS,
-    allow_credentials=True,
+    allow_credentials=False,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["Content-Type", "X-API-Key", "Authorization"],
+    max_age=3600,  # navegador reaproveita o preflight por 1h
 )
 
 # ── Security Headers ──────────────────────────────────────────────
 app.add_middleware(SecurityHeadersMiddleware)
 
+# ── Compressão gzip ───────────────────────────────────────────────
+# O dashboard sai com no-store (app.js ~175 KB, index.html ~97 KB) e é baixado
+# inteiro a cada abertura; gzip corta 4-10× os bytes. Respostas < 512 B passam cruas.
+app.add_middleware(GZipMiddleware, minimum_size=512, compresslevel=6)
+
 # ── Rate Limiting ─────────────────────────────────────────────────
 if RATE_LIMIT_AVAILABLE and _limiter:
     app.state.limiter = _limiter
@@ -1098,6 +1351,49 @@ test_assets_data = {
     },
 }
 
+# Último preço de cada ativo mock — test_assets_data é estático, então monta uma vez
+_last_prices_cache: dict = {asset: data["prices"][-1] for asset, data in test_assets_data.items()}
+
+# Séries mock também como float64 contíguo (prices_np/volumes_np, o formato de _as_np):
+# os helpers vetorizados usam direto, sem converter lista→array a cada request. As
+# listas ficam para os engines, que fatiam/indexam como lista.
+if NUMPY_AVAILABLE:
+    for _d in test_assets_data.values():
+        _d["prices_np"] = np.ascontiguousarray(_d["prices"], dtype=np.float64)
+        _d["volumes_np"] = np.ascontiguousarray(_d["volumes"], dtype=np.float64)
+
+# Momentum/IRQ sobre os dados mock: /status, /analyze/* e /predict/combined recalculavam
+# tudo a cada request. Só test_assets_data é cacheado (dicts de dados ao vivo são novos a
+# cada chamada e um id() reaproveitado pelo GC daria resultado de outro dict).
+_MOCK_ANALYSIS_TTL = 5.0
+_momentum_cache: dict = {"ts": 0.0, "key": None, "val": None}
+_irq_cache: dict = {"ts": 0.0, "key": None, "val": None}
+
+
+def _cached_momentum(data: dict) -> dict:
+    """MomentumAnalyzer.calculate_multiple_assets com TTL para test_assets_data (cópia rasa)."""
+    if data is not test_assets_data:
+        return MomentumAnalyzer.calculate_multiple_assets(data)
+    key = (id(data), len(data["BTC"]["prices"]))
+    now = time.monotonic()
+    c = _momentum_cache
+    if c["key"] != key or now - c["ts"] >= _MOCK_ANALYSIS_TTL:
+        c.update(ts=now, key=key, val=MomentumAnalyzer.calculate_multiple_assets(data))
+    return dict(c["val"])
+
+
+def _cached_irq(prices, volumes) -> dict:
+    """RiskAnalyzer.calculate_irq com TTL para as séries mock do BTC (cópia rasa)."""
+    btc = test_assets_data["BTC"]
+    if prices is not btc["prices"] or volumes is not btc["volumes"]:
+        return RiskAnalyzer.calculate_irq(prices, volumes)
+    key = (id(prices), len(prices))
+    now = time.monotonic()
+    c = _irq_cache
+    if c["key"] != key or now - c["ts"] >= _MOCK_ANALYSIS_TTL:
+        c.update(ts=now, key=key, val=RiskAnalyzer.calculate_irq(prices, volumes))
+    return dict(c["val"])
+
 
 @app.get("/", include_in_schema=False)
 async def root():
@@ -1143,17 +1439,15 @@ async def backup_state():
 @app.get("/health")
 async def health_check():
     """Health check — usado pelo keep-alive e monitoramento externo."""
-    from datetime import timezone as _tz, timedelta as _td
-    _brt = _tz(_td(hours=-3))
     return {
         "status": "ok",
         "deploy_version": "v2026.03.09-health-monitor",
-        "timestamp": datetime.now(_brt).isoformat(),
+        "timestamp": datetime.now(_BRT).isoformat(),
         "auto_trading": _trade_state.get("auto_trading", False),
-        "scheduler_running": _scheduler_state.get("running", False),
+        "scheduler_running": _scheduler_state.running,
         "total_cycles": _effective_total_cycles(),
         "last_cycle": _trade_state.get("last_cycle"),
-        "uptime_session": _scheduler_state.get("session", ""),
+        "uptime_session": _scheduler_state.session,
         "persistence": db_state.storage_info(),
     }
 
@@ -1165,16 +1459,14 @@ async def health_check():
 @app.get("/diagnostics", tags=["Monitoramento"])
 async def diagnostics():
     """Auto-diagnóstico completo do bot — usado pelo banner de saúde no dashboard."""
-    from datetime import timezone as _tz, timedelta as _td
-    _brt = _tz(_td(hours=-3))
-    now = datetime.now(_brt)
+    now = datetime.now(_BRT)
 
     issues: list[dict] = []
     severity = "healthy"  # healthy | warning | critical
 
     # ── 1. Scheduler rodando? ────────────────────────────────
-    sched_running = _scheduler_state.get("running", False)
-    sched_task = _scheduler_state.get("task")
+    sched_running = _scheduler_state.running
+    sched_task = _scheduler_state.task
     task_alive = sched_task is not None and not sched_task.done() if sched_task else False
 
     if not sched_running and not task_alive:
@@ -1203,7 +1495,7 @@ async def diagnostics():
         try:
             last_dt = datetime.fromisoformat(str(last_cycle_str))
             if last_dt.tzinfo is None:
-                last_dt = last_dt.replace(tzinfo=_brt)
+                last_dt = last_dt.replace(tzinfo=_BRT)
             delta = now - last_dt
             cycle_stale_minutes = delta.total_seconds() / 60
             # Só alerta se mercado aberto (B3 ou crypto) E ciclo parado > 45 min
@@ -1336,7 +1628,7 @@ async def diagnostics():
 async def analyze_momentum():
     """Analisa momentum de todos os ativos"""
     try:
-        results = MomentumAnalyzer.calculate_multiple_assets(test_assets_data)
+        results = await _run_engine(_cached_momentum, test_assets_data)
 
         return {
             "success": True,
@@ -1353,7 +1645,8 @@ async def analyze_risk():
     try:
         # Usar dados de BTC como referência para risco geral
         btc_data = test_assets_data["BTC"]
-        risk_analysis = RiskAnalyzer.calculate_irq(
+        risk_analysis = await _run_engine(
+            _cached_irq,
             btc_data["prices"],
             btc_data["volumes"],
         )
@@ -1370,6 +1663,32 @@ async def analyze_risk():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+_MOMENTUM_VIEW_FIELDS = ("momentum_score", "trend_status", "classification", "return_pct")
+_momentum_fields = itemgetter(*_MOMENTUM_VIEW_FIELDS)
+_recommended_amount = itemgetter("recommended_amount")
+
+
+def _momentum_view(momentum_results: dict) -> dict:
+    """Projeção {ativo: campos de resumo} via itemgetter + zip (leituras em C, sem lookup por campo)."""
+    return {
+        asset: dict(zip(_MOMENTUM_VIEW_FIELDS, _momentum_fields(data)))
+        for asset, data in momentum_results.items()
+    }
+
+
+def _allocation_view(rebalancing: dict) -> dict:
+    """{ativo: valor recomendado} para os cards do dashboard."""
+    return dict(zip(rebalancing, map(_recommended_amount, rebalancing.values())))
+
+
+def _allocation_pipeline(momentum_results, momentum_scores, irq_score, capital):
+    """Alocação → rebalanceamento → métricas de risco (síncrono; roda via _run_engine)."""
+    allocation = PortfolioManager.calculate_portfolio_allocation(momentum_scores, irq_score, capital)
+    rebalancing = PortfolioManager.apply_rebalancing_rules(allocation, momentum_results, capital, irq_score)
+    risk_metrics = PortfolioManager.calculate_risk_metrics(allocation, capital)
+    return allocation, rebalancing, risk_metrics
+
+
 @app.post("/analyze/full")
 async def full_analysis():
     """Análise completa: Momentum + Risco + Alocação (dados REAIS quando disponíveis)"""
@@ -1385,51 +1704,32 @@ async def full_analysis():
                 pass
         source_data = live_data if live_data and len(live_data) > 0 else test_assets_data
 
-        # 1. Analisar Momentum
-        momentum_results = MomentumAnalyzer.calculate_multiple_assets(source_data)
-        momentum_scores = {asset: data["momentum_score"] for asset, data in momentum_results.items()}
-
-        # 2. Analisar Risco Global (BTC como ref, fallback para primeiro ativo)
+        # 1+2. Momentum e Risco Global (BTC como ref, fallback para primeiro ativo)
+        # rodam em paralelo no pool das engines — são CPU puro e não dependem um do outro
         ref_asset = "BTC" if "BTC" in source_data else list(source_data.keys())[0]
         ref_data = source_data[ref_asset]
-        risk_analysis = RiskAnalyzer.calculate_irq(
-            ref_data.get("prices", ref_data) if isinstance(ref_data, dict) else ref_data,
-            ref_data.get("volumes", []) if isinstance(ref_data, dict) else [],
+        momentum_results, risk_analysis = await asyncio.gather(
+            _run_engine(_cached_momentum, source_data),
+            _run_engine(
+                _cached_irq,
+                ref_data.get("prices", ref_data) if isinstance(ref_data, dict) else ref_data,
+                ref_data.get("volumes", []) if isinstance(ref_data, dict) else [],
+            ),
         )
+        momentum_scores = {asset: data["momentum_score"] for asset, data in momentum_results.items()}
         irq_score = risk_analysis["irq_score"]
         protection = RiskAnalyzer.get_protection_level(irq_score)
 
-        # 3. Calcular Alocação — usa capital real do trade se disponível
+        # 3-5. Alocação, Rebalanceamento e Métricas (dependem de 1+2) fora do event loop
         initial_capital = _trade_state.get("capital", settings.INITIAL_CAPITAL)
-        allocation = PortfolioManager.calculate_portfolio_allocation(
-            momentum_scores,
-            irq_score,
-            initial_capital,
-        )
-
-        # 4. Aplicar Rebalanceamento
-        rebalancing = PortfolioManager.apply_rebalancing_rules(
-            allocation,
-            momentum_results,
-            initial_capital,
-            irq_score,
+        allocation, rebalancing, risk_metrics = await _run_engine(
+            _allocation_pipeline, momentum_results, momentum_scores, irq_score, initial_capital,
         )
 
-        # 5. Calcular Métricas de Risco
-        risk_metrics = PortfolioManager.calculate_risk_metrics(allocation, initial_capital)
-
         # Preparar resposta
         analysis_report = {
-            "timestamp": datetime.utcnow(),
-            "momentum_analysis": {
-                asset: {
-                    "momentum_score": momentum_results[asset]["momentum_score"],
-                    "trend_status": momentum_results[asset]["trend_status"],
-                    "classification": momentum_results[asset]["classification"],
-                    "return_pct": momentum_results[asset]["return_pct"],
-                }
-                for asset in momentum_results
-            },
+            "timestamp": datetime.utcnow().isoformat(),
+            "momentum_analysis": _momentum_view(momentum_results),
             "risk_analysis": {
                 "irq_score": irq_score,
                 "level": protection["level"],
@@ -1453,12 +1753,7 @@ async def full_analysis():
             },
             "allocations": rebalancing,
             # Formato para dashboard.js (portfolio cards)
-            "portfolio_allocation": {
-                "allocation": {
-                    asset: data["recommended_amount"]
-                    for asset, data in rebalancing.items()
-                }
-            },
+            "portfolio_allocation": {"allocation": _allocation_view(rebalancing)},
             "risk_metrics": risk_metrics,
             "capital_info": {
                 "total_capital": initial_capital,
@@ -1468,11 +1763,12 @@ async def full_analysis():
             },
         }
 
-        return {
+        # Resposta já pronta: pula o jsonable_encoder e serializa direto (orjson)
+        return _FastJSONResponse({
             "success": True,
             "message": "Análise completa concluída",
             "data": analysis_report,
-        }
+        })
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1483,9 +1779,9 @@ async def bot_status():
     """Status do bot"""
     try:
         # Análise rápida
-        momentum_results = MomentumAnalyzer.calculate_multiple_assets(test_assets_data)
+        momentum_results = _cached_momentum(test_assets_data)
         btc_data = test_assets_data["BTC"]
-        risk_analysis = RiskAnalyzer.calculate_irq(btc_data["prices"], btc_data["volumes"])
+        risk_analysis = _cached_irq(btc_data["prices"], btc_data["volumes"])
 
         momentum_scores = {asset: data["momentum_score"] for asset, data in momentum_results.items()}
         real_capital = _trade_state.get("capital", settings.INITIAL_CAPITAL)
@@ -1517,26 +1813,53 @@ async def bot_status():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Corpo do /config já serializado: só muda quando o capital inicial é alterado
+# (/trade/capital, /admin/restore-trade) — a chave do cache detecta isso sem hook
+_config_blob: dict = {"key": None, "body": b""}
+
+
+def _config_body() -> bytes:
+    key = (settings.INITIAL_CAPITAL, len(settings.ALLOWED_ASSETS))
+    if _config_blob["key"] != key:
+        _config_blob["body"] = _FastJSONResponse({
+            "success": True,
+            "message": "Configurações obtidas",
+            "data": {
+                "initial_capital": settings.INITIAL_CAPITAL,
+                "max_position_percentage": settings.MAX_POSITION_PERCENTAGE,
+                "min_position_amount": settings.MIN_POSITION_AMOUNT,
+                "stop_loss_percentage": settings.STOP_LOSS_PERCENTAGE,
+                "rebalance_interval_seconds": settings.REBALANCE_INTERVAL,
+                "irq_thresholds": {
+                    "high": settings.IRQ_THRESHOLD_HIGH,
+                    "very_high": settings.IRQ_THRESHOLD_VERY_HIGH,
+                    "critical": settings.IRQ_THRESHOLD_CRITICAL,
+                },
+                "allowed_assets": settings.ALLOWED_ASSETS,
+            },
+        }).body
+        _config_blob["key"] = key
+    return _config_blob["body"]
+
+
 @app.get("/config")
 async def get_config():
     """Retorna configurações do bot"""
-    return {
-        "success": True,
-        "message": "Configurações obtidas",
-        "data": {
-            "initial_capital": settings.INITIAL_CAPITAL,
-            "max_position_percentage": settings.MAX_POSITION_PERCENTAGE,
-            "min_position_amount": settings.MIN_POSITION_AMOUNT,
-            "stop_loss_percentage": settings.STOP_LOSS_PERCENTAGE,
-            "rebalance_interval_seconds": settings.REBALANCE_INTERVAL,
-            "irq_thresholds": {
-                "high": settings.IRQ_THRESHOLD_HIGH,
-                "very_high": settings.IRQ_THRESHOLD_VERY_HIGH,
-                "critical": settings.IRQ_THRESHOLD_CRITICAL,
-            },
-            "allowed_assets": settings.ALLOWED_ASSETS,
-        },
-    }
+    return Response(content=_config_body(), media_type="application/json")
+
+
+# Ensemble ML treinado sobre test_assets_data — a série é fixa, então o treino
+# roda uma vez (no lifespan, ou no primeiro request) e os endpoints só predizem
+_ml_model = None
+
+
+def _trained_ml():
+    global _ml_model
+    if _ml_model is None:
+        ml = MLEnsemble()
+        ml.train(test_assets_data)
+        _ml_model = ml
+    return _ml_model
 
 
 @app.post("/predict/ml")
@@ -1545,10 +1868,8 @@ async def predict_with_ml():
     if not ML_AVAILABLE:
         raise HTTPException(status_code=503, detail="Módulo ML não disponível. Instale: pip install httpx")
     try:
-        ml = MLEnsemble()
-        ml.train(test_assets_data)
-        
-        predictions = ml.predict_all(list(test_assets_data.keys()))
+        ml = _trained_ml()
+        predictions = await _run_engine(ml.predict_all, list(test_assets_data.keys()))
         
         return {
             "success": True,
@@ -1566,22 +1887,22 @@ async def combined_prediction():
         raise HTTPException(status_code=503, detail="Módulo ML não disponível. Instale: pip install httpx")
     try:
         # Análise de Momentum
-        momentum_results = MomentumAnalyzer.calculate_multiple_assets(test_assets_data)
+        momentum_results = _cached_momentum(test_assets_data)
         
         # Análise de Risco
         btc_data = test_assets_data["BTC"]
-        risk_analysis = RiskAnalyzer.calculate_irq(btc_data["prices"], btc_data["volumes"])
+        risk_analysis = _cached_irq(btc_data["prices"], btc_data["volumes"])
         irq_score = risk_analysis["irq_score"]
         
         # Predições ML
-        ml = MLEnsemble()
-        ml.train(test_assets_data)
-        ml_signals = ml.predict_all(list(test_assets_data.keys()))
+        ml = _trained_ml()
+        ml_signals = await _run_engine(ml.predict_all, list(test_assets_data.keys()))
         
         # Combinar recomendações
         combined_recommendations = []
+        ml_by_asset = {s["asset"]: s for s in ml_signals}
         for asset in test_assets_data.keys():
-            ml_signal = next((s for s in ml_signals if s["asset"] == asset), None)
+            ml_signal = ml_by_asset.get(asset)
             momentum_score = momentum_results[asset]["momentum_score"]
             
             if ml_signal:
@@ -1649,17 +1970,11 @@ def _build_bot_context() -> str:
     # Últimas entradas do log de auditoria
     audit_lines = []
     try:
-        import json as _json
-        _audit_path = Path(__file__).parent.parent / "data" / "audit_log.json"
-        if _audit_path.exists():
-            with open(_audit_path, "r", encoding="utf-8") as f:
-                _audit = _json.load(f)
-            recent = _audit[-8:] if isinstance(_audit, list) else []
-            for e in reversed(recent):
-                ts   = e.get("timestamp", "")[:16]
-                typ  = e.get("type", "")
-                note = e.get("note", "")[:120]
-                audit_lines.append(f"  [{ts}] {typ}: {note}")
+        for e in islice(reversed(_audit_log), 8):
+            ts   = e.get("timestamp", "")[:16]
+            typ  = e.get("action", "")
+            note = json.dumps(e.get("details", {}), ensure_ascii=False)[:120]
+            audit_lines.append(f"  [{ts}] {typ}: {note}")
     except Exception:
         pass
 
@@ -1983,7 +2298,8 @@ import time as _time_module
 import urllib.request as _urllib_req
 import xml.etree.ElementTree as _ET
 
-_news_cache: dict = {"data": {}, "ts": 0.0}
+# data = sentimento por ativo; raw = manchetes já formatadas para /market/events
+_news_cache: dict = {"data": {}, "raw": [], "ts": 0.0}
 _NEWS_TTL = 600  # 10 minutos
 
 _ASSET_KEYWORDS: dict = {
@@ -2086,16 +2402,9 @@ def _calc_rsi(prices: list, period: int = 14) -> float:
     """RSI usando suavização de Wilder."""
     if len(prices) < period + 1:
         return 50.0
-    gains, losses = [], []
-    for i in range(1, len(prices)):
-        d = prices[i] - prices[i - 1]
-        gains.append(max(d, 0.0))
-        losses.append(max(-d, 0.0))
-    avg_gain = sum(gains[:period]) / period
-    avg_loss = sum(losses[:period]) / period
-    for i in range(period, len(gains)):
-        avg_gain = (avg_gain * (period - 1) + gains[i]) / period
-        avg_loss = (avg_loss * (period - 1) + losses[i]) / period
+    if TALIB_AVAILABLE:
+        return round(rsi_talib(prices, period), 2)
+    avg_gain, avg_loss = wilder_rsi_nb(as_close_array(prices), period)
     if avg_loss == 0:
         return 100.0
     return round(100 - 100 / (1 + avg_gain / avg_loss), 2)
@@ -2212,7 +2521,7 @@ async def get_market_score():
             loop = asyncio.get_event_loop()
             raw = await loop.run_in_executor(None, _fetch_news_raw)
             sentiment_map = {a: _score_news(a, raw) for a in assets}
-            _news_cache = {"data": sentiment_map, "ts": now}
+            _news_cache = {"data": sentiment_map, "raw": _news_items(raw), "ts": now}
         else:
             sentiment_map = _news_cache["data"]
 
@@ -2307,28 +2616,25 @@ async def analyze_live_market(interval: str = "5m", limit: int = 25):
         if live_data and len(live_data) > 0:
             source_data.update(live_data)  # override with live
 
-        # 2. Analisar Momentum
-        momentum_results = MomentumAnalyzer.calculate_multiple_assets(source_data)
-        momentum_scores = {asset: data["momentum_score"] for asset, data in momentum_results.items()}
-
-        # 3. Analisar Risco (usando BTC como referência)
+        # 2+3. Momentum e Risco (BTC como referência) em paralelo, no pool das engines
         btc_data = source_data.get("BTC", {})
-        risk_analysis = RiskAnalyzer.calculate_irq(
-            btc_data.get("prices", []),
-            btc_data.get("volumes", []),
+        momentum_results, risk_analysis = await asyncio.gather(
+            _run_engine(MomentumAnalyzer.calculate_multiple_assets, source_data),
+            _run_engine(
+                RiskAnalyzer.calculate_irq,
+                btc_data.get("prices", []),
+                btc_data.get("volumes", []),
+            ),
         )
+        momentum_scores = {asset: data["momentum_score"] for asset, data in momentum_results.items()}
         irq_score = risk_analysis["irq_score"]
         protection = RiskAnalyzer.get_protection_level(irq_score)
 
-        # 4. Calcular Alocação
+        # 4. Alocação, Rebalanceamento e Métricas fora do event loop
         initial_capital = settings.INITIAL_CAPITAL
-        allocation = PortfolioManager.calculate_portfolio_allocation(
-            momentum_scores, irq_score, initial_capital,
+        allocation, rebalancing, risk_metrics = await _run_engine(
+            _allocation_pipeline, momentum_results, momentum_scores, irq_score, initial_capital,
         )
-        rebalancing = PortfolioManager.apply_rebalancing_rules(
-            allocation, momentum_results, initial_capital, irq_score,
-        )
-        risk_metrics = PortfolioManager.calculate_risk_metrics(allocation, initial_capital)
 
         # 5. Salvar análise no banco
         if DB_AVAILABLE:
@@ -2339,23 +2645,15 @@ async def analyze_live_market(interval: str = "5m", limit: int = 25):
             }, irq_score)
 
         live_count = len(live_data) if live_data else 0
-        return {
+        return _FastJSONResponse({
             "success": True,
             "message": f"Analise ao vivo ({live_count} live + {len(source_data)-live_count} test)",
             "source": "binance+yahoo+test",
             "data": {
-                "timestamp": datetime.utcnow(),
+                "timestamp": datetime.utcnow().isoformat(),
                 "interval": interval,
                 "assets_analyzed": len(source_data),
-                "momentum_analysis": {
-                    asset: {
-                        "momentum_score": momentum_results[asset]["momentum_score"],
-                        "trend_status": momentum_results[asset]["trend_status"],
-                        "classification": momentum_results[asset]["classification"],
-                        "return_pct": momentum_results[asset]["return_pct"],
-                    }
-                    for asset in momentum_results
-                },
+                "momentum_analysis": _momentum_view(momentum_results),
                 "risk_analysis": {
                     "irq_score": irq_score,
                     "level": protection["level"],
@@ -2372,15 +2670,10 @@ async def analyze_live_market(interval: str = "5m", limit: int = 25):
                     "rsi": risk_analysis["rsi"],
                 },
                 "allocations": rebalancing,
-                "portfolio_allocation": {
-                    "allocation": {
-                        asset: data["recommended_amount"]
-                        for asset, data in rebalancing.items()
-                    }
-                },
+                "portfolio_allocation": {"allocation": _allocation_view(rebalancing)},
                 "risk_metrics": risk_metrics,
             },
-        }
+        })
     except HTTPException:
         raise
     except Exception as e:
@@ -2415,10 +2708,7 @@ async def check_stop_loss_all():
             current_prices = await market_data_service.get_all_prices()
         else:
             # Usar último preço dos dados mock
-            current_prices = {
-                asset: data["prices"][-1]
-                for asset, data in test_assets_data.items()
-            }
+            current_prices = _last_prices_cache
 
         alerts = risk_manager.check_all_positions(current_prices)
         return {
@@ -2480,10 +2770,10 @@ async def get_analysis_history(limit: int = 20):
     """Histórico de análises salvas"""
     if not DB_AVAILABLE:
         return {"success": False, "message": "Banco de dados não disponível", "data": []}
-    return {
+    return _FastJSONResponse({
         "success": True,
         "data": db.get_analysis_history(limit=limit),
-    }
+    })
 
 
 # ═══════════════════════════════════════════
@@ -2493,7 +2783,7 @@ async def get_analysis_history(limit: int = 20):
 @app.get("/modules")
 async def list_modules():
     """Lista todos os módulos e seu status"""
-    return {
+    return _FastJSONResponse({
         "success": True,
         "data": {
             "engines": {
@@ -2518,7 +2808,7 @@ async def list_modules():
                 "allowed_assets": settings.ALLOWED_ASSETS,
             },
         },
-    }
+    })
 
 
 # ═══════════════════════════════════════════
@@ -2538,7 +2828,7 @@ def _ensure_data_dir():
 def _load_json(path: Path, default: dict) -> dict:
     try:
         if path.exists():
-            return json.loads(path.read_text(encoding="utf-8"))
+            return db_state.loads(path.read_bytes())
     except Exception:
         pass
     return default
@@ -2546,7 +2836,7 @@ def _load_json(path: Path, default: dict) -> dict:
 def _save_json(path: Path, obj: dict):
     _ensure_data_dir()
     try:
-        path.write_text(json.dumps(obj, indent=2, default=str), encoding="utf-8")
+        path.write_text(db_state.dumps_compact(obj), encoding="utf-8")
     except Exception:
         pass
 
@@ -2588,178 +2878,807 @@ _DEFAULT_PERF: dict = {
     "total_fx": 0.0,
     "total_min_fee_adj": 0.0,
 }
-_perf_state: dict = db_state.load_state("performance", dict(_DEFAULT_PERF))
+# Ciclos em memória (cauda do log append-only db_state.append_cycle)
+_PERF_CYCLES_KEEP = max(1, settings.MAX_IN_MEMORY_CYCLES)
 
 
-def _brt_now():
-    """Retorna datetime atual em BRT (UTC-3) — consistente em qualquer servidor."""
-    from datetime import timezone as _tz, timedelta as _td
-    return datetime.now(_tz(_td(hours=-3)))
+def _backfill_cycle_days(cycles: list) -> list:
+    """
+    Grava "day" (ordinal BRT) nos ciclos antigos que só têm o timestamp ISO —
+    feito uma vez no load para os filtros por dia não reparsearem strings.
+    """
+    for c in cycles:
+        if "day" not in c:
+            try:
+                c["day"] = date.fromisoformat(c.get("timestamp", "")[:10]).toordinal()
+            except ValueError:
+                c["day"] = 0
+    return cycles
 
 
-def _trade_log(event_type: str, asset: str, amount: float, note: str):
-    """Insere um evento no log de trading (máx 200 entradas) e persiste em disco."""
-    _trade_state["log"].insert(0, {
-        "timestamp": _brt_now().isoformat(),
-        "type": event_type,
-        "asset": asset,
-        "amount": round(amount, 2),
-        "note": note,
-    })
-    if len(_trade_state["log"]) > 200:
-        _trade_state["log"] = _trade_state["log"][:200]
-    db_state.save_state("trade_state", _trade_state)
+def _perf_with_cycles(blob: dict) -> dict:
+    """
+    Completa o blob "performance" com os ciclos do log append-only.
+    Blob legado (ciclos embutidos) com log vazio → migra os ciclos para o log.
+    """
+    legacy = blob.pop("cycles", None)
+    if legacy and not db_state.load_cycles(1):
+        db_state.append_cycles(legacy)
+        blob["cycles"] = legacy[-_PERF_CYCLES_KEEP:]
+    else:
+        blob["cycles"] = db_state.load_cycles(_PERF_CYCLES_KEEP)
+    _backfill_cycle_days(blob["cycles"])
+    # Estados anteriores aos acumuladores: calcula uma vez a partir dos ciclos;
+    # daí em diante _record_cycle_performance os mantém incrementalmente
+    for key, sign in (("total_gain", 1), ("total_loss", -1)):
+        if key not in blob:
+            blob[key] = round(sum(abs(p) for p in (c.get("pnl", 0) or 0 for c in blob["cycles"]) if p * sign > 0), 4)
+    return blob
+
+
+def _save_perf():
+    """Persiste os agregados de performance — os ciclos já estão no log."""
+    db_state.save_state("performance", _perf_snapshot())
+
+
+def _perf_snapshot() -> dict:
+    return {k: v for k, v in _perf_state.items() if k != "cycles"}
+
+
+# ── Persistência adiada (dirty flag + flusher) ───────────────────────────────
+# _trade_log e o registro de ciclo só marcam a chave como suja; o _state_flusher
+# junta tudo que chegar numa janela de _STATE_FLUSH_DELAY e grava uma vez. A
+# serialização é feita no event loop (snapshot consistente) e o I/O (PG + JSON)
+# numa thread. Sem o flusher rodando (scripts, antes do lifespan) grava na hora.
+_STATE_FLUSH_DELAY = 0.5
+_STATE_SNAPSHOTS = {
+    "trade_state": lambda: _trade_state,
+    "performance": lambda: _perf_snapshot(),
+}
+_dirty_state_keys: set = set()
+_state_dirty: Optional[asyncio.Event] = None
 
 
-# Flag de segurança: garantir que o primeiro save não sobrescreva dados do DB
-_perf_db_safety_checked: bool = False
+def _mark_state_dirty(key: str):
+    if _state_dirty is None:
+        db_state.save_state(key, _STATE_SNAPSHOTS[key]())
+        return
+    _dirty_state_keys.add(key)
+    _state_dirty.set()
 
 
-def _record_cycle_performance(pnl: float, capital: float, irq: float,
-                               pnl_5m: float = 0.0, pnl_1h: float = 0.0, pnl_1d: float = 0.0,
-                               costs: dict = None,
-                               pnl_mr: float = 0.0, pnl_bo: float = 0.0, pnl_sq: float = 0.0,
-                               pnl_ls: float = 0.0, pnl_fvg: float = 0.0,
-                               pnl_vr: float = 0.0, pnl_pb: float = 0.0):
-    """Registra o P&L de um ciclo no histórico de performance."""
-    global _perf_db_safety_checked, _perf_state
-    # ── SAFETY MERGE: no primeiro ciclo após startup, verifica se o DB tem mais ciclos ──
-    # Isso previne sobrescrever histórico válido quando o estado em memória começou vazio
-    if not _perf_db_safety_checked:
-        _perf_db_safety_checked = True
-        try:
-            db_saved = db_state.load_state("performance", {})
-            db_cycles_count = len(db_saved.get("cycles", []))
-            mem_cycles_count = len(_perf_state.get("cycles", []))
-            if db_cycles_count > mem_cycles_count:
-                print(
-                    f"[perf] SAFETY MERGE: DB tem {db_cycles_count} ciclos, memória tem {mem_cycles_count}. "
-                    f"Restaurando histórico do DB antes de salvar.",
-                    flush=True,
-                )
-                _perf_state.update(db_saved)
-            else:
-                print(f"[perf] Safety check OK: memória={mem_cycles_count} ciclos, DB={db_cycles_count}", flush=True)
-        except Exception as _se:
-            print(f"[perf] Aviso no safety merge: {_se}", flush=True)
-    cst = costs or {}
-    _perf_state["cycles"].append({
-        "timestamp": _brt_now().isoformat(),
-        "pnl":       round(pnl, 4),
-        "pnl_5m":    round(pnl_5m, 4),
-        "pnl_1h":    round(pnl_1h, 4),
-        "pnl_1d":    round(pnl_1d, 4),
-        "pnl_mr":    round(pnl_mr, 4),
-        "pnl_bo":    round(pnl_bo, 4),
-        "pnl_sq":    round(pnl_sq, 4),
-        "pnl_ls":    round(pnl_ls, 4),
-        "pnl_fvg":   round(pnl_fvg, 4),
-        "pnl_vr":    round(pnl_vr, 4),
-        "pnl_pb":    round(pnl_pb, 4),
-        "fees_total": round(cst.get("total", 0.0), 6),
-        "fees_brokerage": round(cst.get("brokerage", 0.0), 6),
-        "fees_exchange": round(cst.get("exchange_fees", 0.0), 6),
-        "fees_spread": round(cst.get("spread", 0.0), 6),
-        "fees_slippage": round(cst.get("slippage", 0.0), 6),
-        "fees_fx": round(cst.get("fx", 0.0), 6),
-        "fees_min_adj": round(cst.get("min_fee_adj", 0.0), 6),
-        "capital":   round(capital, 2),
-        "irq":       round(irq, 4),
-    })
-    # manter máx 500 ciclos
-    if len(_perf_state["cycles"]) > 500:
-        _perf_state["cycles"] = _perf_state["cycles"][-500:]
+def _take_state_snapshots() -> list:
+    keys = list(_dirty_state_keys)
+    _dirty_state_keys.clear()
+    return [(key, db_state.dumps_compact(_STATE_SNAPSHOTS[key]())) for key in keys]
 
-    _perf_state["total_pnl_history"].append(round(capital + pnl, 2))
-    if len(_perf_state["total_pnl_history"]) > 500:
-        _perf_state["total_pnl_history"] = _perf_state["total_pnl_history"][-500:]
 
-    if pnl > 0:
-        _perf_state["win_count"] = _perf_state.get("win_count", 0) + 1
-        if pnl > _perf_state.get("best_day_pnl", 0.0):
-            _perf_state["best_day_pnl"] = round(pnl, 4)
-        _perf_state["total_gain"] = round(_perf_state.get("total_gain", 0.0) + pnl, 4)
-    elif pnl < 0:
-        _perf_state["loss_count"] = _perf_state.get("loss_count", 0) + 1
-        if pnl < _perf_state.get("worst_day_pnl", 0.0):
-            _perf_state["worst_day_pnl"] = round(pnl, 4)
-        _perf_state["total_loss"] = round(_perf_state.get("total_loss", 0.0) + abs(pnl), 4)
+def _write_state_snapshots(snapshots: list):
+    for key, text in snapshots:
+        db_state.save_state_text(key, text)
 
-    _perf_state["total_fees"] = round(_perf_state.get("total_fees", 0.0) + cst.get("total", 0.0), 6)
-    _perf_state["total_brokerage"] = round(_perf_state.get("total_brokerage", 0.0) + cst.get("brokerage", 0.0), 6)
-    _perf_state["total_exchange_fees"] = round(_perf_state.get("total_exchange_fees", 0.0) + cst.get("exchange_fees", 0.0), 6)
-    _perf_state["total_spread"] = round(_perf_state.get("total_spread", 0.0) + cst.get("spread", 0.0), 6)
-    _perf_state["total_slippage"] = round(_perf_state.get("total_slippage", 0.0) + cst.get("slippage", 0.0), 6)
-    _perf_state["total_fx"] = round(_perf_state.get("total_fx", 0.0) + cst.get("fx", 0.0), 6)
-    _perf_state["total_min_fee_adj"] = round(_perf_state.get("total_min_fee_adj", 0.0) + cst.get("min_fee_adj", 0.0), 6)
 
-    # SAFETY: nunca sobrescrever DB se ele tiver mais ciclos (previne perda de histórico)
+async def _state_flusher():
+    """Grava as chaves sujas em lote: uma escrita por janela em vez de uma por evento."""
+    write = None
     try:
-        db_current = db_state.load_state("performance", {})
-        db_cycle_count = len(db_current.get("cycles", []))
-        mem_cycle_count = len(_perf_state.get("cycles", []))
-        if db_cycle_count > mem_cycle_count + 1:  # margem de 1 para o ciclo que acabou de rodar
-            print(f"[perf] BLOQUEADO: DB tem {db_cycle_count} ciclos, mem tem {mem_cycle_count}. "
-                  f"Não sobrescrevendo!", flush=True)
-            # Restaurar do DB e adicionar o ciclo atual
-            _perf_state.update(db_current)
-            _perf_state["cycles"].append({
-                "timestamp": _brt_now().isoformat(),
-                "pnl": round(pnl, 4), "capital": round(capital, 2), "irq": round(irq, 4),
-                "pnl_5m": round(pnl_5m, 4), "pnl_1h": round(pnl_1h, 4), "pnl_1d": round(pnl_1d, 4),
-                "fees_total": round(cst.get("total", 0.0), 6),
-            })
-    except Exception as _safe_e:
-        print(f"[perf] Aviso no safety check: {_safe_e}", flush=True)
+        while True:
+            await _state_dirty.wait()
+            await asyncio.sleep(_STATE_FLUSH_DELAY)  # coalesce a rajada do ciclo
+            _state_dirty.clear()
+            write = asyncio.ensure_future(asyncio.to_thread(_write_state_snapshots, _take_state_snapshots()))
+            await asyncio.shield(write)
+    finally:
+        # Cancelar não para a thread: espera a escrita em voo terminar para o
+        # flush final não competir com ela (e o snapshot mais novo gravar por último)
+        if write is not None and not write.done():
+            await asyncio.wait({write})
+        _write_state_snapshots(_take_state_snapshots())
 
-    db_state.save_state("performance", _perf_state)
 
+_perf_state: dict = _perf_with_cycles(db_state.load_state("performance", dict(_DEFAULT_PERF)))
 
-@app.get("/trade/status")
-async def trade_status():
-    """Retorna o estado atual do trading: capital, posições, log de eventos."""
-    _, session_label, _ = _current_session()
-    # Capital efetivo = capital base + ganho/perda acumulado do dia (BRT)
-    from datetime import timezone as _tz, timedelta as _td
-    _brt = _tz(_td(hours=-3))
-    today_str = datetime.now(_brt).strftime("%Y-%m-%d")
-    today_cycles = [c for c in _perf_state.get("cycles", []) if c.get("timestamp", "").startswith(today_str)]
-    pnl_today_live = round(sum(c.get("pnl", 0) for c in today_cycles), 2)
-    # Subtrai baseline do dia (ganhos com capital anterior ao reset)
-    # Só aplica baseline se foi definido no mesmo dia de hoje (não persiste entre dias)
-    pnl_today_baseline = 0.0
-    if _trade_state.get("pnl_today_baseline_date") == today_str:
-        pnl_today_baseline = _trade_state.get("pnl_today_baseline", 0.0)
-    pnl_today_live = round(pnl_today_live - pnl_today_baseline, 2)
-    capital_base = _trade_state.get("capital", settings.INITIAL_CAPITAL)
-    capital_efetivo = round(capital_base + pnl_today_live, 2)
 
-    # ── Capital Split BRL vs USD ─────────────────────────────────────────
-    # Tenta cotação live do USD/BRL via brokers integrados (AV → Yahoo → fallback)
-    usd_rate = settings.USD_BRL_RATE
-    try:
-        if market_data_service:
-            live_rate = await market_data_service.get_usd_brl_rate()
-            if live_rate and live_rate > 0:
-                usd_rate = round(live_rate, 4)
-    except Exception:
-        pass
+def _brt_now():
+    """Retorna datetime atual em BRT (UTC-3) — consistente em qualquer servidor."""
+    return datetime.now(_BRT)
 
-    capital_brl      = round(capital_efetivo * settings.CAPITAL_BRL_PCT, 2)   # ex: 40% em R$
-    capital_usd_brl  = round(capital_efetivo * settings.CAPITAL_USD_PCT, 2)   # ex: 60% ainda em R$
-    capital_usd      = round(capital_usd_brl / usd_rate, 2)                   # convertido para USD
 
-    return {
-        "success": True,
-        "data": {
-            "capital":          capital_base,
+# ── Índice por dia dos ciclos (bisect) ────────────────────────────────────────
+# Cada ciclo guarda "day" (ordinal da data BRT) e "ts" (epoch em segundos);
+# ciclos são append-only e ordenados no tempo, então "day" é monotônico e o
+# bisect acha o início de um dia em O(log N) com comparação de inteiros.
+# Ciclos antigos (antes desses campos) derivam o dia do prefixo do timestamp.
+_today_pnl_cache: dict = {"key": None, "pnl": 0.0}
+
+
+def _cycle_day(c: dict) -> int:
+    """Ordinal da data BRT do ciclo."""
+    d = c.get("day")
+    if d is None:
+        try:
+            d = date.fromisoformat(c.get("timestamp", "")[:10]).toordinal()
+        except ValueError:
+            d = 0
+    return d
+
+
+def _day_ord(day) -> int:
+    """Aceita ordinal (int) ou 'YYYY-MM-DD'."""
+    return day if isinstance(day, int) else date.fromisoformat(day).toordinal()
+
+
+def _cycles_since_day(day) -> list:
+    """Retorna os ciclos a partir do dia `day` (ordinal ou YYYY-MM-DD) via bisect."""
+    cycles = _perf_state.get("cycles", [])
+    i = bisect_left(cycles, _day_ord(day), key=_cycle_day)
+    return cycles[i:]
+
+
+# Índice dia → ciclos dos últimos _DAY_INDEX_KEEP dias, mantido no append.
+# Não é persistido (duplicaria os ciclos no JSON) — reconstruído se o histórico
+# mudar por fora do append (reset/restore), detectado pelo último timestamp.
+_DAY_INDEX_KEEP = 30
+_cycles_by_day: dict = {"days": {}, "last_ts": None, "ready": False}
+
+
+def _day_index_rebuild():
+    cycles = _perf_state.get("cycles", [])
+    days: dict = {}
+    if cycles:
+        oldest = _cycle_day(cycles[-1]) - _DAY_INDEX_KEEP
+        for c in _cycles_since_day(oldest):
+            days.setdefault(_cycle_day(c), []).append(c)
+    _cycles_by_day["days"] = days
+    _cycles_by_day["last_ts"] = cycles[-1].get("timestamp") if cycles else None
+    _cycles_by_day["ready"] = True
+
+
+def _day_index_add(cycle: dict):
+    """Indexa um ciclo recém-anexado e despeja dias fora da janela."""
+    cycles = _perf_state.get("cycles", [])
+    prev_ts = cycles[-2].get("timestamp") if len(cycles) >= 2 else None
+    if not _cycles_by_day["ready"] or _cycles_by_day["last_ts"] != prev_ts:
+        _cycles_by_day["ready"] = False
+        return
+    d = _cycle_day(cycle)
+    days = _cycles_by_day["days"]
+    days.setdefault(d, []).append(cycle)
+    _cycles_by_day["last_ts"] = cycle.get("timestamp")
+    for old in [k for k in days if k < d - _DAY_INDEX_KEEP]:
+        del days[old]
+
+
+def _day_index_trim(dropped: list):
+    """Tira do índice os ciclos cortados da cabeça de _perf_state["cycles"] (mais antigos primeiro)."""
+    if not _cycles_by_day["ready"]:
+        return
+    days = _cycles_by_day["days"]
+    counts: dict = {}
+    for c in dropped:
+        d = _cycle_day(c)
+        counts[d] = counts.get(d, 0) + 1
+    for d, m in counts.items():
+        bucket = days.get(d)
+        if bucket is None:
+            continue
+        del bucket[:m]
+        if not bucket:
+            del days[d]
+
+
+def _cycles_on_day(day) -> list:
+    """Ciclos de um único dia (ordinal ou YYYY-MM-DD) — O(1) via índice para dias recentes."""
+    d = _day_ord(day)
+    cycles = _perf_state.get("cycles", [])
+    last_ts = cycles[-1].get("timestamp") if cycles else None
+    if not _cycles_by_day["ready"] or _cycles_by_day["last_ts"] != last_ts:
+        _day_index_rebuild()
+    days = _cycles_by_day["days"]
+    if d in days or (days and d >= min(days)):
+        return days.get(d, [])
+    return [c for c in _cycles_since_day(d) if _cycle_day(c) == d]
+
+
+def _today_cycles_pnl(day_str: str) -> float:
+    """Soma do P&L dos ciclos de `day_str`, cacheada por (dia, nº ciclos, último ts)."""
+    cycles = _perf_state.get("cycles", [])
+    key = (day_str, len(cycles), cycles[-1].get("timestamp") if cycles else None)
+    if _today_pnl_cache["key"] != key:
+        _today_pnl_cache["key"] = key
+        _today_pnl_cache["pnl"] = round(sum(c.get("pnl", 0) for c in _cycles_on_day(day_str)), 2)
+    return _today_pnl_cache["pnl"]
+
+
+# ── P&L diário/semanal incremental ────────────────────────────────────────────
+# Acumuladores atualizados em O(1) a cada ciclo registrado; a janela semanal é
+# uma deque de (dia ordinal, pnl) despejada pela esquerda. Fica fora do
+# _perf_state (não é persistida) — é reconstruída dos ciclos se o histórico
+# mudar por fora (reset, restore, safety merge), detectado pelo último timestamp.
+_pnl_window: dict = {"day": 0, "week_ago": 0, "today_pnl": 0.0, "week_pnl": 0.0,
+                     "week": deque(), "last_ts": None}
+
+
+def _pnl_window_rebuild(today: int, week_ago: int):
+    w = _pnl_window
+    w["week"] = deque()
+    w["today_pnl"] = w["week_pnl"] = 0.0
+    for c in _cycles_since_day(week_ago):
+        day, p = _cycle_day(c), c.get("pnl", 0)
+        w["week"].append((day, p))
+        w["week_pnl"] += p
+        if day == today:
+            w["today_pnl"] += p
+    cycles = _perf_state.get("cycles", [])
+    w["day"], w["week_ago"] = today, week_ago
+    w["last_ts"] = cycles[-1].get("timestamp") if cycles else None
+
+
+def _pnl_window_roll(today: int, week_ago: int):
+    """
+    Vira o dia e despeja da janela os dias anteriores a week_ago. O today_pnl do
+    novo dia sai da própria janela: um ciclo iniciado antes da meia-noite e
+    registrado depois já entrou na deque com o dia novo antes de qualquer read.
+    """
+    w = _pnl_window
+    if w["day"] != today:
+        w["day"] = today
+        w["today_pnl"] = sum(p for d, p in w["week"] if d == today)
+    if w["week_ago"] != week_ago:
+        w["week_ago"] = week_ago
+        while w["week"] and w["week"][0][0] < week_ago:
+            w["week_pnl"] -= w["week"].popleft()[1]
+
+
+def _pnl_window_add(cycle: dict):
+    """Registra um ciclo recém-anexado em _perf_state["cycles"]."""
+    w = _pnl_window
+    cycles = _perf_state.get("cycles", [])
+    prev_ts = cycles[-2].get("timestamp") if len(cycles) >= 2 else None
+    if not w["day"] or w["last_ts"] != prev_ts:
+        w["day"] = 0  # janela fora de sincronia — o próximo read reconstrói
+        return
+    w["last_ts"] = cycle.get("timestamp", "")
+    day, p = _cycle_day(cycle), cycle.get("pnl", 0)
+    w["week"].append((day, p))
+    w["week_pnl"] += p
+    if day == w["day"]:
+        w["today_pnl"] += p
+
+
+def _today_week_pnl(now) -> tuple:
+    """Retorna (pnl_hoje, pnl_7_dias) dos ciclos já registrados, em O(1) amortizado."""
+    today = now.toordinal()
+    week_ago = today - 7
+    cycles = _perf_state.get("cycles", [])
+    last_ts = cycles[-1].get("timestamp") if cycles else None
+    if not _pnl_window["day"] or _pnl_window["last_ts"] != last_ts:
+        _pnl_window_rebuild(today, week_ago)
+    else:
+        _pnl_window_roll(today, week_ago)
+    return _pnl_window["today_pnl"], _pnl_window["week_pnl"]
+
+
+# ── Rollup diário persistido para o /performance/history ────────────────────
+# _perf_state["by_day"] guarda os totais por dia "YYYY-MM-DD" e é atualizado no
+# registro de cada ciclo, então o endpoint anda por D dias em vez de N ciclos.
+# Estados antigos (sem by_day) ou restaurados são reconstruídos dos ciclos.
+def _rollup_append(cycle: dict):
+    """Soma um ciclo recém-registrado no rollup diário."""
+    ts = cycle.get("timestamp", "")
+    if not ts:
+        return
+    by_day = _perf_state.get("by_day")
+    if by_day is None:
+        _rollup_rebuild()
+        return
+    day = ts[:10]
+    d = by_day.get(day)
+    if d is None:
+        # Dias entram em ordem cronológica, então o dict já fica ordenado;
+        # só reordena no caso raro de um dia fora de ordem (ex.: restore parcial)
+        out_of_order = bool(by_day) and day < next(reversed(by_day))
+        d = by_day[day] = {
+            "pnl": 0.0, "pnl_5m": 0.0, "pnl_1h": 0.0, "pnl_1d": 0.0,
+            "cycles": 0, "wins": 0, "losses": 0,
+            "best_cycle": 0.0, "worst_cycle": 0.0,
+        }
+        if out_of_order:
+            _perf_state["by_day"] = dict(sorted(by_day.items()))
+    pnl = cycle.get("pnl", 0) or 0.0
+    d["pnl"]    += pnl
+    d["pnl_5m"] += cycle.get("pnl_5m", 0) or 0.0
+    d["pnl_1h"] += cycle.get("pnl_1h", 0) or 0.0
+    d["pnl_1d"] += cycle.get("pnl_1d", 0) or 0.0
+    d["cycles"] += 1
+    if pnl > 0:
+        d["wins"] += 1
+        if pnl > d["best_cycle"]:
+            d["best_cycle"] = pnl
+    elif pnl < 0:
+        d["losses"] += 1
+        if pnl < d["worst_cycle"]:
+            d["worst_cycle"] = pnl
+
+
+def _rollup_rebuild():
+    """Reconstrói o rollup diário a partir dos ciclos em memória."""
+    _perf_state["by_day"] = {}
+    for c in _perf_state.get("cycles", []):
+        _rollup_append(c)
+
+
+# ── Colunas NumPy (SoA) dos ciclos para o /performance ───────────────────────
+# Um array float64 por campo numérico + "day" (ordinal BRT), mantidos em
+# paralelo a _perf_state["cycles"]: append no registro do ciclo e rebuild se o
+# histórico mudar por fora (reset/restore/safety merge), detectado por
+# (nº de ciclos, último timestamp). Sem NumPy o /performance soma em Python.
+_PERF_FIELDS = (
+    "pnl", "pnl_5m", "pnl_1h", "pnl_1d",
+    "pnl_mr", "pnl_bo", "pnl_sq", "pnl_ls", "pnl_fvg", "pnl_vr", "pnl_pb",
+    "fees_total", "fees_brokerage", "fees_exchange", "fees_spread", "fees_slippage", "fees_fx",
+)
+_PERF_BUCKETS = ("pnl_mr", "pnl_bo", "pnl_sq", "pnl_ls", "pnl_fvg", "pnl_vr", "pnl_pb")
+_perf_arrays: dict = {"n": -1, "last_ts": None, "cols": {}, "buf": {}, "start": 0, "end": 0}
+
+
+def _perf_arrays_views():
+    """Colunas expostas = fatias (views, sem cópia) da janela viva [start:end) dos buffers."""
+    a = _perf_arrays
+    s, e = a["start"], a["end"]
+    a["cols"] = {f: buf[s:e] for f, buf in a["buf"].items()}
+
+
+def _perf_arrays_rebuild():
+    cycles = _perf_state.get("cycles", [])
+    n = len(cycles)
+    # Capacidade 2× a janela: os appends escrevem no fim e só recompactam (uma
+    # cópia da janela para o início) a cada ~_PERF_CYCLES_KEEP ciclos — O(1) amortizado
+    cap = max(2 * _PERF_CYCLES_KEEP, 2 * n, 16)
+    buf = {}
+    for f in _PERF_FIELDS:
+        buf[f] = np.empty(cap, dtype=np.float64)
+        buf[f][:n] = np.fromiter(((c.get(f, 0) or 0) for c in cycles), dtype=np.float64, count=n)
+    buf["day"] = np.empty(cap, dtype=np.int64)
+    buf["day"][:n] = np.fromiter((_cycle_day(c) for c in cycles), dtype=np.int64, count=n)
+    _perf_arrays.update(buf=buf, start=0, end=n, n=n,
+                        last_ts=cycles[-1].get("timestamp") if cycles else None)
+    _perf_arrays_views()
+
+
+def _perf_arrays_add(cycle: dict):
+    """Anexa um ciclo recém-registrado às colunas (chamar depois do corte de 500)."""
+    if not NUMPY_AVAILABLE:
+        return
+    a = _perf_arrays
+    cycles = _perf_state.get("cycles", [])
+    prev_ts = cycles[-2].get("timestamp") if len(cycles) >= 2 else None
+    if a["n"] < 0 or a["last_ts"] != prev_ts:
+        a["n"] = -1  # fora de sincronia — o próximo read reconstrói
+        return
+    n = len(cycles)
+    bufs = a["buf"]
+    s, e = a["start"], a["end"]
+    if e == bufs["day"].shape[0]:
+        # Buffer cheio: traz os n-1 ciclos vivos para o início
+        live = min(e - s, n - 1)
+        for buf in bufs.values():
+            buf[:live] = buf[e - live:e]
+        s, e = 0, live
+    for f in _PERF_FIELDS:
+        bufs[f][e] = cycle.get(f, 0) or 0
+    bufs["day"][e] = _cycle_day(cycle)
+    e += 1
+    a["start"], a["end"] = max(s, e - n), e
+    a["n"] = n
+    a["last_ts"] = cycle.get("timestamp")
+    _perf_arrays_views()
+
+
+def _perf_columns() -> dict:
+    """Colunas SoA em sincronia com _perf_state["cycles"] (reconstrói se defasadas). Requer NumPy."""
+    cycles = _perf_state.get("cycles", [])
+    a = _perf_arrays
+    last_ts = cycles[-1].get("timestamp") if cycles else None
+    if a["n"] != len(cycles) or a["last_ts"] != last_ts:
+        _perf_arrays_rebuild()
+    return a["cols"]
+
+
+def _perf_aggregates(today: int) -> dict:
+    """
+    Somatórios do /performance numa passada: totais e de hoje por campo,
+    ganho/perda de hoje, média/desvio do P&L e contagens por bucket para win rate.
+    """
+    cycles = _perf_state.get("cycles", [])
+    if NUMPY_AVAILABLE:
+        cols = _perf_columns()
+        p = cols["pnl"]
+        mask = cols["day"] == today
+        pt = p[mask]
+        return {
+            "n": int(p.shape[0]),
+            "mu": float(p.mean()) if p.shape[0] else 0.0,
+            "sigma": float(p.std(ddof=1)) if p.shape[0] >= 2 else 0.0,
+            "total": {f: float(cols[f].sum()) for f in _PERF_FIELDS},
+            "today": {f: float(cols[f][mask].sum()) for f in _PERF_FIELDS},
+            "today_n": int(pt.shape[0]),
+            "today_gain": float(pt[pt > 0].sum()),
+            "today_loss": float(-pt[pt < 0].sum()),
+            "bucket_wr": {k: (int(np.count_nonzero(cols[k])), int(np.count_nonzero(cols[k] > 0)))
+                          for k in _PERF_BUCKETS},
+        }
+
+    total = dict.fromkeys(_PERF_FIELDS, 0.0)
+    tday = dict.fromkeys(_PERF_FIELDS, 0.0)
+    nz = dict.fromkeys(_PERF_BUCKETS, 0)
+    pos = dict.fromkeys(_PERF_BUCKETS, 0)
+    today_gain = today_loss = 0.0
+    today_n = 0
+    pnls = []
+    for c in cycles:
+        is_today = _cycle_day(c) == today
+        today_n += is_today
+        for f in _PERF_FIELDS:
+            v = c.get(f, 0) or 0
+            total[f] += v
+            if is_today:
+                tday[f] += v
+        for k in _PERF_BUCKETS:
+            v = c.get(k, 0) or 0
+            if v != 0:
+                nz[k] += 1
+                pos[k] += v > 0
+        p = c.get("pnl", 0) or 0
+        pnls.append(p)
+        if is_today:
+            if p > 0:
+                today_gain += p
+            elif p < 0:
+                today_loss -= p
+    return {
+        "n": len(pnls),
+        "mu": _stats.mean(pnls) if pnls else 0.0,
+        "sigma": _stats.stdev(pnls) if len(pnls) >= 2 else 0.0,
+        "total": total,
+        "today": tday,
+        "today_n": today_n,
+        "today_gain": today_gain,
+        "today_loss": today_loss,
+        "bucket_wr": {k: (nz[k], pos[k]) for k in _PERF_BUCKETS},
+    }
+
+
+# Buffers de trabalho reaproveitados entre requests (equity tem no máx. ~500 pontos)
+# + último resultado, chaveado pela versão do histórico (_perf_cache) e nº de pontos:
+# sem ciclo novo as misses do cache de /performance (outros fields, capital) não recalculam
+_dd_scratch: dict = {"peak": None, "dd": None, "key": None, "value": 0.0}
+
+
+def _max_drawdown_pct(equity: list) -> float:
+    """Max drawdown (%) da equity curve — np.maximum.accumulate quando há NumPy."""
+    n = len(equity)
+    if n <= 1:
+        return 0.0
+    key = (_perf_cache["version"], n, equity[-1])
+    if _dd_scratch["key"] == key:
+        return _dd_scratch["value"]
+    _dd_scratch["key"] = key
+    _dd_scratch["value"] = value = _max_drawdown_calc(equity, n)
+    return value
+
+
+def _max_drawdown_calc(equity, n: int) -> float:
+    if NUMPY_AVAILABLE:
+        # fromiter com count: a equity é um deque, sem buffer contíguo para asarray
+        eq = np.fromiter(equity, dtype=np.float64, count=n)
+        if _dd_scratch["peak"] is None or _dd_scratch["peak"].shape[0] < n:
+            _dd_scratch["peak"] = np.empty(max(n, 512), dtype=np.float64)
+            _dd_scratch["dd"] = np.empty(max(n, 512), dtype=np.float64)
+        peak = np.maximum.accumulate(eq, out=_dd_scratch["peak"][:n])
+        dd = _dd_scratch["dd"][:n]
+        np.subtract(eq, peak, out=dd)
+        np.divide(dd, peak, out=dd, where=peak > 0)
+        dd[peak <= 0] = 0.0
+        return min(0.0, float(dd.min()) * 100)
+    max_dd = 0.0
+    peak = equity[0]
+    for v in equity:
+        peak = max(peak, v)
+        dd = (v - peak) / peak * 100 if peak > 0 else 0
+        max_dd = min(max_dd, dd)
+    return max_dd
+
+
+# ── Cache das respostas de /performance e /performance/history ──────────────
+# Dashboards fazem polling; sem ciclo novo a resposta é idêntica. A chave usa
+# uma versão bumpada em toda mutação do histórico (registro de ciclo, reset,
+# restore, backtest) + (nº de ciclos, último timestamp). Históricos pequenos
+# (<= _PERF_CACHE_MIN_CYCLES) não são cacheados — recalcular é barato.
+_PERF_CACHE_MIN_CYCLES = 32
+_perf_cache: dict = {"version": 0, "perf": (None, None), "history": (None, None)}
+
+
+def _perf_touch():
+    """Invalida as respostas cacheadas de performance."""
+    _perf_cache["version"] += 1
+
+
+def _perf_cache_key(*extra) -> tuple:
+    cycles = _perf_state.get("cycles", [])
+    if len(cycles) <= _PERF_CACHE_MIN_CYCLES:
+        return None
+    return (_perf_cache["version"], len(cycles), cycles[-1].get("timestamp"), *extra)
+
+
+# ── Templates de notas do log ────────────────────────────────────────────────
+# Eventos recorrentes são gravados como {"tpl": id, "args": [...]} em vez do
+# texto pronto — o JSON persistido fica menor e a nota só é formatada na API.
+class LogTpl(IntEnum):
+    CAPITAL_CHANGE = 1
+    PNL_BASELINE   = 2
+    HARD_STOP      = 3
+    RECOVERY       = 4
+    RESUME         = 5
+    LOSS_REDUCE    = 6
+    SMART_RESUME   = 7
+    SMART_PAUSE    = 8
+    WEEKLY_REDUCE  = 9
+    TRAILING_STOP  = 10
+    STOP_LOSS_1D   = 11
+    STOP_LOSS_ATR  = 12
+    PARTIAL_TP     = 13
+    TAKE_PROFIT_ATR = 14
+
+
+_LOG_TEMPLATES: dict = {
+    LogTpl.CAPITAL_CHANGE: "Capital {} de R$ {:.2f} → R$ {:.2f} | PnL baseline fixado em R$ {:.2f}",
+    LogTpl.PNL_BASELINE:   "🔄 PnL baseline fixado em R$ {:.2f} — nova simulação R$ {:.2f}",
+    LogTpl.HARD_STOP:      "🔴 {} — necessário reset manual",
+    LogTpl.RECOVERY:       "✅ Recuperação! {} perdas seguidas → volta 100% tamanho",
+    LogTpl.RESUME:         "▶️ Bot retomou operação normal — ciclo lucrativo detectado",
+    LogTpl.LOSS_REDUCE:    "⚠️ {} perdas seguidas → tamanho reduzido para {:.0f}%",
+    LogTpl.SMART_RESUME:   "🔄 Momentum forte ({:.2f}) detectado — retomando com 50% do tamanho",
+    LogTpl.SMART_PAUSE:    "⏸️ Smart Pause ativado: Perda diária R$ {:.2f} > limite R$ {:.2f}",
+    LogTpl.WEEKLY_REDUCE:  "📉 Perda semanal R$ {:.2f} > limite R$ {:.2f} → opera com 25%",
+    LogTpl.TRAILING_STOP:  "📊 Trailing Stop {}: pico R$ {:.4f} → atual {:.4f} (-{:.2f}%)",
+    LogTpl.STOP_LOSS_1D:   "🛑 SL Swing 1d {}: -2% atingido — saindo posição swing",
+    LogTpl.STOP_LOSS_ATR:  "🛑 ATR Stop Loss {}: {:.2f}% (ATR SL={:.2f}%)",
+    LogTpl.PARTIAL_TP:     "💰 Partial TP {}: +{:.1f}% em {:.0f}% da posição = R$ {:.4f}",
+    LogTpl.TAKE_PROFIT_ATR: "💰 ATR Take Profit {}: +{:.2f}% (ATR TP={:.2f}%)",
+}
+
+
+def _log_args(args) -> list:
+    """Args de template prontos para o JSON do estado (escalares NumPy viram Python)."""
+    return [a.item() if hasattr(a, "item") else a for a in args]
+
+
+_log_tpl_errors: set = set()
+
+
+def _render_log_entry(entry: dict) -> dict:
+    """Formata a nota de um evento gravado por template (usado na fronteira da API)."""
+    if "tpl" not in entry:
+        return entry
+    try:
+        note = _LOG_TEMPLATES[LogTpl(entry["tpl"])].format(*entry.get("args", []))
+    except (ValueError, KeyError, IndexError) as e:
+        # Template desconhecido ou args que não casam: avisa uma vez por template
+        if entry["tpl"] not in _log_tpl_errors:
+            _log_tpl_errors.add(entry["tpl"])
+            print(f"[log] Falha ao formatar template {entry['tpl']} com args {entry.get('args')}: {e!r}", flush=True)
+        note = ""
+    out = {k: v for k, v in entry.items() if k not in ("tpl", "args")}
+    out["note"] = note
+    return out
+
+
+# ── Buffers limitados (deque maxlen) ─────────────────────────────────────────
+# Log de trading (mais recente à esquerda) e equity curve: appendleft/append O(1)
+# e o descarte do excedente é feito pelo próprio deque. Estado recarregado do DB
+# ou restaurado via /admin chega como lista — os helpers convertem no 1º uso.
+_TRADE_LOG_MAX = db_state.TRADE_LOG_MAX
+
+
+def _log_buffer() -> deque:
+    log = _trade_state.get("log")
+    if not isinstance(log, deque):
+        log = _trade_state["log"] = db_state.trade_log_buffer(log)
+    return log
+
+
+def _equity_buffer() -> deque:
+    equity = _perf_state.get("total_pnl_history")
+    if not isinstance(equity, deque):
+        equity = _perf_state["total_pnl_history"] = db_state.equity_buffer(equity, _PERF_CYCLES_KEEP)
+    return equity
+
+
+def _tail(seq, n: int) -> list:
+    """Últimos n itens de uma lista ou deque, sem copiar o buffer inteiro."""
+    return list(islice(seq, max(0, len(seq) - n), None))
+
+
+def _render_log(log: list) -> list:
+    return [_render_log_entry(e) for e in log]
+
+
+def _trade_log(event_type: str, asset: str, amount: float, note: str = "",
+               tpl: LogTpl = None, args: tuple = ()):
+    """Insere um evento no log de trading (máx 200 entradas); a gravação é adiada (_mark_state_dirty).
+    Com `tpl`, grava o id do template + args em vez da nota formatada."""
+    entry = {
+        "timestamp": _brt_now().isoformat(),
+        "type": event_type,
+        "asset": asset,
+        "amount": round(amount, 2),
+    }
+    if tpl is not None:
+        entry["tpl"] = int(tpl)
+        entry["args"] = _log_args(args)
+    else:
+        entry["note"] = note
+    _log_buffer().appendleft(entry)
+    _mark_state_dirty("trade_state")
+
+
+def _trade_log_batch(records: list):
+    """
+    Grava um lote de eventos adiados (event, asset, amount, LogTpl, *args) no mesmo
+    formato de _trade_log com `tpl` e marca o estado sujo uma única vez.
+    """
+    if not records:
+        return
+    ts = _brt_now().isoformat()
+    log = _log_buffer()
+    for event_type, asset, amount, tpl, *args in records:
+        log.appendleft({
+            "timestamp": ts,
+            "type": event_type,
+            "asset": asset,
+            "amount": round(amount, 2),
+            "tpl": int(tpl),
+            "args": _log_args(args),
+        })
+    _mark_state_dirty("trade_state")
+
+
+# Flag de segurança: garantir que o primeiro save não sobrescreva dados do DB
+_perf_db_safety_checked: bool = False
+
+
+def _record_cycle_performance(pnl: float, capital: float, irq: float,
+                               pnl_5m: float = 0.0, pnl_1h: float = 0.0, pnl_1d: float = 0.0,
+                               costs: dict = None,
+                               pnl_mr: float = 0.0, pnl_bo: float = 0.0, pnl_sq: float = 0.0,
+                               pnl_ls: float = 0.0, pnl_fvg: float = 0.0,
+                               pnl_vr: float = 0.0, pnl_pb: float = 0.0):
+    """Registra o P&L de um ciclo no histórico de performance."""
+    global _perf_db_safety_checked, _perf_state
+    # ── SAFETY MERGE: no primeiro ciclo após startup, verifica se o DB tem mais ciclos ──
+    # Isso previne sobrescrever histórico válido quando o estado em memória começou vazio
+    if not _perf_db_safety_checked:
+        _perf_db_safety_checked = True
+        try:
+            db_saved = _perf_with_cycles(db_state.load_state("performance", {}))
+            db_cycles_count = len(db_saved.get("cycles", []))
+            mem_cycles_count = len(_perf_state.get("cycles", []))
+            if db_cycles_count > mem_cycles_count:
+                print(
+                    f"[perf] SAFETY MERGE: DB tem {db_cycles_count} ciclos, memória tem {mem_cycles_count}. "
+                    f"Restaurando histórico do DB antes de salvar.",
+                    flush=True,
+                )
+                _perf_state.update(db_saved)
+            else:
+                print(f"[perf] Safety check OK: memória={mem_cycles_count} ciclos, DB={db_cycles_count}", flush=True)
+        except Exception as _se:
+            print(f"[perf] Aviso no safety merge: {_se}", flush=True)
+    cst = costs or {}
+    _now = _brt_now()
+    _perf_state["cycles"].append(db_state.new_cycle(
+        _now,
+        pnl=round(pnl, 4),
+        pnl_5m=round(pnl_5m, 4),
+        pnl_1h=round(pnl_1h, 4),
+        pnl_1d=round(pnl_1d, 4),
+        pnl_mr=round(pnl_mr, 4),
+        pnl_bo=round(pnl_bo, 4),
+        pnl_sq=round(pnl_sq, 4),
+        pnl_ls=round(pnl_ls, 4),
+        pnl_fvg=round(pnl_fvg, 4),
+        pnl_vr=round(pnl_vr, 4),
+        pnl_pb=round(pnl_pb, 4),
+        fees_total=round(cst.get("total", 0.0), 6),
+        fees_brokerage=round(cst.get("brokerage", 0.0), 6),
+        fees_exchange=round(cst.get("exchange_fees", 0.0), 6),
+        fees_spread=round(cst.get("spread", 0.0), 6),
+        fees_slippage=round(cst.get("slippage", 0.0), 6),
+        fees_fx=round(cst.get("fx", 0.0), 6),
+        fees_min_adj=round(cst.get("min_fee_adj", 0.0), 6),
+        capital=round(capital, 2),
+        irq=round(irq, 4),
+    ))
+    _pnl_window_add(_perf_state["cycles"][-1])
+    _day_index_add(_perf_state["cycles"][-1])
+    _rollup_append(_perf_state["cycles"][-1])
+    # manter máx 500 ciclos
+    db_state.append_cycle(_perf_state["cycles"][-1])
+    # Buffer limitado: descarta a cabeça in-place (sem alocar uma lista nova)
+    excess = len(_perf_state["cycles"]) - _PERF_CYCLES_KEEP
+    if excess > 0:
+        _day_index_trim(_perf_state["cycles"][:excess])
+        del _perf_state["cycles"][:excess]
+    _perf_arrays_add(_perf_state["cycles"][-1])
+
+    _equity_buffer().append(round(capital + pnl, 2))
+
+    if pnl > 0:
+        _perf_state["win_count"] = _perf_state.get("win_count", 0) + 1
+        if pnl > _perf_state.get("best_day_pnl", 0.0):
+            _perf_state["best_day_pnl"] = round(pnl, 4)
+        _perf_state["total_gain"] = round(_perf_state.get("total_gain", 0.0) + pnl, 4)
+    elif pnl < 0:
+        _perf_state["loss_count"] = _perf_state.get("loss_count", 0) + 1
+        if pnl < _perf_state.get("worst_day_pnl", 0.0):
+            _perf_state["worst_day_pnl"] = round(pnl, 4)
+        _perf_state["total_loss"] = round(_perf_state.get("total_loss", 0.0) + abs(pnl), 4)
+
+    _perf_state["total_fees"] = round(_perf_state.get("total_fees", 0.0) + cst.get("total", 0.0), 6)
+    _perf_state["total_brokerage"] = round(_perf_state.get("total_brokerage", 0.0) + cst.get("brokerage", 0.0), 6)
+    _perf_state["total_exchange_fees"] = round(_perf_state.get("total_exchange_fees", 0.0) + cst.get("exchange_fees", 0.0), 6)
+    _perf_state["total_spread"] = round(_perf_state.get("total_spread", 0.0) + cst.get("spread", 0.0), 6)
+    _perf_state["total_slippage"] = round(_perf_state.get("total_slippage", 0.0) + cst.get("slippage", 0.0), 6)
+    _perf_state["total_fx"] = round(_perf_state.get("total_fx", 0.0) + cst.get("fx", 0.0), 6)
+    _perf_state["total_min_fee_adj"] = round(_perf_state.get("total_min_fee_adj", 0.0) + cst.get("min_fee_adj", 0.0), 6)
+
+    _perf_touch()
+    _mark_state_dirty("performance")
+
+
+@app.get("/trade/status")
+async def trade_status():
+    """Retorna o estado atual do trading: capital, posições, log de eventos."""
+    _, session_label, _ = _current_session()
+    # Capital efetivo = capital base + ganho/perda acumulado do dia (BRT)
+    today_str = datetime.now(_BRT).strftime("%Y-%m-%d")
+    pnl_today_live = _today_cycles_pnl(today_str)
+    # Subtrai baseline do dia (ganhos com capital anterior ao reset)
+    # Só aplica baseline se foi definido no mesmo dia de hoje (não persiste entre dias)
+    pnl_today_baseline = 0.0
+    if _trade_state.get("pnl_today_baseline_date") == today_str:
+        pnl_today_baseline = _trade_state.get("pnl_today_baseline", 0.0)
+    pnl_today_live = round(pnl_today_live - pnl_today_baseline, 2)
+    capital_base = _trade_state.get("capital", settings.INITIAL_CAPITAL)
+    capital_efetivo = round(capital_base + pnl_today_live, 2)
+
+    # ── Capital Split BRL vs USD ─────────────────────────────────────────
+    # Tenta cotação live do USD/BRL via brokers integrados (AV → Yahoo → fallback)
+    usd_rate = settings.USD_BRL_RATE
+    try:
+        if market_data_service:
+            live_rate = await market_data_service.get_usd_brl_rate()
+            if live_rate and live_rate > 0:
+                usd_rate = round(live_rate, 4)
+    except Exception:
+        pass
+
+    capital_brl      = round(capital_efetivo * settings.CAPITAL_BRL_PCT, 2)   # ex: 40% em R$
+    capital_usd_brl  = round(capital_efetivo * settings.CAPITAL_USD_PCT, 2)   # ex: 60% ainda em R$
+    capital_usd      = round(capital_usd_brl / usd_rate, 2)                   # convertido para USD
+
+    return _FastJSONResponse({
+        "success": True,
+        "data": {
+            "capital":          capital_base,
             "capital_efetivo":  capital_efetivo,
             "pnl_hoje":         pnl_today_live,
             "auto_trading":     _trade_state.get("auto_trading", True),
             "total_pnl":        round(_trade_state.get("total_pnl", 0.0) - _trade_state.get("total_pnl_baseline", 0.0), 4),
             "positions":        _trade_state.get("positions", []),
             "last_no_position_reason": _trade_state.get("last_no_position_reason", ""),
-            "log":              _trade_state.get("log", []),
+            "log":              _render_log(_trade_state.get("log", [])),
             "last_cycle":       _trade_state.get("last_cycle", None),
             "b3_open":          _is_market_open(),
             "session":          session_label,
@@ -2790,7 +3709,7 @@ async def trade_status():
                 "recent_tf_pnl": _strategy_state.get("last_recent_tf_pnl", {"5m": 0.0, "1h": 0.0, "1d": 0.0}),
             },
         },
-    }
+    })
 
 
 @app.post("/trade/capital")
@@ -2805,15 +3724,13 @@ async def set_trade_capital(body: dict):
     delta = amount - prev
     event = "DEPÓSITO" if delta >= 0 else "RETIRADA"
     # Ao mudar capital, registra baseline do PnL de hoje (ganhos do capital anterior)
-    from datetime import timezone as _tz2, timedelta as _td2
-    _brt2 = _tz2(_td2(hours=-3))
-    today_str2 = datetime.now(_brt2).strftime("%Y-%m-%d")
-    today_cycles2 = [c for c in _perf_state.get("cycles", []) if c.get("timestamp", "").startswith(today_str2)]
-    current_pnl_today = round(sum(c.get("pnl", 0) for c in today_cycles2), 2)
+    today_str2 = datetime.now(_BRT).strftime("%Y-%m-%d")
+    current_pnl_today = _today_cycles_pnl(today_str2)
     _trade_state["pnl_today_baseline"] = current_pnl_today
     _trade_state["pnl_today_baseline_date"] = today_str2
     _trade_state["total_pnl_baseline"] = _trade_state.get("total_pnl", 0.0)
-    _trade_log(event, "—", abs(delta), f"Capital {event.lower()} de R$ {prev:.2f} → R$ {amount:.2f} | PnL baseline fixado em R$ {current_pnl_today:.2f}")
+    _trade_log(event, "—", abs(delta), tpl=LogTpl.CAPITAL_CHANGE,
+               args=(event.lower(), prev, amount, current_pnl_today))
     # Persiste imediatamente no banco para sobreviver a deploys/restarts
     db_state.save_state("trade_state", _trade_state)
     return {"success": True, "capital": amount, "previous": prev, "pnl_baseline": current_pnl_today}
@@ -2832,11 +3749,8 @@ async def reset_pnl_baseline(request: Request):
     """Fixa o PnL atual do dia como baseline — próximos ganhos partem de zero.
     Útil quando o capital é resetado no meio do dia para nova simulação.
     Parâmetro opcional JSON: {"total_pnl_baseline_override": 1971.83}"""
-    from datetime import timezone as _tz3, timedelta as _td3
-    _brt3 = _tz3(_td3(hours=-3))
-    today_str3 = datetime.now(_brt3).strftime("%Y-%m-%d")
-    today_cycles3 = [c for c in _perf_state.get("cycles", []) if c.get("timestamp", "").startswith(today_str3)]
-    current_pnl = round(sum(c.get("pnl", 0) for c in today_cycles3), 2)
+    today_str3 = datetime.now(_BRT).strftime("%Y-%m-%d")
+    current_pnl = _today_cycles_pnl(today_str3)
     _trade_state["pnl_today_baseline"] = current_pnl
     _trade_state["pnl_today_baseline_date"] = today_str3
     # Permite sobrescrever o baseline de total_pnl via parâmetro JSON opcional
@@ -2850,7 +3764,8 @@ async def reset_pnl_baseline(request: Request):
     else:
         _trade_state["total_pnl_baseline"] = _trade_state.get("total_pnl", 0.0)
     db_state.save_state("trade_state", _trade_state)
-    _trade_log("SISTEMA", "—", 0, f"🔄 PnL baseline fixado em R$ {current_pnl:.2f} — nova simulação R$ {_trade_state.get('capital', 0):.2f}")
+    _trade_log("SISTEMA", "—", 0, tpl=LogTpl.PNL_BASELINE,
+               args=(current_pnl, _trade_state.get("capital", 0)))
     return {"success": True, "pnl_baseline_set": current_pnl, "total_pnl_baseline": _trade_state["total_pnl_baseline"], "capital": _trade_state.get("capital", 0)}
 
 
@@ -2867,11 +3782,12 @@ async def reset_trade_state(request: Request):
     """Zera o histórico de P&L, ciclos e restaura capital ao valor padrão."""
     _trade_state["total_pnl"] = 0.0
     _trade_state["capital"]   = settings.INITIAL_CAPITAL
-    _trade_state["log"]       = []
+    _trade_state["log"]       = deque(maxlen=_TRADE_LOG_MAX)
     _trade_state["positions"] = {}
     db_state.save_state("trade_state", _trade_state)
     _perf_state["cycles"] = []
-    _perf_state["total_pnl_history"] = []
+    db_state.reset_cycles()
+    _perf_state["total_pnl_history"] = deque(maxlen=_PERF_CYCLES_KEEP)
     _perf_state["win_count"] = 0
     _perf_state["loss_count"] = 0
     _perf_state["best_day_pnl"] = 0.0
@@ -2883,7 +3799,9 @@ async def reset_trade_state(request: Request):
     _perf_state["total_slippage"] = 0.0
     _perf_state["total_fx"] = 0.0
     _perf_state["total_min_fee_adj"] = 0.0
-    db_state.save_state("performance", _perf_state)
+    _perf_state["by_day"] = {}
+    _perf_touch()
+    _save_perf()
     # Reset proteção inteligente também
     _protection_state["paused"] = False
     _protection_state["hard_stopped"] = False
@@ -2895,6 +3813,22 @@ async def reset_trade_state(request: Request):
     return {"success": True, "message": f"Histórico zerado — capital restaurado para R$ {settings.INITIAL_CAPITAL:.2f}. Proteções resetadas."}
 
 
+@app.get("/debug/state")
+async def debug_state(key: str = "trade_state"):
+    """
+    Retorna o estado em memória formatado (indent=2) para inspeção humana.
+    A persistência grava JSON compacto — use este endpoint para ler o estado.
+    """
+    from fastapi.responses import Response
+    states = {"trade_state": _trade_state, "performance": _perf_state, "protection": _protection_state}
+    if key not in states:
+        raise HTTPException(status_code=404, detail=f"Estado desconhecido: {key}. Use: {', '.join(states)}")
+    return Response(
+        content=json.dumps(states[key], indent=2, ensure_ascii=False, default=_json_default),
+        media_type="application/json",
+    )
+
+
 @app.post("/admin/restore-perf")
 async def admin_restore_perf(request: Request, payload: dict):
     """
@@ -2911,15 +3845,28 @@ async def admin_restore_perf(request: Request, payload: dict):
         "total_min_fee_adj", "total_pnl_history",
         # Offsets históricos (para restaurar após reset/migração)
         "total_cycles_offset", "total_pnl_offset",
+        "by_day",
     }
     updated = []
     for key, val in payload.items():
         if key in allowed:
             _perf_state[key] = val
             updated.append(key)
+    if "cycles" in updated:
+        _backfill_cycle_days(_perf_state["cycles"])
+    # Ciclos restaurados sem rollup próprio: recalcula os totais por dia
+    if "cycles" in updated and "by_day" not in updated:
+        _rollup_rebuild()
+    elif "by_day" in updated:
+        _perf_state["by_day"] = dict(sorted(_perf_state["by_day"].items()))
+    # Ciclos restaurados substituem o log append-only; memória fica só com a cauda
+    if "cycles" in updated:
+        db_state.reset_cycles(_perf_state["cycles"])
+        _perf_state["cycles"] = _perf_state["cycles"][-_PERF_CYCLES_KEEP:]
     # Marca safety check como feito para não sobrescrever na próxima gravação
     _perf_db_safety_checked = True
-    db_state.save_state("performance", _perf_state)
+    _perf_touch()
+    _save_perf()
     cycles_count = len(_perf_state.get("cycles", []))
     print(f"[admin] restore-perf: {len(updated)} campos restaurados, {cycles_count} ciclos no estado", flush=True)
     return {
@@ -3070,7 +4017,10 @@ async def trade_strategies():
                 "sl_multiplier": settings.ATR_SL_MULTIPLIER,
                 "tp_multiplier": settings.ATR_TP_MULTIPLIER,
                 "sl_range": f"{settings.ATR_MIN_SL*100:.1f}%-{settings.ATR_MAX_SL*100:.1f}%",
-                "cached_atr": {k: v for k, v in list(_atr_cache.items())[:10]},
+                "cached_atr": {
+                    f"{a}:{t}" if t else a: {**v, "sl": round(v["sl"], 6), "tp": round(v["tp"], 6)}
+                    for (a, t), v in list(_atr_cache.items())[:10]
+                },
             },
             "grid_trading": {
                 "active": settings.GRID_ENABLED,
@@ -3127,7 +4077,7 @@ async def run_trade_cycle(request: Request):
         )
         try:
             db_state.save_state("trade_state", _trade_state)
-            db_state.save_state("performance", _perf_state)
+            _save_perf()
         except Exception:
             pass
         return {
@@ -3145,13 +4095,20 @@ async def run_trade_cycle(request: Request):
 # ESTRATÉGIAS AVANÇADAS
 # ═══════════════════════════════════════════
 
+try:
+    import requests as _req
+except ImportError:
+    _req = None
+
+
 def _sentiment_boost(asset: str) -> float:
     """
     Analisa sentimento via CryptoPanic/RSS (simplificado).
     Retorna multiplicador: >1 = positivo, <1 = negativo, 1 = neutro.
     """
+    if _req is None:
+        return 1.0
     try:
-        import requests as _req
         # CryptoPanic API gratuita para crypto
         if asset in settings.CRYPTO_ASSETS:
             url = f"https://cryptopanic.com/api/v1/posts/?auth_token=free&currencies={asset}&kind=news&filter=important"
@@ -3198,11 +4155,12 @@ def _orderbook_signal(asset: str) -> float:
     Analisa profundidade de ordem (simplificado via Binance API).
     Retorna multiplicador: >1 = mais bids que asks, <1 = mais asks.
     """
+    if _req is None:
+        return 1.0
     try:
         if asset not in settings.CRYPTO_ASSETS:
             return 1.0
         symbol = f"{asset}USDT"
-        import requests as _req
         resp = _req.get(f"https://api.binance.com/api/v3/depth?symbol={symbol}&limit=20", timeout=3)
         if resp.status_code == 200:
             data = resp.json()
@@ -3258,9 +4216,8 @@ def _update_protection(cycle_pnl: float, capital: float, mom_scores: dict):
         state["hard_stopped"] = True
         state["paused"] = True
         state["pause_reason"] = f"HARD STOP: drawdown {drawdown_pct*100:.1f}% do pico R$ {state['peak_capital']:.2f}"
-        msg = f"🔴 {state['pause_reason']} — necessário reset manual"
-        _trade_log("HARD_STOP", "—", capital, msg)
-        print(f"[proteção] {msg}", flush=True)
+        _trade_log("HARD_STOP", "—", capital, tpl=LogTpl.HARD_STOP, args=(state["pause_reason"],))
+        print(f"[proteção] 🔴 {state['pause_reason']} — necessário reset manual", flush=True)
         # ── Alerta imediato: Telegram + Discord ──────────────────────────
         if ALERTS_AVAILABLE and alert_manager:
             asyncio.create_task(alert_manager.send_alert(
@@ -3279,14 +4236,12 @@ def _update_protection(cycle_pnl: float, capital: float, mom_scores: dict):
             prev_losses = state["consecutive_losses"]
             state["consecutive_losses"] = 0
             state["size_multiplier"] = 1.0
-            _trade_log("RECOVERY", "—", capital,
-                f"✅ Recuperação! {prev_losses} perdas seguidas → volta 100% tamanho")
+            _trade_log("RECOVERY", "—", capital, tpl=LogTpl.RECOVERY, args=(prev_losses,))
         # Se estava pausado, despausa
         if state["paused"] and not state["hard_stopped"]:
             state["paused"] = False
             state["pause_reason"] = ""
-            _trade_log("RESUME", "—", capital,
-                f"▶️ Bot retomou operação normal — ciclo lucrativo detectado")
+            _trade_log("RESUME", "—", capital, tpl=LogTpl.RESUME)
         return
 
     # ── Ciclo com perda → proteção progressiva ────────────────
@@ -3305,8 +4260,8 @@ def _update_protection(cycle_pnl: float, capital: float, mom_scores: dict):
             state["size_multiplier"] = 1.0
 
         if n >= settings.CONSECUTIVE_LOSS_REDUCE:
-            _trade_log("LOSS_REDUCE", "—", capital,
-                f"⚠️ {n} perdas seguidas → tamanho reduzido para {state['size_multiplier']*100:.0f}%")
+            _trade_log("LOSS_REDUCE", "—", capital, tpl=LogTpl.LOSS_REDUCE,
+                       args=(n, state["size_multiplier"] * 100))
 
 
 def _check_smart_pause(today_pnl: float, week_pnl: float, capital: float, top_scores: dict) -> float:
@@ -3326,7 +4281,7 @@ def _check_smart_pause(today_pnl: float, week_pnl: float, capital: float, top_sc
     # ── Perda diária excessiva → Smart Pause ─────────────────
     if today_pnl < -max_daily:
         # Verificar se signals melhoraram (momentum forte pode justificar volta)
-        best_scores = sorted(top_scores.values(), reverse=True)[:5] if top_scores else []
+        best_scores = heapq.nlargest(5, top_scores.values()) if top_scores else []
         avg_top_score = sum(best_scores) / len(best_scores) if best_scores else 0
 
         if avg_top_score >= settings.RESUME_MOMENTUM_THRESHOLD:
@@ -3334,15 +4289,13 @@ def _check_smart_pause(today_pnl: float, week_pnl: float, capital: float, top_sc
             if state["paused"]:
                 state["paused"] = False
                 state["pause_reason"] = ""
-                _trade_log("SMART_RESUME", "—", capital,
-                    f"🔄 Momentum forte ({avg_top_score:.2f}) detectado — retomando com 50% do tamanho")
+                _trade_log("SMART_RESUME", "—", capital, tpl=LogTpl.SMART_RESUME, args=(avg_top_score,))
             return 0.50 * state["size_multiplier"]
         else:
             # Signals fracos → mantém pausa
             if not state["paused"]:
                 # Primeira vez pausando — envia alerta
-                pause_msg = f"Perda diária R$ {today_pnl:.2f} > limite R$ {max_daily:.2f}"
-                _trade_log("SMART_PAUSE", "—", capital, f"⏸️ Smart Pause ativado: {pause_msg}")
+                _trade_log("SMART_PAUSE", "—", capital, tpl=LogTpl.SMART_PAUSE, args=(today_pnl, max_daily))
                 if ALERTS_AVAILABLE and alert_manager:
                     asyncio.create_task(alert_manager.send_alert(
                         "SMART_PAUSE",
@@ -3358,8 +4311,7 @@ def _check_smart_pause(today_pnl: float, week_pnl: float, capital: float, top_sc
 
     # ── Perda semanal excessiva → Opera com 25% ──────────────
     if week_pnl < -max_weekly:
-        _trade_log("WEEKLY_REDUCE", "—", capital,
-            f"📉 Perda semanal R$ {week_pnl:.2f} > limite R$ {max_weekly:.2f} → opera com 25%")
+        _trade_log("WEEKLY_REDUCE", "—", capital, tpl=LogTpl.WEEKLY_REDUCE, args=(week_pnl, max_weekly))
         return 0.25 * state["size_multiplier"]
 
     # ── Normal → aplica apenas redutor de perdas consecutivas ─
@@ -3368,8 +4320,7 @@ def _check_smart_pause(today_pnl: float, week_pnl: float, capital: float, top_sc
 
 async def _refresh_signals(klines_5m: dict, top_assets: list):
     """Atualiza cache de sinais avançados (sentimento, orderbook, cross-momentum)."""
-    from datetime import timezone as _tzs, timedelta as _tds
-    now_str = datetime.now(_tzs(_tds(hours=-3))).strftime("%H:%M")
+    now_str = datetime.now(_BRT).strftime("%H:%M")
     # Atualizar a cada 5 minutos
     if _signal_cache.get("ts") == now_str[:4]:
         return
@@ -3391,11 +4342,12 @@ async def _refresh_signals(klines_5m: dict, top_assets: list):
 # ESTRATÉGIAS FASE 2: ATR, GRID, TURBO, VOLUME, PARTIAL TP, MOMENTUM ACCEL
 # ═══════════════════════════════════════════
 
-# Cache de ATR por ativo (atualiza a cada ciclo)
+# Cache de ATR/SL/TP por (ativo, tf) — memo pelo último close (atualiza a cada ciclo)
 _atr_cache: dict = {}
 
-# Cache de momentum anterior para detectar aceleração
-_prev_momentum_cache: dict = {}
+# Cache de momentum anterior para detectar aceleração (LRU limitado — ativos rotacionam)
+_prev_momentum_cache: OrderedDict = OrderedDict()
+_MOM_CACHE_CAP = 512
 
 # Função para calcular pesos dinâmicos por estratégia
 
@@ -3416,42 +4368,111 @@ def _calculate_dynamic_weights(metrics):
 # dynamic_weights = _calculate_dynamic_weights(metrics)
 
 
-def _calculate_atr(prices: list, period: int = None) -> float:
+def _as_np(data: dict) -> dict:
+    """
+    Anexa prices_np/volumes_np (float64) ao dict do ativo — uma conversão por ciclo.
+    Os helpers abaixo usam os arrays quando presentes e caem nas listas caso contrário.
+    """
+    if NUMPY_AVAILABLE and "prices_np" not in data:
+        data["prices_np"] = np.asarray(data.get("prices", []), dtype=np.float64)
+        data["volumes_np"] = np.asarray(data.get("volumes", []), dtype=np.float64)
+    return data
+
+
+def _last_returns(assets: list, klines: dict) -> list:
+    """
+    Retorno do último candle (p[-1]/p[-2] - 1) para cada ativo, na ordem de `assets`.
+    Com NumPy usa os prices_np do ciclo num único divide vetorizado; 0.0 sem dados.
+    """
+    klines = klines or {}
+    if NUMPY_AVAILABLE:
+        arrs = [klines.get(a, {}).get("prices_np") for a in assets]
+        if all(p is not None for p in arrs):
+            n = len(arrs)
+            last = np.fromiter((p[-1] if p.shape[0] >= 2 else 0.0 for p in arrs), dtype=np.float64, count=n)
+            prev = np.fromiter((p[-2] if p.shape[0] >= 2 else 0.0 for p in arrs), dtype=np.float64, count=n)
+            return np.divide(last - prev, prev, out=np.zeros_like(last), where=prev != 0).tolist()
+    rets = []
+    for a in assets:
+        prices = klines.get(a, {}).get("prices", [])
+        if len(prices) >= 2 and prices[-2] != 0:
+            rets.append((prices[-1] - prices[-2]) / prices[-2])
+        else:
+            rets.append(0.0)
+    return rets
+
+
+def _calculate_atr(prices, period: int = None) -> float:
     """
-    Calcula Average True Range (ATR) a partir de lista de preços.
+    Calcula Average True Range (ATR) a partir de lista (ou ndarray) de preços.
     ATR mede volatilidade real — quanto maior, mais volátil o ativo.
     """
     period = period or settings.ATR_PERIOD
     if len(prices) < period + 1:
         return 0.0
-    true_ranges = []
-    for i in range(1, len(prices)):
-        high_low = abs(prices[i] - prices[i-1])  # simplificado (close-to-close)
-        true_ranges.append(high_low)
-    if len(true_ranges) < period:
+    return float(atr_nb(as_close_array(prices), period))
+
+
+# Estado incremental do ATR por (ativo, timeframe) → (timestamp do último candle, último close, atr)
+_atr_state: dict = {}
+
+
+def _calculate_atr_incremental(prices, key: tuple, stamps=None) -> float:
+    """
+    ATR de Wilder em O(1) por candle novo: reaproveita o ATR anterior de `key`.
+    O candle é identificado pelo timestamp (preço repetido não é "mesmo candle"):
+    - mesmo último candle e mesmo close → devolve o ATR guardado
+    - exatamente 1 candle novo (o último guardado virou o penúltimo) → 1 passo da RMA
+    - qualquer outro caso (gap, troca de fonte, sem timestamps) → recalcula a janela
+    """
+    period = settings.ATR_PERIOD
+    if len(prices) < period + 1:
+        _atr_state.pop(key, None)
         return 0.0
-    # ATR = média dos últimos N true ranges
-    atr = sum(true_ranges[-period:]) / period
+    if stamps is None or len(stamps) != len(prices):
+        _atr_state.pop(key, None)
+        return _calculate_atr(prices, period)
+    last, prev = float(prices[-1]), float(prices[-2])
+    ts_last, ts_prev = stamps[-1], stamps[-2]
+    st = _atr_state.get(key)
+    if st is not None:
+        st_ts, st_close, st_atr = st
+        if st_ts == ts_last and st_close == last:
+            return st_atr
+        if st_ts == ts_prev and st_close == prev:
+            atr = (st_atr * (period - 1) + abs(last - prev)) / period
+            _atr_state[key] = (ts_last, last, atr)
+            return atr
+    atr = _calculate_atr(prices, period)
+    _atr_state[key] = (ts_last, last, atr)
     return atr
 
 
-def _atr_adaptive_sl_tp(prices: list, asset: str = "") -> tuple:
+def _atr_adaptive_sl_tp(prices: list, asset: str = "", tf: str = "", stamps=None) -> tuple:
     """
     Retorna (stop_loss_pct, take_profit_pct) adaptados ao ATR do ativo.
     Ativos voláteis → SL/TP mais largo;  estáveis → mais apertado.
     Isso evita stops prematuros e maximiza ganhos.
     """
-    atr = _calculate_atr(prices)
-    if atr <= 0 or not prices or prices[-1] <= 0:
+    # Memo por (ativo, tf): mesmo último candle (timestamp) e close → mesmo SL/TP
+    key = (asset, tf)
+    last_ts = stamps[-1] if stamps is not None and len(stamps) == len(prices) and len(prices) else None
+    if asset and last_ts is not None:
+        cached = _atr_cache.get(key)
+        if cached is not None and cached.get("ts") == last_ts and cached["last_close"] == float(prices[-1]):
+            return (cached["sl"], cached["tp"])
+    atr = _calculate_atr_incremental(prices, key, stamps) if asset else _calculate_atr(prices)
+    if atr <= 0 or len(prices) == 0 or prices[-1] <= 0:
         return (settings.STOP_LOSS_PERCENTAGE, settings.TAKE_PROFIT_PERCENTAGE)
     # Normalizar ATR como percentual do preço
-    atr_pct = atr / prices[-1]
+    atr_pct = atr / float(prices[-1])
     # SL = ATR × multiplier, clampado entre min e max
     sl = max(settings.ATR_MIN_SL, min(atr_pct * settings.ATR_SL_MULTIPLIER, settings.ATR_MAX_SL))
     # TP = ATR × multiplier (sempre > SL para manter risk:reward positivo)
     tp = max(sl * 2.0, atr_pct * settings.ATR_TP_MULTIPLIER)  # TP >= 2× SL sempre
-    # Cache para logs
-    _atr_cache[asset] = {"atr": round(atr, 6), "atr_pct": round(atr_pct, 6), "sl": round(sl, 6), "tp": round(tp, 6)}
+    # Cache para memo + logs
+    _atr_cache[key] = {"ts": last_ts, "last_close": float(prices[-1]), "atr": round(atr, 6), "atr_pct": round(atr_pct, 6),
+                       "sl": sl, "tp": tp}
     return (sl, tp)
 
 
@@ -3467,28 +4488,31 @@ def _grid_trading_pnl(klines: dict, capital_grid: float) -> tuple:
     pnl = 0.0
     details = {}
     for asset, data in klines.items():
-        prices = data.get("prices", [])
+        prices = data.get("prices_np", data.get("prices", []))
         if len(prices) < 10:
             continue
         # Verificar se mercado é lateral (ATR baixo)
         atr = _calculate_atr(prices)
         if atr <= 0 or prices[-1] <= 0:
             continue
-        atr_pct = atr / prices[-1]
+        atr_pct = atr / float(prices[-1])
         # Grid só ativa quando volatilidade está na faixa ideal (lateral)
         if atr_pct > settings.GRID_MIN_RANGE * 2:
             continue  # muito volátil — não é lateral
         if atr_pct < settings.GRID_MIN_RANGE * 0.3:
             continue  # morto — sem movimento
         # Calcular grid levels
-        mid_price = prices[-1]
+        mid_price = float(prices[-1])
         spacing = mid_price * settings.GRID_SPACING_PCT
         per_level = capital_grid / (settings.GRID_LEVELS * len(klines)) if len(klines) > 0 else 0
         if per_level < 1:
             continue
         # Simular oscilação: preço recente variou entre min e max
         recent = prices[-10:]
-        low, high = min(recent), max(recent)
+        if NUMPY_AVAILABLE and isinstance(recent, np.ndarray):
+            low, high = float(recent.min()), float(recent.max())
+        else:
+            low, high = min(recent), max(recent)
         range_pct = (high - low) / mid_price if mid_price > 0 else 0
         # Cada nível de grid que o preço cruzou gera profit = spacing
         levels_crossed = int(range_pct / settings.GRID_SPACING_PCT)
@@ -3507,20 +4531,34 @@ def _is_turbo_mode(klines: dict) -> bool:
     """
     if not settings.TURBO_ENABLED:
         return False
+    eligible = [p for p in (d.get("prices_np", d.get("prices", [])) for d in klines.values()) if len(p) >= 5]
+    n = len(eligible)
+    if n == 0:
+        return False
+    threshold = settings.TURBO_VOL_THRESHOLD
     vol_count = 0
-    total = 0
-    for asset, data in klines.items():
-        prices = data.get("prices", [])
-        if len(prices) < 5:
-            continue
-        total += 1
+    # Turbo se > 30% dos ativos estão voláteis (10·v > 3·n, sem divisão em float).
+    # Sai cedo quando o resultado já está decidido — caso comum em regime calmo.
+    for processed, prices in enumerate(eligible, 1):
         # Volatilidade = amplitude recente / preço
         recent = prices[-5:]
-        vol = (max(recent) - min(recent)) / recent[-1] if recent[-1] > 0 else 0
-        if vol > settings.TURBO_VOL_THRESHOLD:
+        if NUMPY_AVAILABLE and isinstance(recent, np.ndarray):
+            amp = float(recent.max() - recent.min())
+        else:
+            amp = max(recent) - min(recent)
+        vol = amp / recent[-1] if recent[-1] > 0 else 0
+        if vol > threshold:
             vol_count += 1
-    # Turbo se > 30% dos ativos estão voláteis
-    return total > 0 and (vol_count / total) > 0.30
+            if vol_count * 10 > 3 * n:
+                return True
+        elif (vol_count + n - processed) * 10 <= 3 * n:
+            return False
+    return False
+
+
+# Limiares de volume lidos uma vez (não mudam em runtime)
+_VOL_CONFIRM_MULT = settings.VOLUME_CONFIRM_MULTIPLIER
+_VOL_REJECT_MULT = settings.VOLUME_REJECT_MULTIPLIER
 
 
 def _volume_confirmed(asset: str, klines: dict) -> float:
@@ -3532,17 +4570,21 @@ def _volume_confirmed(asset: str, klines: dict) -> float:
     if not settings.VOLUME_CONFIRM_ENABLED:
         return 1.0
     data = klines.get(asset, {})
-    volumes = data.get("volumes", [])
+    volumes = data.get("volumes_np", data.get("volumes", []))
     if len(volumes) < 5:
         return 1.0  # sem dados suficientes, neutra
-    avg_vol = sum(volumes[-10:]) / len(volumes[-10:]) if len(volumes) >= 10 else sum(volumes) / len(volumes)
+    vs = volumes[-10:]  # últimos 10 (ou todos, se houver menos)
+    if NUMPY_AVAILABLE and isinstance(vs, np.ndarray):
+        avg_vol = float(vs.mean())
+    else:
+        avg_vol = sum(vs) / len(vs)
     if avg_vol <= 0:
         return 1.0
     current_vol = volumes[-1]
     ratio = current_vol / avg_vol
-    if ratio >= settings.VOLUME_CONFIRM_MULTIPLIER:
+    if ratio >= _VOL_CONFIRM_MULT:
         return 1.15  # volume forte → +15% confiança
-    elif ratio <= settings.VOLUME_REJECT_MULTIPLIER:
+    elif ratio <= _VOL_REJECT_MULT:
         return 0.50  # volume fraco → -50% tamanho (ou skip)
     return 1.0
 
@@ -3575,6 +4617,9 @@ def _momentum_acceleration(asset: str, current_score: float) -> float:
         return 1.0
     prev_score = _prev_momentum_cache.get(asset, 0)
     _prev_momentum_cache[asset] = current_score
+    _prev_momentum_cache.move_to_end(asset)
+    if len(_prev_momentum_cache) > _MOM_CACHE_CAP:
+        _prev_momentum_cache.popitem(last=False)
     if prev_score > 0:
         accel = current_score - prev_score
         if accel >= settings.MOMENTUM_ACCEL_THRESHOLD:
@@ -3604,18 +4649,25 @@ async def _run_trade_cycle_internal(assets: list = None) -> dict:
     # 100 candles: mínimo para ADX (42), Hurst (20) e ATR (20) funcionarem corretamente
     _TF_CANDLES = {"5m": 100, "1h": 100, "1d": 100}
     if MARKET_DATA_AVAILABLE and market_data_service:
-        for tf in ("5m", "1h", "1d"):
+        async def _fetch_tf(tf: str):
             try:
-                k = await market_data_service.get_all_klines(all_assets, tf, _TF_CANDLES[tf])
-                if k:
-                    klines_by_tf[tf] = k
-                    data_source = "brapi/yahoo"
+                return tf, await market_data_service.get_all_klines(all_assets, tf, _TF_CANDLES[tf])
             except Exception:
-                pass
-    # Fallback para dados de teste
+                return tf, None
+
+        # Os 3 timeframes são buscas independentes — em paralelo (1×RTT em vez de 3×)
+        for tf, k in await asyncio.gather(*(_fetch_tf(tf) for tf in ("5m", "1h", "1d"))):
+            if k:
+                klines_by_tf[tf] = k
+                data_source = "brapi/yahoo"
+    # Fallback para dados de teste (cópia rasa — o ciclo não muta o literal; prices_np já vem pronto)
     for tf in ("5m", "1h", "1d"):
         if not klines_by_tf[tf]:
-            klines_by_tf[tf] = test_assets_data
+            klines_by_tf[tf] = {a: dict(d) for a, d in test_assets_data.items()}
+    # Converte preços/volumes para ndarray uma vez — helpers reaproveitam no ciclo
+    for _tf_klines in klines_by_tf.values():
+        for _d in _tf_klines.values():
+            _as_np(_d)
 
     # ── 2. Top N ativos por momentum (com filtro de score mínimo) ────────
     min_score = settings.MIN_MOMENTUM_SCORE
@@ -3623,23 +4675,23 @@ async def _run_trade_cycle_internal(assets: list = None) -> dict:
 
     def _top_assets(klines, n):
         mom = MomentumAnalyzer.calculate_multiple_assets(klines)
-        # Filtra score mínimo — só opera quando vale a pena
-        filtered = {a: m for a, m in mom.items()
-                    if m.get("momentum_score", 0) >= min_score}
-        sorted_assets = sorted(filtered.items(),
-                               key=lambda x: x[1].get("momentum_score", 0), reverse=True)
-        return [a for a, _ in sorted_assets[:n]], mom
+        # Dict só de scores — calculado uma vez, reaproveitado no bucket e na proteção
+        scores = {a: m.get("momentum_score", 0) for a, m in mom.items()}
+        # Filtra score mínimo — só opera quando vale a pena; top-N em O(N log n)
+        top = heapq.nlargest(n, ((a, sc) for a, sc in scores.items() if sc >= min_score),
+                             key=lambda x: x[1])
+        return [a for a, _ in top], mom, scores
 
-    top_5m, mom_5m = _top_assets(klines_by_tf["5m"], _TIMEFRAME_N_ASSETS["5m"])
-    top_1h, mom_1h = _top_assets(klines_by_tf["1h"], _TIMEFRAME_N_ASSETS["1h"])
-    top_1d, mom_1d = _top_assets(klines_by_tf["1d"], _TIMEFRAME_N_ASSETS["1d"])
+    top_5m, mom_5m, score_5m = _top_assets(klines_by_tf["5m"], _TIMEFRAME_N_ASSETS["5m"])
+    top_1h, mom_1h, score_1h = _top_assets(klines_by_tf["1h"], _TIMEFRAME_N_ASSETS["1h"])
+    top_1d, mom_1d, score_1d = _top_assets(klines_by_tf["1d"], _TIMEFRAME_N_ASSETS["1d"])
 
     if not top_5m and not top_1h and not top_1d:
         no_position_reason = f"Sem sinal válido: nenhum ativo acima do momentum mínimo ({min_score:.2f})."
 
     # ── 2b. Atualizar sinais avançados (sentimento, orderbook, cross-momentum)
     try:
-        all_top = list(set(top_5m + top_1h + top_1d))
+        all_top = list({*top_5m, *top_1h, *top_1d})
         await _refresh_signals(klines_by_tf["5m"], all_top)
     except Exception:
         pass
@@ -3720,6 +4772,11 @@ async def _run_trade_cycle_internal(assets: list = None) -> dict:
     _trade_log("KELLY_DYNAMIC", "—", 0,
         f"📊 Kelly Dinâmico: WR={_real_wr:.1%} RR={_real_rr:.2f} (trades={_hist_total}, wins={_hist_wins})")
 
+    # Mapas de sinais avançados fixados uma vez por ciclo (_refresh_signals já rodou no passo 2b)
+    _sent_map = _signal_cache.get("sentiment") or {}
+    _ob_map   = _signal_cache.get("orderbook") or {}
+    _cm_map   = _signal_cache.get("cross_mom") or {}
+
     def _kelly_weight(score: float, base_amount: float, asset: str = "") -> float:
         """Retorna alocação ajustada via Kelly fracionário dinâmico + sinais avançados.
         v5.0: usa win_rate e R:R reais do histórico."""
@@ -3737,11 +4794,8 @@ async def _run_trade_cycle_internal(assets: list = None) -> dict:
         adjusted = base_amount * (1.0 + kelly_f * settings.KELLY_FRACTION)
         # Aplicar boosts de sinais avançados (sentiment, order book, cross-momentum)
         if asset:
-            sentiment = _signal_cache.get("sentiment", {}).get(asset, 1.0)
-            orderbook = _signal_cache.get("orderbook", {}).get(asset, 1.0)
-            cross_mom = _signal_cache.get("cross_mom", {}).get(asset, 1.0)
-            adjusted = adjusted * sentiment * orderbook * cross_mom
-        return round(adjusted, 2)
+            adjusted = adjusted * _sent_map.get(asset, 1.0) * _ob_map.get(asset, 1.0) * _cm_map.get(asset, 1.0)
+        return adjusted
 
     # ── 3c. Mean Reversion v2.1 — usa engine com BB + RSI + divergência ─
     # (substituiu a função naïve que só checava queda >3%, pegava faca caindo)
@@ -3755,7 +4809,7 @@ async def _run_trade_cycle_internal(assets: list = None) -> dict:
         prev_change = prev_pos.get("change_pct", 0)
         # Se caiu entre -1% e -3%, aloca 50% a mais (DCA)
         if -3.0 < prev_change < -1.0:
-            return round(current_amount * 1.5, 2)
+            return current_amount * 1.5
         return current_amount
 
     # ── Mean Reversion: bucket dedicado (usa 1h para sinais mais confiáveis) ─
@@ -3904,10 +4958,12 @@ async def _run_trade_cycle_internal(assets: list = None) -> dict:
     }
 
     # ── 4. P&L por bucket (ATR SL/TP + Volume + Partial TP + Momentum Accel + Kelly + DCA + custos) ──
-    def _calc_pnl_bucket(top_list, klines, bucket_capital, tf_name: str, mom_data=None):
+    def _calc_pnl_bucket(top_list, klines, bucket_capital, tf_name: str, mom_data=None, scores=None):
         if not top_list:
             return 0.0, {}, {"total": 0.0}
-        per_asset = round(bucket_capital / len(top_list), 2)
+        if scores is None:
+            scores = {a: d.get("momentum_score", 0.5) for a, d in (mom_data or {}).items()}
+        per_asset = bucket_capital / len(top_list)
         pnl = 0.0
         positions = {}
         bucket_costs = {
@@ -3919,48 +4975,57 @@ async def _run_trade_cycle_internal(assets: list = None) -> dict:
             "fx": 0.0,
             "min_fee_adj": 0.0,
         }
-        for asset in top_list:
+        # Constantes do loop fixadas uma vez (LOAD_FAST em vez de atributo/dict por ativo)
+        _SP = _SIM_PROFILES.get(_sim_mode, _SIM_PROFILES["normal"])
+        _PTP_TGT = settings.PARTIAL_TP_FIRST_TARGET
+        _PTP_EN = settings.PARTIAL_TP_ENABLED
+        _PTP_PCT = settings.PARTIAL_TP_FIRST_PCT
+        _TS_PCT = settings.TRAILING_STOP_PERCENTAGE
+        _MAX_POS = capital * settings.MAX_POSITION_PERCENTAGE
+        _SIZE_MULT = _protection_state["size_multiplier"]
+        _TRAIL = _protection_state["trailing_highs"]
+        _SL_CD = _protection_state.setdefault("sl_cooldown", {})
+        _TUNE = _strategy_state.get("tf_risk_tuning_enabled", True)
+        _TF_SL = _strategy_state.get("tf_sl_mult", {}).get(tf_name, 1.0)
+        _TF_TP = _strategy_state.get("tf_tp_mult", {}).get(tf_name, 1.0)
+        # Eventos de SL/TP/trailing adiados: formatados e persistidos uma vez no fim
+        _log_pending = []
+        # Retorno do último candle de todos os ativos do bucket numa passada vetorizada
+        _bucket_rets = _last_returns(top_list, klines)
+        for _idx, asset in enumerate(top_list):
             prices = klines.get(asset, {}).get("prices", []) if klines else []
-            if len(prices) >= 2 and prices[-2] != 0:
-                ret = (prices[-1] - prices[-2]) / prices[-2]
-            else:
-                ret = 0.0
+            ret = _bucket_rets[_idx]
 
             # ── Realismo paper mode: adverse selection + falha de execução ──
             # Parâmetros controlados pelo _sim_mode (normal/stress/extreme)
-            _sp = _SIM_PROFILES.get(_sim_mode, _SIM_PROFILES["normal"])
-            if _rnd.random() < _sp["rejection_rate"]:
+            if _rnd.random() < _SP["rejection_rate"]:
                 continue
             # Filtro de retorno mínimo: skip se |ret| menor que custo estimado
-            if abs(ret) < _sp["min_ret_threshold"]:
+            if abs(ret) < _SP["min_ret_threshold"]:
                 continue
             # Adverse selection: entra depois do sinal → captura % do movimento
             if ret > 0:
-                capture = max(0.0, _rnd.gauss(_sp["capture_mean"], _sp["capture_std"]))
+                capture = max(0.0, _rnd.gauss(_SP["capture_mean"], _SP["capture_std"]))
                 ret = ret * min(capture, 1.05)   # máx 105% (overshoot ocasional)
             else:
                 # Na queda: adverse selection piora a perda
-                worsen = max(1.0, _rnd.gauss(_sp["loss_worsen_mean"], _sp["loss_worsen_std"]))
+                worsen = max(1.0, _rnd.gauss(_SP["loss_worsen_mean"], _SP["loss_worsen_std"]))
                 ret = ret * worsen
-            ret += _rnd.gauss(_sp["noise_mean"], _sp["noise_std"])  # ruído de execução
+            ret += _rnd.gauss(_SP["noise_mean"], _SP["noise_std"])  # ruído de execução
 
             # ── ATR Adaptive SL/TP — calcula limites dinâmicos por ativo ──
-            atr_sl, atr_tp = _atr_adaptive_sl_tp(prices, asset)
-            if _strategy_state.get("tf_risk_tuning_enabled", True):
-                sl_mult = _strategy_state.get("tf_sl_mult", {}).get(tf_name, 1.0)
-                tp_mult = _strategy_state.get("tf_tp_mult", {}).get(tf_name, 1.0)
-                atr_sl = max(0.002, min(atr_sl * sl_mult, 0.08))
-                atr_tp = max(0.003, min(atr_tp * tp_mult, 0.12))
+            _kd = klines.get(asset, {})
+            atr_sl, atr_tp = _atr_adaptive_sl_tp(_kd.get("prices_np", prices), asset, tf_name, _kd.get("timestamps"))
+            if _TUNE:
+                atr_sl = max(0.002, min(atr_sl * _TF_SL, 0.08))
+                atr_tp = max(0.003, min(atr_tp * _TF_TP, 0.12))
 
             # ── v5.1: Stop-Loss Cooldown — evita re-entrada após stop recente ──
-            _sl_cd = _protection_state.get("sl_cooldown", {}).get(asset, 0)
-            if _sl_cd > 0:
+            if _SL_CD.get(asset, 0) > 0:
                 continue  # ativo em cooldown após stop loss
 
             # Kelly + sinais avançados: ajustar tamanho pelo score + sentiment/orderbook
-            score = 0.5
-            if mom_data and asset in mom_data:
-                score = mom_data[asset].get("momentum_score", 0.5)
+            score = scores.get(asset, 0.5)
             # ── Filtro de qualidade: só entrar quando score >= 0.58 ──
             # v3 (2026-03-09): elevado de 0.55→0.58 para melhorar WR e PF
             if score < 0.58:
@@ -3980,72 +5045,72 @@ async def _run_trade_cycle_internal(assets: list = None) -> dict:
 
             # ── Volume Confirmation — filtra entradas com volume fraco ────
             vol_mult = _volume_confirmed(asset, klines)
-            amt = round(amt * vol_mult, 2)
+            amt *= vol_mult
 
             # ── Momentum Acceleration — boost quando tendência acelera ────
             mom_accel_mult = _momentum_acceleration(asset, score)
-            amt = round(amt * mom_accel_mult, 2)
+            amt *= mom_accel_mult
 
             # Aplicar multiplicador de proteção (perdas consecutivas, pausa parcial)
-            amt = round(amt * _protection_state["size_multiplier"], 2)
+            # (sem round intermediário — arredonda só no dict final da posição)
+            amt *= _SIZE_MULT
             # Clamp: não ultrapassa 30% do capital total
-            amt = min(amt, capital * settings.MAX_POSITION_PERCENTAGE)
+            amt = min(amt, _MAX_POS)
 
             # ── Trailing Stop: protege lucro parcial ─────────────
             if prices and len(prices) >= 2:
                 current_price = prices[-1]
-                prev_high = _protection_state["trailing_highs"].get(asset, current_price)
+                prev_high = _TRAIL.get(asset, current_price)
                 # Atualiza pico
                 if current_price > prev_high:
-                    _protection_state["trailing_highs"][asset] = current_price
+                    _TRAIL[asset] = current_price
                     prev_high = current_price
                 # Se caiu X% do pico → trailing stop ativado
                 if prev_high > 0:
                     drop_from_peak = (prev_high - current_price) / prev_high
-                    if drop_from_peak >= settings.TRAILING_STOP_PERCENTAGE and ret > 0:
+                    if drop_from_peak >= _TS_PCT and ret > 0:
                         # Tinha lucro mas devolveu — trava no trailing (retém 60% do lucro)
                         ret = max(ret * 0.60, 0.002)  # retém 60% do lucro + mínimo R:R boost
-                        _trade_log("TRAILING_STOP", asset, amt,
-                            f"📊 Trailing Stop {asset}: pico R$ {prev_high:.4f} → atual {current_price:.4f} (-{drop_from_peak*100:.2f}%)")
+                        _log_pending.append(("TRAILING_STOP", asset, amt, LogTpl.TRAILING_STOP,
+                            asset, prev_high, current_price, drop_from_peak * 100))
                     # Breakeven stop: se já teve +1.0% e devolveu, garante pelo menos +0.3%
                     elif ret > 0.010 and drop_from_peak > 0.002:
                         ret = max(ret, 0.003)  # garante breakeven + 0.3% (era 0.2%)
             else:
                 # Sem dados suficientes, limpa trailing
-                _protection_state["trailing_highs"].pop(asset, None)
+                _TRAIL.pop(asset, None)
 
             # ── SL fixo -2% para swing 1d — proteção mínima overnight ────
             if tf_name == "1d" and ret <= -0.02:
                 ret = -0.02
-                _trade_log("STOP_LOSS_1D", asset, amt,
-                    f"🛑 SL Swing 1d {asset}: -2% atingido — saindo posição swing")
-                _protection_state["trailing_highs"].pop(asset, None)
-                _protection_state["sl_cooldown"][asset] = _SL_COOLDOWN_CYCLES
+                _log_pending.append(("STOP_LOSS_1D", asset, amt, LogTpl.STOP_LOSS_1D, asset))
+                _TRAIL.pop(asset, None)
+                _SL_CD[asset] = _SL_COOLDOWN_CYCLES
 
             # ── ATR Stop Loss (adaptativo) — substitui SL fixo ──────────
             if ret <= -atr_sl:
                 ret = -atr_sl
-                _trade_log("STOP_LOSS_ATR", asset, amt,
-                    f"🛑 ATR Stop Loss {asset}: {ret*100:.2f}% (ATR SL={atr_sl*100:.2f}%)")
-                _protection_state["trailing_highs"].pop(asset, None)
+                _log_pending.append(("STOP_LOSS_ATR", asset, amt, LogTpl.STOP_LOSS_ATR,
+                    asset, ret * 100, atr_sl * 100))
+                _TRAIL.pop(asset, None)
                 # v5.1: Cooldown — não re-entrar neste ativo por N ciclos
-                _protection_state["sl_cooldown"][asset] = _SL_COOLDOWN_CYCLES
+                _SL_CD[asset] = _SL_COOLDOWN_CYCLES
 
             # ── Partial Take Profit — realiza 50% no primeiro alvo ───────
             partial_pnl = 0.0
-            if ret >= settings.PARTIAL_TP_FIRST_TARGET and settings.PARTIAL_TP_ENABLED:
+            if ret >= _PTP_TGT and _PTP_EN:
                 partial_pnl, amt_remaining = _partial_take_profit(ret, amt)
                 if partial_pnl > 0:
-                    _trade_log("PARTIAL_TP", asset, amt,
-                        f"💰 Partial TP {asset}: +{settings.PARTIAL_TP_FIRST_TARGET*100:.1f}% em {settings.PARTIAL_TP_FIRST_PCT*100:.0f}% da posição = R$ {partial_pnl:.4f}")
+                    _log_pending.append(("PARTIAL_TP", asset, amt, LogTpl.PARTIAL_TP,
+                        asset, _PTP_TGT * 100, _PTP_PCT * 100, partial_pnl))
                     amt = amt_remaining  # resto continua correndo
 
             # ── ATR Take Profit (adaptativo) — substitui TP fixo ─────────
             if ret >= atr_tp:
                 ret = atr_tp
-                _trade_log("TAKE_PROFIT_ATR", asset, amt,
-                    f"💰 ATR Take Profit {asset}: +{ret*100:.2f}% (ATR TP={atr_tp*100:.2f}%)")
-                _protection_state["trailing_highs"].pop(asset, None)
+                _log_pending.append(("TAKE_PROFIT_ATR", asset, amt, LogTpl.TAKE_PROFIT_ATR,
+                    asset, ret * 100, atr_tp * 100))
+                _TRAIL.pop(asset, None)
 
             gross_pnl = (amt * ret) + partial_pnl
             costs = _estimate_trade_costs_brl(asset, amt, abs(ret))
@@ -4058,16 +5123,17 @@ async def _run_trade_cycle_internal(assets: list = None) -> dict:
             mk = costs.get("market", "other")
             cycle_costs["by_market"][mk] = round(cycle_costs["by_market"].get(mk, 0.0) + costs.get("total", 0.0), 6)
 
-            positions[asset] = {"amount": amt, "ret_pct": round(ret * 100, 3),
+            positions[asset] = {"amount": round(amt, 2), "ret_pct": round(ret * 100, 3),
                                 "atr_sl": round(atr_sl * 100, 2), "atr_tp": round(atr_tp * 100, 2),
                                 "vol_mult": round(vol_mult, 2), "mom_accel": round(mom_accel_mult, 2),
                                 "market": mk, "gross_pnl": round(gross_pnl, 4),
                                 "costs": round(costs.get("total", 0.0), 4), "net_pnl": round(net_pnl, 4)}
+        _trade_log_batch(_log_pending)
         return round(pnl, 4), positions, bucket_costs
 
-    pnl_5m, pos_5m, costs_5m = _calc_pnl_bucket(top_5m, klines_by_tf["5m"], capital_5m, "5m", mom_5m)
-    pnl_1h, pos_1h, costs_1h = _calc_pnl_bucket(top_1h, klines_by_tf["1h"], capital_1h, "1h", mom_1h)
-    pnl_1d, pos_1d, costs_1d = _calc_pnl_bucket(top_1d, klines_by_tf["1d"], capital_1d, "1d", mom_1d)
+    pnl_5m, pos_5m, costs_5m = _calc_pnl_bucket(top_5m, klines_by_tf["5m"], capital_5m, "5m", mom_5m, score_5m)
+    pnl_1h, pos_1h, costs_1h = _calc_pnl_bucket(top_1h, klines_by_tf["1h"], capital_1h, "1h", mom_1h, score_1h)
+    pnl_1d, pos_1d, costs_1d = _calc_pnl_bucket(top_1d, klines_by_tf["1d"], capital_1d, "1d", mom_1d, score_1d)
 
     # ── 4a-mr. Mean Reversion bucket — bucket dedicado de 10% ────────────
     pnl_mr, pos_mr, costs_mr = _calc_pnl_bucket(top_mr, klines_by_tf["1h"], capital_mr, "mr", mom_mr)
@@ -4134,23 +5200,20 @@ async def _run_trade_cycle_internal(assets: list = None) -> dict:
     cycle_pnl = round(pnl_5m + pnl_1h + pnl_1d + pnl_mr + pnl_bo + pnl_sq + pnl_ls + pnl_fvg + pnl_vr + pnl_pb + grid_pnl, 4)
 
     # ── 4b. Proteção Inteligente (Smart Pause/Resume + Drawdown + Semanal) ─
-    from datetime import timezone as _tz2, timedelta as _td2
-    _brt2 = _tz2(_td2(hours=-3))
-    _now_brt2 = datetime.now(_brt2)
-    _today2 = _now_brt2.strftime("%Y-%m-%d")
-
-    # Calcular PnL diário
-    _today_cycles = [c for c in _perf_state.get("cycles", []) if c.get("timestamp", "").startswith(_today2)]
-    _today_pnl = sum(c.get("pnl", 0) for c in _today_cycles) + cycle_pnl
+    _now_brt2 = _brt_now()
 
-    # Calcular PnL semanal (últimos 7 dias)
-    _week_ago = (_now_brt2 - _td2(days=7)).strftime("%Y-%m-%d")
-    _week_cycles = [c for c in _perf_state.get("cycles", []) if c.get("timestamp", "") >= _week_ago]
-    _week_pnl = sum(c.get("pnl", 0) for c in _week_cycles) + cycle_pnl
+    # PnL diário e semanal (últimos 7 dias) — acumuladores incrementais + ciclo atual
+    _today_pnl, _week_pnl = _today_week_pnl(_now_brt2)
+    _today_pnl += cycle_pnl
+    _week_pnl += cycle_pnl
 
     # Coletar scores de momentum para decisão de resume
     _all_mom_scores = {}
-    for m in (mom_5m, mom_1h, mom_1d, mom_mr, mom_bo, mom_sq, mom_ls, mom_fvg, mom_vr, mom_pb):
+    for sc_map in (score_5m, score_1h, score_1d):
+        for a, s in sc_map.items():
+            if a not in _all_mom_scores or s > _all_mom_scores[a]:
+                _all_mom_scores[a] = s
+    for m in (mom_mr, mom_bo, mom_sq, mom_ls, mom_fvg, mom_vr, mom_pb):
         for a, d in m.items():
             s = d.get("momentum_score", 0)
             if a not in _all_mom_scores or s > _all_mom_scores[a]:
@@ -4184,79 +5247,42 @@ async def _run_trade_cycle_internal(assets: list = None) -> dict:
 
     # ── 5. Montar posições unificadas ────────────────────────────────────
     prev_positions = dict(_trade_state.get("positions", {}))  # snapshot antes
+    # Uma única passada sobre todos os buckets: (posições, tag do tf, classificação).
+    # Classificações direcionais dependem do resultado do engine de cada estratégia.
+    def _dir_cls(results: dict, prefix: str):
+        return lambda a: f"{prefix}_{results.get(a, {}).get('direction', 'LONG')}"
+
+    def _pb_cls(a):
+        _r = pb_results.get(a, {})
+        return f"PYRAMID_BO_{_r.get('direction', 'LONG')}_L{_r.get('pyramid_level', 1)}"
+
+    _bucket_map = (
+        (pos_5m,  "5m",  lambda a: "SHORT"),
+        (pos_1h,  "1h",  lambda a: "MEDIUM"),
+        (pos_1d,  "1d",  lambda a: "LONG"),
+        (pos_mr,  "mr",  lambda a: "REVERSION"),
+        (pos_bo,  "bo",  lambda a: "BREAKOUT"),
+        (pos_sq,  "sq",  _dir_cls(sq_results, "SQUEEZE")),
+        (pos_ls,  "ls",  _dir_cls(ls_results, "SWEEP")),
+        (pos_fvg, "fvg", _dir_cls(fvg_results, "FVG")),
+        (pos_vr,  "vr",  _dir_cls(vr_results, "VWAP_REV")),
+        (pos_pb,  "pb",  _pb_cls),
+    )
     new_positions = {}
-    for asset, info in pos_5m.items():
-        new_positions[asset] = {"amount": info["amount"], "action": "BUY", "tf": "5m",
-            "pct": round(info["amount"]/capital*100, 1), "classification": "SHORT", "change_pct": info["ret_pct"]}
-    for asset, info in pos_1h.items():
-        if asset in new_positions:
-            new_positions[asset]["amount"] = round(new_positions[asset]["amount"] + info["amount"], 2)
-            new_positions[asset]["tf"] += "+1h"
-        else:
-            new_positions[asset] = {"amount": info["amount"], "action": "BUY", "tf": "1h",
-                "pct": round(info["amount"]/capital*100, 1), "classification": "MEDIUM", "change_pct": info["ret_pct"]}
-    for asset, info in pos_1d.items():
-        if asset in new_positions:
-            new_positions[asset]["amount"] = round(new_positions[asset]["amount"] + info["amount"], 2)
-            new_positions[asset]["tf"] += "+1d"
-        else:
-            new_positions[asset] = {"amount": info["amount"], "action": "BUY", "tf": "1d",
-                "pct": round(info["amount"]/capital*100, 1), "classification": "LONG", "change_pct": info["ret_pct"]}
-    for asset, info in pos_mr.items():
-        if asset in new_positions:
-            new_positions[asset]["amount"] = round(new_positions[asset]["amount"] + info["amount"], 2)
-            new_positions[asset]["tf"] += "+mr"
-        else:
-            new_positions[asset] = {"amount": info["amount"], "action": "BUY", "tf": "mr",
-                "pct": round(info["amount"]/capital*100, 1), "classification": "REVERSION", "change_pct": info["ret_pct"]}
-    for asset, info in pos_bo.items():
-        if asset in new_positions:
-            new_positions[asset]["amount"] = round(new_positions[asset]["amount"] + info["amount"], 2)
-            new_positions[asset]["tf"] += "+bo"
-        else:
-            new_positions[asset] = {"amount": info["amount"], "action": "BUY", "tf": "bo",
-                "pct": round(info["amount"]/capital*100, 1), "classification": "BREAKOUT", "change_pct": info["ret_pct"]}
-    for asset, info in pos_sq.items():
-        if asset in new_positions:
-            new_positions[asset]["amount"] = round(new_positions[asset]["amount"] + info["amount"], 2)
-            new_positions[asset]["tf"] += "+sq"
-        else:
-            sq_dir = sq_results.get(asset, {}).get("direction", "LONG")
-            new_positions[asset] = {"amount": info["amount"], "action": "BUY", "tf": "sq",
-                "pct": round(info["amount"]/capital*100, 1), "classification": f"SQUEEZE_{sq_dir}", "change_pct": info["ret_pct"]}
-    for asset, info in pos_ls.items():
-        if asset in new_positions:
-            new_positions[asset]["amount"] = round(new_positions[asset]["amount"] + info["amount"], 2)
-            new_positions[asset]["tf"] += "+ls"
-        else:
-            ls_dir = ls_results.get(asset, {}).get("direction", "LONG")
-            new_positions[asset] = {"amount": info["amount"], "action": "BUY", "tf": "ls",
-                "pct": round(info["amount"]/capital*100, 1), "classification": f"SWEEP_{ls_dir}", "change_pct": info["ret_pct"]}
-    for asset, info in pos_fvg.items():
-        if asset in new_positions:
-            new_positions[asset]["amount"] = round(new_positions[asset]["amount"] + info["amount"], 2)
-            new_positions[asset]["tf"] += "+fvg"
-        else:
-            fvg_dir = fvg_results.get(asset, {}).get("direction", "LONG")
-            new_positions[asset] = {"amount": info["amount"], "action": "BUY", "tf": "fvg",
-                "pct": round(info["amount"]/capital*100, 1), "classification": f"FVG_{fvg_dir}", "change_pct": info["ret_pct"]}
-    for asset, info in pos_vr.items():
-        if asset in new_positions:
-            new_positions[asset]["amount"] = round(new_positions[asset]["amount"] + info["amount"], 2)
-            new_positions[asset]["tf"] += "+vr"
-        else:
-            vr_dir = vr_results.get(asset, {}).get("direction", "LONG")
-            new_positions[asset] = {"amount": info["amount"], "action": "BUY", "tf": "vr",
-                "pct": round(info["amount"]/capital*100, 1), "classification": f"VWAP_REV_{vr_dir}", "change_pct": info["ret_pct"]}
-    for asset, info in pos_pb.items():
-        if asset in new_positions:
-            new_positions[asset]["amount"] = round(new_positions[asset]["amount"] + info["amount"], 2)
-            new_positions[asset]["tf"] += "+pb"
-        else:
-            pb_dir = pb_results.get(asset, {}).get("direction", "LONG")
-            _pb_lvl = pb_results.get(asset, {}).get("pyramid_level", 1)
-            new_positions[asset] = {"amount": info["amount"], "action": "BUY", "tf": "pb",
-                "pct": round(info["amount"]/capital*100, 1), "classification": f"PYRAMID_BO_{pb_dir}_L{_pb_lvl}", "change_pct": info["ret_pct"]}
+    for bucket, tf_tag, cls_fn in _bucket_map:
+        for asset, info in bucket.items():
+            entry = new_positions.get(asset)
+            if entry is None:
+                new_positions[asset] = {"amount": info["amount"], "action": "BUY", "tf": tf_tag,
+                    "classification": cls_fn(asset), "change_pct": info["ret_pct"]}
+            else:
+                entry["amount"] += info["amount"]
+                entry["tf"] += "+" + tf_tag
+    # pct calculado uma vez, já sobre o valor somado de todos os buckets
+    inv_capital = 1.0 / capital if capital else 0.0
+    for entry in new_positions.values():
+        entry["amount"] = round(entry["amount"], 2)
+        entry["pct"] = round(entry["amount"] * inv_capital * 100, 1)
 
     # Preserva entry_time e entry_price das posições anteriores (não sobrescreve)
     for asset, pos in new_positions.items():
@@ -4283,40 +5309,76 @@ async def _run_trade_cycle_internal(assets: list = None) -> dict:
         # Saídas: ativos que saíram do portfólio
         exits = {a: info for a, info in prev_positions.items() if a not in new_positions}
 
+        # Último preço 5m de cada ativo com ordem — resolvido uma vez, sem cadeia de .get
+        k5m = klines_by_tf.get("5m") or {}
+        price_map = {a: k5m.get(a, {}).get("prices", []) for a in entries.keys() | exits.keys()}
+
+        # Cotação USD/BRL uma vez para validar o notional de todas as entradas crypto
+        usd_rate = getattr(settings, "USD_BRL_RATE", 5.75)
+        if any(market_data_service._is_crypto(a) for a in entries):
+            try:
+                lr = await market_data_service.get_usd_brl_rate()
+                if lr and lr > 0:
+                    usd_rate = lr
+            except Exception:
+                pass
+
+        async def _place_entry(asset: str, info: dict):
+            """Valida e envia a ordem de compra. Retorna (result, entry_price, quantity) ou None."""
+            prices = price_map.get(asset, [])
+            entry_price = prices[-1] if prices else 0
+            if entry_price <= 0:
+                return None
+            # Validação de valor mínimo de ordem (rejeita se abaixo do mín da corretora)
+            notional_brl = info["amount"]
+            if market_data_service._is_crypto(asset):
+                notional_usd = notional_brl / usd_rate
+                if notional_usd < settings.MIN_NOTIONAL_BINANCE_USD:
+                    print(f"[trade] Skip {asset}: ${notional_usd:.2f} < mín Binance ${settings.MIN_NOTIONAL_BINANCE_USD}", flush=True)
+                    return None
+            elif market_data_service._is_b3(asset):
+                if notional_brl < settings.MIN_NOTIONAL_BTG_BRL:
+                    print(f"[trade] Skip {asset}: R${notional_brl:.2f} < mín BTG R${settings.MIN_NOTIONAL_BTG_BRL}", flush=True)
+                    return None
+            else:
+                if notional_brl < settings.MIN_NOTIONAL_DEFAULT_BRL:
+                    print(f"[trade] Skip {asset}: R${notional_brl:.2f} < mín R${settings.MIN_NOTIONAL_DEFAULT_BRL}", flush=True)
+                    return None
+            # Quantidade: valor alocado / preço
+            quantity = round(info["amount"] / entry_price, 8)
+            if quantity <= 0:
+                return None
+            result = await market_data_service.place_order(asset, "buy", quantity, entry_price, "market")
+            return result, entry_price, quantity
+
+        async def _place_exit(asset: str, info: dict):
+            """Envia a ordem de venda. Retorna (result, exit_price, quantity) ou None."""
+            prices = price_map.get(asset, [])
+            exit_price = prices[-1] if prices else 0
+            prev_amt = info.get("amount", 0)
+            if exit_price <= 0 or prev_amt <= 0:
+                return None
+            quantity = round(prev_amt / exit_price, 8)
+            if quantity <= 0:
+                return None
+            result = await market_data_service.place_order(asset, "sell", quantity, exit_price, "market")
+            return result, exit_price, quantity
+
+        # Ordens são I/O de rede independentes — dispara todas juntas (tempo ≈ max RTT)
+        entry_results, exit_results = await asyncio.gather(
+            asyncio.gather(*(_place_entry(a, i) for a, i in entries.items()), return_exceptions=True),
+            asyncio.gather(*(_place_exit(a, i) for a, i in exits.items()), return_exceptions=True),
+        )
+
         _order_count = 0
-        for asset, info in entries.items():
+        for (asset, info), res in zip(entries.items(), entry_results):
+            if isinstance(res, Exception):
+                print(f"[trade] Erro entry order {asset}: {res}", flush=True)
+                continue
+            if res is None:
+                continue
             try:
-                prices = klines_by_tf.get("5m", {}).get(asset, {}).get("prices", [])
-                entry_price = prices[-1] if prices else 0
-                if entry_price <= 0:
-                    continue
-                # Validação de valor mínimo de ordem (rejeita se abaixo do mín da corretora)
-                notional_brl = info["amount"]
-                if market_data_service._is_crypto(asset):
-                    usd_rate = getattr(settings, "USD_BRL_RATE", 5.75)
-                    try:
-                        lr = await market_data_service.get_usd_brl_rate()
-                        if lr and lr > 0:
-                            usd_rate = lr
-                    except Exception:
-                        pass
-                    notional_usd = notional_brl / usd_rate
-                    if notional_usd < settings.MIN_NOTIONAL_BINANCE_USD:
-                        print(f"[trade] Skip {asset}: ${notional_usd:.2f} < mín Binance ${settings.MIN_NOTIONAL_BINANCE_USD}", flush=True)
-                        continue
-                elif market_data_service._is_b3(asset):
-                    if notional_brl < settings.MIN_NOTIONAL_BTG_BRL:
-                        print(f"[trade] Skip {asset}: R${notional_brl:.2f} < mín BTG R${settings.MIN_NOTIONAL_BTG_BRL}", flush=True)
-                        continue
-                else:
-                    if notional_brl < settings.MIN_NOTIONAL_DEFAULT_BRL:
-                        print(f"[trade] Skip {asset}: R${notional_brl:.2f} < mín R${settings.MIN_NOTIONAL_DEFAULT_BRL}", flush=True)
-                        continue
-                # Quantidade: valor alocado / preço
-                quantity = round(info["amount"] / entry_price, 8)
-                if quantity <= 0:
-                    continue
-                result = await market_data_service.place_order(asset, "buy", quantity, entry_price, "market")
+                result, entry_price, quantity = res
                 if result and result.get("status") not in ("REJECTED", "rejected"):
                     # Guardar preço de entrada na posição
                     new_positions[asset]["entry_price"] = entry_price
@@ -4337,17 +5399,15 @@ async def _run_trade_cycle_internal(assets: list = None) -> dict:
             except Exception as e:
                 print(f"[trade] Erro entry order {asset}: {e}", flush=True)
 
-        for asset, info in exits.items():
+        for (asset, info), res in zip(exits.items(), exit_results):
+            if isinstance(res, Exception):
+                print(f"[trade] Erro exit order {asset}: {res}", flush=True)
+                continue
+            if res is None:
+                continue
             try:
-                prices = klines_by_tf.get("5m", {}).get(asset, {}).get("prices", [])
-                exit_price = prices[-1] if prices else 0
+                result, exit_price, quantity = res
                 prev_amt = info.get("amount", 0)
-                if exit_price <= 0 or prev_amt <= 0:
-                    continue
-                quantity = round(prev_amt / exit_price, 8)
-                if quantity <= 0:
-                    continue
-                result = await market_data_service.place_order(asset, "sell", quantity, exit_price, "market")
                 if result and result.get("status") not in ("REJECTED", "rejected"):
                     entry_px = info.get("entry_price", exit_price)
                     trade_pnl = round((exit_price - entry_px) / entry_px * prev_amt, 4) if entry_px > 0 else 0
@@ -4377,8 +5437,9 @@ async def _run_trade_cycle_internal(assets: list = None) -> dict:
         risk_manager.daily_pnl = round(risk_manager.daily_pnl + cycle_pnl, 4)
         # Registrar posições no risk_manager para stop loss/take profit
         risk_manager.positions.clear()
+        k5m = klines_by_tf.get("5m") or {}
         for asset, info in new_positions.items():
-            prices = klines_by_tf.get("5m", {}).get(asset, {}).get("prices", [])
+            prices = k5m.get(asset, {}).get("prices", [])
             entry_price = prices[-1] if prices else 0
             if entry_price > 0:
                 risk_manager.register_position(asset, entry_price, info["amount"])
@@ -4584,12 +5645,12 @@ async def scheduler_status():
     return {
         "success": True,
         "data": {
-            "running":            _scheduler_state["running"],
-            "interval_minutes":   _scheduler_state["interval_minutes"],
-            "only_market_hours":  _scheduler_state["only_market_hours"],
+            "running":            _scheduler_state.running,
+            "interval_minutes":   _scheduler_state.interval_minutes,
+            "only_market_hours":  _scheduler_state.only_market_hours,
             "total_auto_cycles":  _effective_total_cycles(),
             "market_open_now":    _is_market_open(),
-            "session":            _scheduler_state.get("session", _current_session()[1]),
+            "session":            _scheduler_state.session,
             "b3_open":            _is_market_open(),
             "crypto_always_on":   True,
             "recent_errors":      _last_scheduler_errors[-5:],
@@ -4598,6 +5659,21 @@ async def scheduler_status():
     }
 
 
+@app.get("/scheduler/metrics")
+async def scheduler_metrics(limit: int = 100):
+    """Últimos ciclos automáticos (ring buffer binário): ts, ciclo, pnl, irq, grid_pnl, turbo."""
+    rows = _cycle_metrics_tail(limit)
+    return {
+        "success": True,
+        "total_recorded": _cycle_metrics_count,
+        "fields": ["ts", "cycle", "pnl", "irq", "grid_pnl", "turbo"],
+        "data": [
+            [datetime.fromtimestamp(ts).isoformat(), int(cycle), pnl, irq, grid_pnl, bool(turbo)]
+            for ts, cycle, pnl, irq, grid_pnl, turbo in rows
+        ],
+    }
+
+
 @app.post("/scheduler/start")
 async def scheduler_start(body: dict = None):
     """Inicia (ou reinicia) o scheduler automático."""
@@ -4606,28 +5682,24 @@ async def scheduler_start(body: dict = None):
         minutes = int(body["interval_minutes"])
         if minutes < 1:
             raise HTTPException(status_code=400, detail="interval_minutes deve ser >= 1")
-        _scheduler_state["interval_minutes"] = minutes
+        _scheduler_state.interval_minutes = minutes
     if "only_market_hours" in body:
-        _scheduler_state["only_market_hours"] = bool(body["only_market_hours"])
+        _scheduler_state.only_market_hours = bool(body["only_market_hours"])
 
-    # Cancelar task anterior se existir
-    old_task = _scheduler_state.get("task")
+    # Parar task anterior se existir
+    old_task = _scheduler_state.task
     if old_task and not old_task.done():
-        _scheduler_state["running"] = False
-        old_task.cancel()
-        try:
-            await old_task
-        except asyncio.CancelledError:
-            pass
+        await _stop_scheduler_task(old_task)
 
+    _scheduler_state.stop_event = asyncio.Event()
     task = asyncio.create_task(_auto_cycle_loop())
-    _scheduler_state["task"] = task
+    _scheduler_state.task = task
     _persist_scheduler_state()
     _trade_log("SCHEDULER", "—", 0,
-        f"▶️ Scheduler INICIADO — ciclo a cada {_scheduler_state['interval_minutes']} min")
+        f"▶️ Scheduler INICIADO — ciclo a cada {_scheduler_state.interval_minutes} min")
     return {
         "success": True,
-        "message": f"Scheduler iniciado (ciclo a cada {_scheduler_state['interval_minutes']} min)",
+        "message": f"Scheduler iniciado (ciclo a cada {_scheduler_state.interval_minutes} min)",
         "running": True,
     }
 
@@ -4635,14 +5707,7 @@ async def scheduler_start(body: dict = None):
 @app.post("/scheduler/stop")
 async def scheduler_stop():
     """Para o scheduler automático."""
-    _scheduler_state["running"] = False
-    task = _scheduler_state.get("task")
-    if task and not task.done():
-        task.cancel()
-        try:
-            await task
-        except asyncio.CancelledError:
-            pass
+    await _stop_scheduler_task(_scheduler_state.task)
     _persist_scheduler_state()
     _trade_log("SCHEDULER", "—", 0, "⏹️ Scheduler PARADO")
     return {"success": True, "message": "Scheduler parado", "running": False}
@@ -4661,15 +5726,15 @@ async def scheduler_config(body: dict):
         minutes = int(body["interval_minutes"])
         if minutes < 1:
             raise HTTPException(status_code=400, detail="interval_minutes deve ser >= 1")
-        _scheduler_state["interval_minutes"] = minutes
+        _scheduler_state.interval_minutes = minutes
     if "only_market_hours" in body:
-        _scheduler_state["only_market_hours"] = bool(body["only_market_hours"])
+        _scheduler_state.only_market_hours = bool(body["only_market_hours"])
     _persist_scheduler_state()
     return {
         "success": True,
         "data": {
-            "interval_minutes":  _scheduler_state["interval_minutes"],
-            "only_market_hours": _scheduler_state["only_market_hours"],
+            "interval_minutes":  _scheduler_state.interval_minutes,
+            "only_market_hours": _scheduler_state.only_market_hours,
         },
     }
 
@@ -4678,12 +5743,43 @@ async def scheduler_config(body: dict):
 # ENDPOINTS: PERFORMANCE & BACKTEST
 # ═══════════════════════════════════════════
 
+# Campos do /performance que não dependem dos somatórios sobre os ciclos
+_PERF_AGG_FREE_FIELDS = frozenset({
+    "total_cycles", "win_count", "loss_count", "win_rate_pct",
+    "best_cycle_pnl", "worst_cycle_pnl", "max_drawdown_pct", "equity_curve",
+    "recent_cycles", "last_backtest", "current_capital", "total_gain", "total_loss",
+    "profit_factor", "avg_win", "avg_loss", "risk_reward_ratio", "cost_model_assumptions",
+    "alloc_5m_pct", "alloc_1h_pct", "alloc_1d_pct", "alloc_mr_pct", "alloc_bo_pct",
+    "alloc_sq_pct", "alloc_ls_pct", "alloc_fvg_pct", "alloc_vr_pct", "alloc_pb_pct",
+})
+_PERF_DD_FIELDS = frozenset({"max_drawdown_pct", "readiness_score", "readiness_label", "readiness_breakdown"})
+
+
+def _perf_aggregates_empty() -> dict:
+    """Agregado zerado — usado quando nenhum campo pedido depende dos ciclos."""
+    return {
+        "n": 0, "mu": 0.0, "sigma": 0.0,
+        "total": dict.fromkeys(_PERF_FIELDS, 0.0),
+        "today": dict.fromkeys(_PERF_FIELDS, 0.0),
+        "today_n": 0, "today_gain": 0.0, "today_loss": 0.0,
+        "bucket_wr": dict.fromkeys(_PERF_BUCKETS, (0, 0)),
+    }
+
+
 @app.get("/performance")
-async def get_performance():
+async def get_performance(fields: str = None):
     """
     Retorna métricas de performance acumuladas desde o primeiro ciclo:
     P&L total, win rate, melhor/pior ciclo, equity curve, Sharpe estimado.
+    `fields` (opcional, separado por vírgula) restringe a resposta e pula os
+    cálculos que nenhum campo pedido usa (somatórios dos ciclos, drawdown).
     """
+    wanted = frozenset(f.strip() for f in fields.split(",") if f.strip()) if fields else None
+    cache_key = _perf_cache_key(_brt_now().toordinal(), _trade_state.get("capital"),
+                                tuple(sorted(wanted)) if wanted else None)
+    if cache_key is not None and _perf_cache["perf"][0] == cache_key:
+        return _json_body(_perf_cache["perf"][1])
+
     cycles = _perf_state.get("cycles", [])
     equity = _perf_state.get("total_pnl_history", [])
     wins   = _perf_state.get("win_count", 0)
@@ -4693,59 +5789,52 @@ async def get_performance():
     _cycles_offset = int(_perf_state.get("total_cycles_offset", 0))
     _pnl_offset    = float(_perf_state.get("total_pnl_offset", 0.0))
 
-    # Calcular Sharpe dos ciclos
-    pnls = [c["pnl"] for c in cycles]
-    if len(pnls) >= 2:
-        import statistics as _stats
-        mu    = _stats.mean(pnls)
-        sigma = _stats.stdev(pnls)
-        sharpe = (mu / sigma) * (252 ** 0.5) if sigma > 0 else 0.0
+    # Somatórios numa passada (colunas NumPy quando disponível)
+    if wanted is None or not wanted <= _PERF_AGG_FREE_FIELDS:
+        agg = _perf_aggregates(_brt_now().toordinal())
     else:
-        sharpe = 0.0
+        agg = _perf_aggregates_empty()
+    tot, tod = agg["total"], agg["today"]
+
+    # Calcular Sharpe dos ciclos
+    sigma = agg["sigma"]
+    sharpe = (agg["mu"] / sigma) * (252 ** 0.5) if agg["n"] >= 2 and sigma > 0 else 0.0
 
     # Usa P&L histórico persistido quando não há ciclos carregados em memória
-    total_pnl = sum(pnls) + _pnl_offset if pnls else _pnl_offset
-    avg_daily = total_pnl / _effective_total_cycles() if _effective_total_cycles() else 0.0
+    total_pnl = tot["pnl"] + _pnl_offset
+    eff_cycles = _effective_total_cycles()
+    win_rate = wins / total * 100 if total > 0 else 0.0
+    avg_daily = total_pnl / eff_cycles if eff_cycles else 0.0
 
     # Max drawdown da equity curve
-    max_dd = 0.0
-    if len(equity) > 1:
-        peak = equity[0]
-        for v in equity:
-            peak = max(peak, v)
-            dd = (v - peak) / peak * 100 if peak > 0 else 0
-            max_dd = min(max_dd, dd)
+    max_dd = _max_drawdown_pct(equity) if wanted is None or not wanted.isdisjoint(_PERF_DD_FIELDS) else 0.0
 
     # P&L por timeframe — hoje e total (horário BRT UTC-3)
-    from datetime import timezone as _tz, timedelta as _td
-    _brt = _tz(_td(hours=-3))
-    today_str = datetime.now(_brt).strftime("%Y-%m-%d")
-    today_cycles = [c for c in cycles if c.get("timestamp", "").startswith(today_str)]
-    pnl_today_5m  = round(sum(c.get("pnl_5m", 0) for c in today_cycles), 2)
-    pnl_today_1h  = round(sum(c.get("pnl_1h", 0) for c in today_cycles), 2)
-    pnl_today_1d  = round(sum(c.get("pnl_1d", 0) for c in today_cycles), 2)
+    pnl_today_5m  = round(tod["pnl_5m"], 2)
+    pnl_today_1h  = round(tod["pnl_1h"], 2)
+    pnl_today_1d  = round(tod["pnl_1d"], 2)
     pnl_today     = round(pnl_today_5m + pnl_today_1h + pnl_today_1d, 2)
-    today_gain    = round(sum(c.get("pnl", 0) for c in today_cycles if c.get("pnl", 0) > 0), 2)
-    today_loss    = round(sum(abs(c.get("pnl", 0)) for c in today_cycles if c.get("pnl", 0) < 0), 2)
-    pnl_total_5m  = round(sum(c.get("pnl_5m", 0) for c in cycles), 2)
-    pnl_total_1h  = round(sum(c.get("pnl_1h", 0) for c in cycles), 2)
-    pnl_total_1d  = round(sum(c.get("pnl_1d", 0) for c in cycles), 2)
-    costs_today_total = round(sum(c.get("fees_total", 0) or 0 for c in today_cycles), 4)
-    costs_today_brokerage = round(sum(c.get("fees_brokerage", 0) or 0 for c in today_cycles), 4)
-    costs_today_exchange = round(sum(c.get("fees_exchange", 0) or 0 for c in today_cycles), 4)
-    costs_today_spread = round(sum(c.get("fees_spread", 0) or 0 for c in today_cycles), 4)
-    costs_today_slippage = round(sum(c.get("fees_slippage", 0) or 0 for c in today_cycles), 4)
-    costs_today_fx = round(sum(c.get("fees_fx", 0) or 0 for c in today_cycles), 4)
-
-    costs_total = round(_perf_state.get("total_fees") or sum(c.get("fees_total", 0) or 0 for c in cycles), 4)
-    costs_total_brokerage = round(_perf_state.get("total_brokerage") or sum(c.get("fees_brokerage", 0) or 0 for c in cycles), 4)
-    costs_total_exchange = round(_perf_state.get("total_exchange_fees") or sum(c.get("fees_exchange", 0) or 0 for c in cycles), 4)
-    costs_total_spread = round(_perf_state.get("total_spread") or sum(c.get("fees_spread", 0) or 0 for c in cycles), 4)
-    costs_total_slippage = round(_perf_state.get("total_slippage") or sum(c.get("fees_slippage", 0) or 0 for c in cycles), 4)
-    costs_total_fx = round(_perf_state.get("total_fx") or sum(c.get("fees_fx", 0) or 0 for c in cycles), 4)
-    # totais acumulados (da memória persistida, com fallback do cálculo instantâneo)
-    total_gain_acc = _perf_state.get("total_gain") or round(sum(c.get("pnl", 0) for c in cycles if c.get("pnl", 0) > 0), 2)
-    total_loss_acc = _perf_state.get("total_loss") or round(sum(abs(c.get("pnl", 0)) for c in cycles if c.get("pnl", 0) < 0), 2)
+    today_gain    = round(agg["today_gain"], 2)
+    today_loss    = round(agg["today_loss"], 2)
+    pnl_total_5m  = round(tot["pnl_5m"], 2)
+    pnl_total_1h  = round(tot["pnl_1h"], 2)
+    pnl_total_1d  = round(tot["pnl_1d"], 2)
+    costs_today_total = round(tod["fees_total"], 4)
+    costs_today_brokerage = round(tod["fees_brokerage"], 4)
+    costs_today_exchange = round(tod["fees_exchange"], 4)
+    costs_today_spread = round(tod["fees_spread"], 4)
+    costs_today_slippage = round(tod["fees_slippage"], 4)
+    costs_today_fx = round(tod["fees_fx"], 4)
+
+    costs_total = round(_perf_state.get("total_fees") or tot["fees_total"], 4)
+    costs_total_brokerage = round(_perf_state.get("total_brokerage") or tot["fees_brokerage"], 4)
+    costs_total_exchange = round(_perf_state.get("total_exchange_fees") or tot["fees_exchange"], 4)
+    costs_total_spread = round(_perf_state.get("total_spread") or tot["fees_spread"], 4)
+    costs_total_slippage = round(_perf_state.get("total_slippage") or tot["fees_slippage"], 4)
+    costs_total_fx = round(_perf_state.get("total_fx") or tot["fees_fx"], 4)
+    # totais acumulados — mantidos incrementalmente a cada ciclo registrado
+    total_gain_acc = _perf_state.get("total_gain", 0.0)
+    total_loss_acc = _perf_state.get("total_loss", 0.0)
 
     # ── Métricas de diagnóstico avançadas ─────────────────────────────────
     profit_factor = round(total_gain_acc / total_loss_acc, 3) if total_loss_acc > 0 else 0.0
@@ -4754,26 +5843,26 @@ async def get_performance():
     risk_reward_ratio = round(avg_win / avg_loss, 2) if avg_loss > 0 else 0.0
 
     # Per-bucket PnL totais (ciclos com os novos campos pnl_mr/bo/sq/ls/fvg)
-    pnl_total_mr  = round(sum(c.get("pnl_mr",  0) or 0 for c in cycles), 2)
-    pnl_total_bo  = round(sum(c.get("pnl_bo",  0) or 0 for c in cycles), 2)
-    pnl_total_sq  = round(sum(c.get("pnl_sq",  0) or 0 for c in cycles), 2)
-    pnl_total_ls  = round(sum(c.get("pnl_ls",  0) or 0 for c in cycles), 2)
-    pnl_total_fvg = round(sum(c.get("pnl_fvg", 0) or 0 for c in cycles), 2)
-    pnl_total_vr  = round(sum(c.get("pnl_vr",  0) or 0 for c in cycles), 2)
-    pnl_total_pb  = round(sum(c.get("pnl_pb",  0) or 0 for c in cycles), 2)
+    pnl_total_mr  = round(tot["pnl_mr"], 2)
+    pnl_total_bo  = round(tot["pnl_bo"], 2)
+    pnl_total_sq  = round(tot["pnl_sq"], 2)
+    pnl_total_ls  = round(tot["pnl_ls"], 2)
+    pnl_total_fvg = round(tot["pnl_fvg"], 2)
+    pnl_total_vr  = round(tot["pnl_vr"], 2)
+    pnl_total_pb  = round(tot["pnl_pb"], 2)
 
     # Per-bucket win rates (ciclos onde o bucket gerou pnl > 0)
     def _bucket_wr(key: str) -> float:
-        vals = [c.get(key, 0) or 0 for c in cycles if (c.get(key, 0) or 0) != 0]
-        if not vals:
+        nonzero, positive = agg["bucket_wr"][key]
+        if not nonzero:
             return 0.0
-        return round(sum(1 for v in vals if v > 0) / len(vals) * 100, 1)
+        return round(positive / nonzero * 100, 1)
 
     # Readiness Score 0-100 — quão próximo de capital real
     # Critérios: PF>=1.5(25pts) + WR>=40%(20pts) + Cycles>=1000(20pts) + Sharpe>=1.5(20pts) + MaxDD>-10%(15pts)
     _rs_pf    = 25 if profit_factor >= 1.5 else round(profit_factor / 1.5 * 25, 1)
-    _rs_wr    = 20 if (wins/total*100 if total > 0 else 0) >= 40 else round((wins/total*100 if total > 0 else 0) / 40 * 20, 1)
-    _rs_cyc   = 20 if _effective_total_cycles() >= 1000 else round(_effective_total_cycles() / 1000 * 20, 1)
+    _rs_wr    = 20 if win_rate >= 40 else round(win_rate / 40 * 20, 1)
+    _rs_cyc   = 20 if eff_cycles >= 1000 else round(eff_cycles / 1000 * 20, 1)
     _rs_sh    = 20 if sharpe >= 1.5 else round(max(sharpe, 0) / 1.5 * 20, 1)
     _rs_dd    = 15 if max_dd > -10 else round(max(0, (max_dd + 20) / 10 * 15), 1)
     readiness_score = round(_rs_pf + _rs_wr + _rs_cyc + _rs_sh + _rs_dd, 1)
@@ -4784,20 +5873,20 @@ async def get_performance():
         else "CEDO DEMAIS"
     )
 
-    return {
+    payload = {
         "success": True,
         "data": {
-            "total_cycles":      _effective_total_cycles(),
+            "total_cycles":      eff_cycles,
             "win_count":         wins,
             "loss_count":        losses,
-            "win_rate_pct":      round(wins / total * 100, 2) if total > 0 else 0.0,
+            "win_rate_pct":      round(win_rate, 2),
             "total_pnl":         round(total_pnl, 2),
             "avg_pnl_per_cycle": round(avg_daily, 2),
             "best_cycle_pnl":    _perf_state.get("best_day_pnl", 0.0),
             "worst_cycle_pnl":   _perf_state.get("worst_day_pnl", 0.0),
             "max_drawdown_pct":  round(max_dd, 4),
             "sharpe_ratio":      round(sharpe, 4),
-            "equity_curve":      equity[-100:],
+            "equity_curve":      _tail(equity, 100),
             "recent_cycles":     cycles[-20:],
             "last_backtest":     _perf_state.get("last_backtest"),
             "current_capital":   _trade_state.get("capital"),
@@ -4806,7 +5895,7 @@ async def get_performance():
             "pnl_today_5m":      pnl_today_5m,
             "pnl_today_1h":      pnl_today_1h,
             "pnl_today_1d":      pnl_today_1d,
-            "today_cycles":      len(today_cycles),
+            "today_cycles":      agg["today_n"],
             # Ganho e perda separados — hoje
             "today_gain":        today_gain,
             "today_loss":        today_loss,
@@ -4880,48 +5969,32 @@ async def get_performance():
             "alloc_pb_pct":      int(_PB_ALLOC_PCT * 100),
         },
     }
+    if wanted is not None:
+        payload["data"] = {k: v for k, v in payload["data"].items() if k in wanted}
+    # Serializa uma vez; o cache guarda os bytes e os hits não re-encodam nada
+    body = _FastJSONResponse(payload).body
+    if cache_key is not None:
+        _perf_cache["perf"] = (cache_key, body)
+    return _json_body(body)
 
 
 @app.get("/performance/history")
 async def get_performance_history():
     """
     Retorna PnL agrupado por dia (BRT), com todos os ciclos históricos.
+    Lê o rollup diário mantido no registro de cada ciclo — O(dias), não O(ciclos).
     """
-    from datetime import timezone as _tz, timedelta as _td
-    from collections import defaultdict
-    _brt = _tz(_td(hours=-3))
+    cache_key = _perf_cache_key()
+    if cache_key is not None and _perf_cache["history"][0] == cache_key:
+        return _json_body(_perf_cache["history"][1])
 
     cycles = _perf_state.get("cycles", [])
-
-    by_day: dict = defaultdict(lambda: {
-        "pnl": 0.0, "pnl_5m": 0.0, "pnl_1h": 0.0, "pnl_1d": 0.0,
-        "cycles": 0, "wins": 0, "losses": 0,
-        "best_cycle": 0.0, "worst_cycle": 0.0,
-    })
-
-    for c in cycles:
-        ts = c.get("timestamp", "")
-        if not ts:
-            continue
-        day = ts[:10]
-        pnl = c.get("pnl", 0) or 0.0
-        by_day[day]["pnl"]     += pnl
-        by_day[day]["pnl_5m"]  += c.get("pnl_5m", 0) or 0.0
-        by_day[day]["pnl_1h"]  += c.get("pnl_1h", 0) or 0.0
-        by_day[day]["pnl_1d"]  += c.get("pnl_1d", 0) or 0.0
-        by_day[day]["cycles"]  += 1
-        if pnl > 0:
-            by_day[day]["wins"] += 1
-            if pnl > by_day[day]["best_cycle"]:
-                by_day[day]["best_cycle"] = pnl
-        elif pnl < 0:
-            by_day[day]["losses"] += 1
-            if pnl < by_day[day]["worst_cycle"]:
-                by_day[day]["worst_cycle"] = pnl
+    if _perf_state.get("by_day") is None:
+        _rollup_rebuild()
+    by_day = _perf_state["by_day"]
 
     daily = []
-    for day in sorted(by_day.keys()):
-        d = by_day[day]
+    for day, d in by_day.items():
         daily.append({
             "date":        day,
             "pnl":         round(d["pnl"], 2),
@@ -4937,18 +6010,144 @@ async def get_performance_history():
         })
 
     total_pnl = sum(c.get("pnl", 0) or 0 for c in cycles) + float(_perf_state.get("total_pnl_offset", 0.0))
-    return {
+    payload = {
         "success": True,
         "total_cycles": _effective_total_cycles(),
         "total_pnl": round(total_pnl, 2),
         "days": daily,
     }
+    body = _FastJSONResponse(payload).body
+    if cache_key is not None:
+        _perf_cache["history"] = (cache_key, body)
+    return _json_body(body)
 
 
 # ═══════════════════════════════════════════
 # ENDPOINTS: SIMULAÇÃO & TESTES
 # ═══════════════════════════════════════════
 
+def _run_sim_cycles(market_data: dict, cycles: int, capital: float) -> dict:
+    """
+    Loop de ciclos do /simulate (CPU puro: momentum, risco, alocação, P&L).
+    Síncrono para rodar em thread via asyncio.to_thread sem travar o event loop.
+    """
+    equity_curve = [capital]
+    events = []
+    asset_stats = {}
+    wins = 0
+    losses = 0
+    best_cycle_pnl = 0.0
+    worst_cycle_pnl = 0.0
+    sim_capital = capital
+
+    # Retorno do último candle por ativo — market_data é fixo entre ciclos,
+    # então é calculado uma vez e o P&L do ciclo vira um produto escalar
+    asset_list = list(market_data)
+    asset_idx = {a: i for i, a in enumerate(asset_list)}
+    last_rets = _last_returns(asset_list, market_data)
+    ret_vec = np.asarray(last_rets, dtype=np.float64) if NUMPY_AVAILABLE else None
+
+    for cycle_num in range(1, cycles + 1):
+        # Analisar momentum
+        momentum_results = MomentumAnalyzer.calculate_multiple_assets(market_data)
+        if not momentum_results:
+            continue
+
+        momentum_scores = {a: d["momentum_score"] for a, d in momentum_results.items()}
+
+        # Risco
+        ref_asset = list(market_data.keys())[0]
+        ref_data = market_data[ref_asset]
+        risk_analysis = RiskAnalyzer.calculate_irq(
+            ref_data.get("prices", []),
+            ref_data.get("volumes", []),
+        )
+        irq_score = risk_analysis["irq_score"]
+
+        # Alocação
+        allocation = PortfolioManager.calculate_portfolio_allocation(
+            momentum_scores, irq_score, sim_capital,
+        )
+        rebalancing = PortfolioManager.apply_rebalancing_rules(
+            allocation, momentum_results, sim_capital, irq_score,
+        )
+
+        # Simular P&L baseado na variação real do último candle
+        cycle_pnl = 0.0
+        alloc_vec = np.zeros(len(asset_list)) if ret_vec is not None else None
+        for asset, alloc in rebalancing.items():
+            rec = alloc.get("recommended_amount", 0)
+            action = alloc.get("action", "HOLD")
+            classif = alloc.get("classification", "—")
+
+            if rec > 0:
+                i = asset_idx.get(asset)
+                if i is not None:
+                    if alloc_vec is not None:
+                        alloc_vec[i] = rec
+                    else:
+                        cycle_pnl += rec * last_rets[i]
+
+                # Track asset stats
+                if asset not in asset_stats:
+                    asset_stats[asset] = {
+                        "total_allocated": 0,
+                        "times_selected": 0,
+                        "avg_score": 0,
+                        "classification": classif,
+                    }
+                asset_stats[asset]["total_allocated"] += rec
+                asset_stats[asset]["times_selected"] += 1
+                asset_stats[asset]["avg_score"] += momentum_scores.get(asset, 0)
+                asset_stats[asset]["classification"] = classif
+
+            if action in ("BUY", "SELL") and rec > 0:
+                events.append({
+                    "cycle": cycle_num,
+                    "type": action,
+                    "asset": asset,
+                    "amount": rec,
+                    "classification": classif,
+                })
+
+        if alloc_vec is not None:
+            cycle_pnl = float(alloc_vec @ ret_vec)
+        sim_capital += cycle_pnl
+        equity_curve.append(round(sim_capital, 4))
+
+        if cycle_pnl > 0:
+            wins += 1
+        elif cycle_pnl < 0:
+            losses += 1
+
+        best_cycle_pnl = max(best_cycle_pnl, cycle_pnl)
+        worst_cycle_pnl = min(worst_cycle_pnl, cycle_pnl)
+
+    # Calcular médias dos asset stats
+    for asset in asset_stats:
+        t = asset_stats[asset]["times_selected"]
+        if t > 0:
+            asset_stats[asset]["avg_score"] /= t
+            asset_stats[asset]["avg_score"] = round(asset_stats[asset]["avg_score"], 4)
+        asset_stats[asset]["total_allocated"] = round(asset_stats[asset]["total_allocated"], 2)
+
+    total_pnl = sim_capital - capital
+    total_cycles = wins + losses
+
+    return {
+        "total_cycles": cycles,
+        "final_capital": round(sim_capital, 4),
+        "total_pnl": round(total_pnl, 4),
+        "win_rate_pct": round(wins / total_cycles * 100, 2) if total_cycles > 0 else 0,
+        "avg_pnl_per_cycle": round(total_pnl / cycles, 4) if cycles > 0 else 0,
+        "best_cycle": round(best_cycle_pnl, 4),
+        "worst_cycle": round(worst_cycle_pnl, 4),
+        "equity_curve": equity_curve,
+        "asset_summary": asset_stats,
+        "events": events[-50:],  # últimos 50 eventos
+    }
+
+
 @app.post("/simulate")
 async def run_simulation(body: dict = None):
     """
@@ -4961,15 +6160,6 @@ async def run_simulation(body: dict = None):
     interval  = body.get("interval", "5m")
     limit     = min(int(body.get("limit", 100)), 200)
 
-    equity_curve = [capital]
-    events = []
-    asset_stats = {}
-    wins = 0
-    losses = 0
-    best_cycle_pnl = 0.0
-    worst_cycle_pnl = 0.0
-    sim_capital = capital
-
     try:
         # Buscar dados de mercado uma vez
         all_assets = list(settings.ALL_ASSETS)
@@ -4986,110 +6176,28 @@ async def run_simulation(body: dict = None):
         if not market_data:
             market_data = test_assets_data
 
-        for cycle_num in range(1, cycles + 1):
-            # Analisar momentum
-            momentum_results = MomentumAnalyzer.calculate_multiple_assets(market_data)
-            if not momentum_results:
-                continue
-
-            momentum_scores = {a: d["momentum_score"] for a, d in momentum_results.items()}
-
-            # Risco
-            ref_asset = list(market_data.keys())[0]
-            ref_data = market_data[ref_asset]
-            risk_analysis = RiskAnalyzer.calculate_irq(
-                ref_data.get("prices", []),
-                ref_data.get("volumes", []),
-            )
-            irq_score = risk_analysis["irq_score"]
-
-            # Alocação
-            allocation = PortfolioManager.calculate_portfolio_allocation(
-                momentum_scores, irq_score, sim_capital,
-            )
-            rebalancing = PortfolioManager.apply_rebalancing_rules(
-                allocation, momentum_results, sim_capital, irq_score,
-            )
-
-            # Simular P&L baseado na variação real do último candle
-            cycle_pnl = 0.0
-            for asset, alloc in rebalancing.items():
-                rec = alloc.get("recommended_amount", 0)
-                action = alloc.get("action", "HOLD")
-                classif = alloc.get("classification", "—")
-
-                if rec > 0:
-                    # Pegar variação real do ativo
-                    prices = market_data.get(asset, {}).get("prices", [])
-                    if len(prices) >= 2:
-                        pct_change = (prices[-1] - prices[-2]) / prices[-2]
-                    else:
-                        pct_change = 0
-
-                    asset_pnl = rec * pct_change
-                    cycle_pnl += asset_pnl
-
-                    # Track asset stats
-                    if asset not in asset_stats:
-                        asset_stats[asset] = {
-                            "total_allocated": 0,
-                            "times_selected": 0,
-                            "avg_score": 0,
-                            "classification": classif,
-                        }
-                    asset_stats[asset]["total_allocated"] += rec
-                    asset_stats[asset]["times_selected"] += 1
-                    asset_stats[asset]["avg_score"] += momentum_scores.get(asset, 0)
-                    asset_stats[asset]["classification"] = classif
-
-                if action in ("BUY", "SELL") and rec > 0:
-                    events.append({
-                        "cycle": cycle_num,
-                        "type": action,
-                        "asset": asset,
-                        "amount": rec,
-                        "classification": classif,
-                    })
-
-            sim_capital += cycle_pnl
-            equity_curve.append(round(sim_capital, 4))
-
-            if cycle_pnl > 0:
-                wins += 1
-            elif cycle_pnl < 0:
-                losses += 1
+        data = await asyncio.to_thread(_run_sim_cycles, market_data, cycles, capital)
+        return {"success": True, "data": data}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-            best_cycle_pnl = max(best_cycle_pnl, cycle_pnl)
-            worst_cycle_pnl = min(worst_cycle_pnl, cycle_pnl)
 
-        # Calcular médias dos asset stats
-        for asset in asset_stats:
-            t = asset_stats[asset]["times_selected"]
-            if t > 0:
-                asset_stats[asset]["avg_score"] /= t
-                asset_stats[asset]["avg_score"] = round(asset_stats[asset]["avg_score"], 4)
-            asset_stats[asset]["total_allocated"] = round(asset_stats[asset]["total_allocated"], 2)
+# Score "até o penúltimo candle" por ativo no /simulate/test-momentum, memoizado
+# pelos dois últimos closes — repetir o teste dentro do mesmo candle não recalcula
+_test_mom_cache: OrderedDict = OrderedDict()
 
-        total_pnl = sim_capital - capital
-        total_cycles = wins + losses
 
-        return {
-            "success": True,
-            "data": {
-                "total_cycles": cycles,
-                "final_capital": round(sim_capital, 4),
-                "total_pnl": round(total_pnl, 4),
-                "win_rate_pct": round(wins / total_cycles * 100, 2) if total_cycles > 0 else 0,
-                "avg_pnl_per_cycle": round(total_pnl / cycles, 4) if cycles > 0 else 0,
-                "best_cycle": round(best_cycle_pnl, 4),
-                "worst_cycle": round(worst_cycle_pnl, 4),
-                "equity_curve": equity_curve,
-                "asset_summary": asset_stats,
-                "events": events[-50:],  # últimos 50 eventos
-            },
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+def _test_momentum_score(asset: str, prices: list, volumes: list) -> float:
+    key = (asset, len(prices), prices[-2], prices[-1])
+    score = _test_mom_cache.get(key)
+    if score is None:
+        score = MomentumAnalyzer.calculate_momentum_score(prices[:-1], volumes[:-1])["momentum_score"]
+        _test_mom_cache[key] = score
+        if len(_test_mom_cache) > _MOM_CACHE_CAP:
+            _test_mom_cache.popitem(last=False)
+    else:
+        _test_mom_cache.move_to_end(key)
+    return score
 
 
 @app.post("/simulate/test-momentum")
@@ -5114,26 +6222,31 @@ async def test_momentum_accuracy():
         correct = 0
         total = 0
 
-        for asset, data in market_data.items():
+        # Retorno real do último candle de todos os ativos numa passada
+        assets = list(market_data)
+        last_rets = _last_returns(assets, market_data)
+
+        for asset, ret in zip(assets, last_rets):
+            data = market_data[asset]
             prices = data.get("prices", [])
             volumes = data.get("volumes", [1.0] * len(prices))
             if len(prices) < 10:
                 continue
 
             # Prever com dados até o penúltimo candle
-            m = MomentumAnalyzer.calculate_momentum_score(prices[:-1], volumes[:-1])
-            predicted_up = m["momentum_score"] > 0
-            real_up = prices[-1] > prices[-2]
+            score = _test_momentum_score(asset, prices, volumes)
+            predicted_up = score > 0
+            real_up = ret > 0
             is_correct = (predicted_up == real_up)
 
             # Lateral é considerado acerto se movimento < 0.05%
-            pct = abs((prices[-1] - prices[-2]) / prices[-2] * 100)
+            pct = abs(ret * 100)
             if pct < 0.05:
                 is_correct = True
 
             results.append({
                 "asset": asset,
-                "score": round(m["momentum_score"], 4),
+                "score": round(score, 4),
                 "predicted": "ALTA" if predicted_up else "QUEDA",
                 "actual": "ALTA" if real_up else "QUEDA",
                 "correct": is_correct,
@@ -5404,6 +6517,10 @@ async def ml_stats():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Limita backtests simultâneos ao nº de CPUs (cada um ocupa uma thread do pool)
+_backtest_sem = asyncio.Semaphore(os.cpu_count() or 1)
+
+
 @app.post("/backtest")
 async def run_backtest_endpoint(body: dict = None):
     """
@@ -5415,7 +6532,8 @@ async def run_backtest_endpoint(body: dict = None):
         rebalance_interval:  int  — passos entre rebalanceamentos (default 1)
         assets:              list — lista de símbolos (default ALL_ASSETS)
     """
-    from backtest import run_real_backtest
+    if run_real_backtest is None:
+        raise HTTPException(status_code=503, detail="Módulo de backtest não disponível")
 
     body = body or {}
     interval           = body.get("interval", "1d")
@@ -5428,13 +6546,14 @@ async def run_backtest_endpoint(body: dict = None):
         limit = 200  # Yahoo Finance free API cap
 
     try:
-        report = await run_real_backtest(
-            assets=assets,
-            interval=interval,
-            limit=limit,
-            rebalance_interval=rebalance_interval,
-            initial_capital=capital,
-        )
+        async with _backtest_sem:
+            report = await run_real_backtest(
+                assets=assets,
+                interval=interval,
+                limit=limit,
+                rebalance_interval=rebalance_interval,
+                initial_capital=capital,
+            )
 
         # Salvar resultado do backtest no performance state
         _perf_state["last_backtest"] = {
@@ -5448,7 +6567,8 @@ async def run_backtest_endpoint(body: dict = None):
             "max_drawdown_pct":report.get("max_drawdown_pct"),
             "data_source":     report.get("data_source"),
         }
-        db_state.save_state("performance", _perf_state)
+        _perf_touch()
+        _save_perf()
 
         return {
             "success": True,
@@ -5475,7 +6595,6 @@ async def _fetch_forex() -> dict:
     now = _time_module.time()
     if now - _forex_cache["ts"] < _FOREX_TTL and _forex_cache["data"]:
         return _forex_cache["data"]
-    import httpx
     pairs = {
         "USD/BRL": "USDBRL=X",
         "EUR/BRL": "EURBRL=X",
@@ -5491,31 +6610,37 @@ async def _fetch_forex() -> dict:
         "DOLAR INDEX": "DX-Y.NYB",
     }
     result = {"currencies": {}, "indices": {}, "updated_at": datetime.now().isoformat()}
-    async with httpx.AsyncClient(timeout=10) as client:
-        for label, symbol in {**pairs, **indices}.items():
-            try:
-                r = await client.get(
-                    f"https://query1.finance.yahoo.com/v8/finance/chart/{symbol}",
-                    params={"interval": "1d", "range": "5d"},
-                    headers={"User-Agent": "Mozilla/5.0"},
-                )
-                if r.status_code == 200:
-                    meta = r.json()["chart"]["result"][0]["meta"]
-                    price = float(meta.get("regularMarketPrice", 0))
-                    prev  = float(meta.get("chartPreviousClose", 0) or meta.get("previousClose", 0))
-                    change_pct = round((price - prev) / prev * 100, 2) if prev else 0
-                    entry = {
-                        "price": round(price, 4),
-                        "previous_close": round(prev, 4),
-                        "change_pct": change_pct,
-                        "symbol": symbol,
-                    }
-                    if label in pairs:
-                        result["currencies"][label] = entry
-                    else:
-                        result["indices"][label] = entry
-            except Exception:
-                pass
+    async def _quote(symbol: str):
+        try:
+            r = await _http_client.get(
+                f"https://query1.finance.yahoo.com/v8/finance/chart/{symbol}",
+                params={"interval": "1d", "range": "5d"},
+            )
+            if r.status_code != 200:
+                return None
+            meta = r.json()["chart"]["result"][0]["meta"]
+            price = float(meta.get("regularMarketPrice", 0))
+            prev  = float(meta.get("chartPreviousClose", 0) or meta.get("previousClose", 0))
+            change_pct = round((price - prev) / prev * 100, 2) if prev else 0
+            return {
+                "price": round(price, 4),
+                "previous_close": round(prev, 4),
+                "change_pct": change_pct,
+                "symbol": symbol,
+            }
+        except Exception:
+            return None
+
+    # Todas as cotações em paralelo — latência de 1 RTT em vez de 10 sequenciais
+    labels = {**pairs, **indices}
+    entries = await asyncio.gather(*(_quote(sym) for sym in labels.values()))
+    for label, entry in zip(labels, entries):
+        if entry is None:
+            continue
+        if label in pairs:
+            result["currencies"][label] = entry
+        else:
+            result["indices"][label] = entry
     _forex_cache = {"data": result, "ts": now}
     return result
 
@@ -5532,10 +6657,19 @@ async def get_forex():
 def _calc_bollinger(prices: list, period: int = 20, num_std: float = 2.0) -> dict:
     if len(prices) < period:
         return {}
-    window = prices[-period:]
-    sma = sum(window) / period
-    variance = sum((p - sma) ** 2 for p in window) / period
-    std = variance ** 0.5
+    if TALIB_AVAILABLE:
+        _, sma, _, std = bollinger_talib(prices, period, num_std)
+    elif NUMBA_AVAILABLE:
+        _, sma, _, std = bollinger_nb(as_close_array(prices), period, num_std)
+    elif NUMPY_AVAILABLE:
+        w = np.asarray(prices[-period:], dtype=np.float64)
+        sma = float(w.mean())
+        std = float(w.std())
+    else:
+        window = prices[-period:]
+        sma = sum(window) / period
+        variance = sum((p - sma) ** 2 for p in window) / period
+        std = variance ** 0.5
     return {
         "sma": round(sma, 4),
         "upper": round(sma + num_std * std, 4),
@@ -5549,26 +6683,14 @@ def _calc_bollinger(prices: list, period: int = 20, num_std: float = 2.0) -> dic
 def _calc_macd(prices: list, fast: int = 12, slow: int = 26, signal: int = 9) -> dict:
     if len(prices) < slow + signal:
         return {}
-    def ema_series(data, period):
-        k = 2 / (period + 1)
-        result = [sum(data[:period]) / period]
-        for p in data[period:]:
-            result.append(p * k + result[-1] * (1 - k))
-        return result
-    ema_fast = ema_series(prices, fast)
-    ema_slow = ema_series(prices, slow)
-    offset = slow - fast
-    macd_line = [ema_fast[i + offset] - ema_slow[i] for i in range(len(ema_slow))]
-    sig_line = ema_series(macd_line, signal)
-    offset2 = len(macd_line) - len(sig_line)
-    histogram = [macd_line[i + offset2] - sig_line[i] for i in range(len(sig_line))]
+    macd, sig, hist, hist_prev, n_hist = macd_nb(as_close_array(prices), fast, slow, signal)
     return {
-        "macd": round(macd_line[-1], 6),
-        "signal": round(sig_line[-1], 6),
-        "histogram": round(histogram[-1], 6),
-        "trend": "ALTA" if histogram[-1] > 0 else "BAIXA",
-        "crossover": "COMPRA" if len(histogram) >= 2 and histogram[-2] <= 0 < histogram[-1] else (
-            "VENDA" if len(histogram) >= 2 and histogram[-2] >= 0 > histogram[-1] else "NEUTRO"
+        "macd": round(macd, 6),
+        "signal": round(sig, 6),
+        "histogram": round(hist, 6),
+        "trend": "ALTA" if hist > 0 else "BAIXA",
+        "crossover": "COMPRA" if n_hist >= 2 and hist_prev <= 0 < hist else (
+            "VENDA" if n_hist >= 2 and hist_prev >= 0 > hist else "NEUTRO"
         ),
     }
 
@@ -5576,13 +6698,26 @@ def _calc_macd(prices: list, fast: int = 12, slow: int = 26, signal: int = 9) ->
 def _calc_stochastic(prices: list, highs: list, lows: list, k_period: int = 14, d_period: int = 3) -> dict:
     if len(prices) < k_period + d_period:
         return {}
-    k_values = []
-    for i in range(k_period - 1, len(prices)):
-        h = max(highs[i - k_period + 1:i + 1])
-        l = min(lows[i - k_period + 1:i + 1])
-        k_val = ((prices[i] - l) / (h - l) * 100) if (h - l) > 0 else 50
-        k_values.append(k_val)
-    d_values = [sum(k_values[i:i + d_period]) / d_period for i in range(len(k_values) - d_period + 1)]
+    if NUMPY_AVAILABLE:
+        # Janelas deslizantes: máx/mín de cada janela de k_period num único passe em C
+        from numpy.lib.stride_tricks import sliding_window_view
+        n = len(prices)
+        P = np.asarray(prices, dtype=np.float64)
+        hw = sliding_window_view(np.asarray(highs[:n], dtype=np.float64), k_period).max(axis=1)
+        lw = sliding_window_view(np.asarray(lows[:n], dtype=np.float64), k_period).min(axis=1)
+        rng = hw - lw
+        k_arr = np.full(rng.shape[0], 50.0)
+        np.divide((P[k_period - 1:] - lw) * 100, rng, out=k_arr, where=rng > 0)
+        k_values = k_arr.tolist()
+        d_values = np.convolve(k_arr, np.ones(d_period) / d_period, mode="valid").tolist()
+    else:
+        k_values = []
+        for i in range(k_period - 1, len(prices)):
+            h = max(highs[i - k_period + 1:i + 1])
+            l = min(lows[i - k_period + 1:i + 1])
+            k_val = ((prices[i] - l) / (h - l) * 100) if (h - l) > 0 else 50
+            k_values.append(k_val)
+        d_values = [sum(k_values[i:i + d_period]) / d_period for i in range(len(k_values) - d_period + 1)]
     return {
         "k": round(k_values[-1], 2),
         "d": round(d_values[-1], 2) if d_values else 0,
@@ -5593,26 +6728,29 @@ def _calc_stochastic(prices: list, highs: list, lows: list, k_period: int = 14,
     }
 
 
+_FIB_LEVELS = (("0.0", 0.0), ("23.6", 0.236), ("38.2", 0.382), ("50.0", 0.500),
+               ("61.8", 0.618), ("78.6", 0.786))
+
+
 def _calc_fibonacci(prices: list) -> dict:
     if len(prices) < 10:
         return {}
-    high = max(prices[-50:]) if len(prices) >= 50 else max(prices)
-    low = min(prices[-50:]) if len(prices) >= 50 else min(prices)
+    window = prices[-50:]
+    high = max(window)
+    low = min(window)
     diff = high - low
     if diff == 0:
         return {}
-    levels = {
-        "0.0": round(low, 4),
-        "23.6": round(low + 0.236 * diff, 4),
-        "38.2": round(low + 0.382 * diff, 4),
-        "50.0": round(low + 0.500 * diff, 4),
-        "61.8": round(low + 0.618 * diff, 4),
-        "78.6": round(low + 0.786 * diff, 4),
-        "100.0": round(high, 4),
-    }
+    levels = {name: round(low + ratio * diff, 4) for name, ratio in _FIB_LEVELS}
+    levels["100.0"] = round(high, 4)
     current = prices[-1]
-    nearest = min(levels.values(), key=lambda x: abs(x - current))
-    nearest_level = [k for k, v in levels.items() if v == nearest][0]
+    # Nível mais próximo numa passada, sem lambda nem busca reversa pelo valor
+    nearest_level, nearest = "0.0", levels["0.0"]
+    best = abs(nearest - current)
+    for name, price in levels.items():
+        dist = abs(price - current)
+        if dist < best:
+            nearest_level, nearest, best = name, price, dist
     return {
         "levels": levels,
         "current": round(current, 4),
@@ -5646,26 +6784,61 @@ def _calc_vwap(prices: list, volumes: list) -> dict:
 def _rsi_calc(prices: list, period: int = 14) -> float:
     if len(prices) < period + 1:
         return 50.0
-    changes = [prices[i] - prices[i - 1] for i in range(1, len(prices))]
-    gains = [max(c, 0) for c in changes]
-    losses = [abs(min(c, 0)) for c in changes]
-    avg_gain = sum(gains[:period]) / period
-    avg_loss = sum(losses[:period]) / period
-    for i in range(period, len(changes)):
-        avg_gain = (avg_gain * (period - 1) + gains[i]) / period
-        avg_loss = (avg_loss * (period - 1) + losses[i]) / period
+    if TALIB_AVAILABLE:
+        return round(rsi_talib(prices, period), 2)
+    avg_gain, avg_loss = wilder_rsi_nb(as_close_array(prices), period)
     if avg_loss == 0:
         return 100.0
     rs = avg_gain / avg_loss
     return round(100 - 100 / (1 + rs), 2)
 
 
+# Cache dos indicadores por (ativo, intervalo, limit, último preço, nº candles):
+# o candle só fecha a cada intervalo, então o polling do dashboard repete a chave.
+# LRU limitada (_INDIC_CACHE_CAP) com TTL = duração do candle.
+_INDIC_TTL = {"5m": 300, "1h": 3600, "1d": 86400}
+_INDIC_CACHE_CAP = 512
+_indic_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_indic_cache_stats: dict = {"hits": 0, "misses": 0}
+
+
+def _indic_cache_get(key: tuple, ttl: float, count_miss: bool = True):
+    hit = _indic_cache.get(key)
+    if hit is not None and time.time() - hit[0] < ttl:
+        _indic_cache.move_to_end(key)
+        _indic_cache_stats["hits"] += 1
+        return hit[2]
+    if count_miss:
+        _indic_cache_stats["misses"] += 1
+    return None
+
+
+def _indic_cache_put(key: tuple, ttl: float, payload: dict):
+    now = time.time()
+    _indic_cache[key] = (now, ttl, payload)
+    _indic_cache.move_to_end(key)
+    # Despeja pela ponta LRU: entradas com mais de 2×TTL ou excesso de capacidade
+    while _indic_cache:
+        ts, old_ttl, _ = next(iter(_indic_cache.values()))
+        if len(_indic_cache) > _INDIC_CACHE_CAP or now - ts > old_ttl * 2:
+            _indic_cache.popitem(last=False)
+        else:
+            break
+
+
 @app.get("/market/indicators/{asset}")
 async def get_technical_indicators(asset: str, interval: str = "5m", limit: int = 100):
     """Indicadores tecnicos completos: MACD, Bollinger, Stochastic, Fibonacci, VWAP, RSI."""
     if not MARKET_DATA_AVAILABLE:
         raise HTTPException(status_code=503, detail="Servico de dados nao disponivel")
     try:
+        # Antes do fetch: dentro do TTL do cache de candles o fetch devolveria os
+        # mesmos candles, então o payload anterior vale sem ir à rede
+        fetch_key = (asset.upper(), interval, limit)
+        fetch_ttl = settings.MARKET_CACHE_TTL_DAILY if interval == "1d" else settings.MARKET_CACHE_TTL
+        cached = _indic_cache_get(fetch_key, fetch_ttl, count_miss=False)
+        if cached is not None:
+            return cached
         klines = await market_data_service.get_klines(asset.upper(), interval, limit)
         if not klines or klines.get("count", 0) < 10:
             raise HTTPException(status_code=404, detail=f"Dados insuficientes para {asset}")
@@ -5673,18 +6846,31 @@ async def get_technical_indicators(asset: str, interval: str = "5m", limit: int
         volumes = klines["volumes"]
         highs   = klines.get("highs", prices)
         lows    = klines.get("lows", prices)
-        return {
+        cache_key = (asset.upper(), interval, limit, prices[-1], len(prices))
+        ttl = _INDIC_TTL.get(interval, 300)
+        cached = _indic_cache_get(cache_key, ttl)
+        if cached is not None:
+            _indic_cache_put(fetch_key, fetch_ttl, cached)
+            return cached
+        # ~100 candles: calcular direto custa menos que seis idas e voltas ao pool
+        rsi   = _rsi_calc(prices)
+        macd  = _calc_macd(prices)
+        boll  = _calc_bollinger(prices)
+        stoch = _calc_stochastic(prices, highs, lows)
+        fib   = _calc_fibonacci(prices)
+        vwap  = _calc_vwap(prices, volumes)
+        payload = {
             "success": True,
             "asset": asset.upper(),
             "interval": interval,
             "candles": len(prices),
             "data": {
-                "rsi": _rsi_calc(prices),
-                "macd": _calc_macd(prices),
-                "bollinger": _calc_bollinger(prices),
-                "stochastic": _calc_stochastic(prices, highs, lows),
-                "fibonacci": _calc_fibonacci(prices),
-                "vwap": _calc_vwap(prices, volumes),
+                "rsi": rsi,
+                "macd": macd,
+                "bollinger": boll,
+                "stochastic": stoch,
+                "fibonacci": fib,
+                "vwap": vwap,
                 "summary": {
                     "current_price": round(prices[-1], 4),
                     "high": round(max(prices[-20:]), 4) if len(prices) >= 20 else round(max(prices), 4),
@@ -5695,12 +6881,223 @@ async def get_technical_indicators(asset: str, interval: str = "5m", limit: int
                 },
             },
         }
+        _indic_cache_put(cache_key, ttl, payload)
+        _indic_cache_put(fetch_key, fetch_ttl, payload)
+        return payload
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _wilder_batch(P, period: int = 14):
+    """(avg_gain, avg_loss) de Wilder por linha de uma matriz (ativos × candles)."""
+    d = np.diff(P, axis=1)
+    g = np.maximum(d, 0.0)
+    l = np.maximum(-d, 0.0)
+    ag = g[:, :period].sum(axis=1) / period
+    al = l[:, :period].sum(axis=1) / period
+    for i in range(period, d.shape[1]):
+        ag = (ag * (period - 1) + g[:, i]) / period
+        al = (al * (period - 1) + l[:, i]) / period
+    return ag, al
+
+
+def _rsi_batch(P, period: int = 14):
+    """RSI de Wilder por linha — recursão vetorizada nos ativos."""
+    if P.shape[1] < period + 1:
+        return np.full(P.shape[0], 50.0)
+    ag, al = _wilder_batch(P, period)
+    rs = np.divide(ag, al, out=np.zeros_like(ag), where=al > 0)
+    return np.where(al == 0, 100.0, 100 - 100 / (1 + rs))
+
+
+def _macd_state_batch(P, fast: int = 12, slow: int = 26, signal: int = 9):
+    """(ema_rápida, ema_lenta, sinal, hist, hist_anterior) por linha — mesmas sementes SMA de macd_nb."""
+    kf, ks, kg = 2.0 / (fast + 1), 2.0 / (slow + 1), 2.0 / (signal + 1)
+    ema_f = P[:, :fast].sum(axis=1) / fast
+    for i in range(fast, slow):
+        ema_f = P[:, i] * kf + ema_f * (1 - kf)
+    ema_s = P[:, :slow].sum(axis=1) / slow
+    macd = [ema_f - ema_s]
+    for i in range(slow, P.shape[1]):
+        ema_f = P[:, i] * kf + ema_f * (1 - kf)
+        ema_s = P[:, i] * ks + ema_s * (1 - ks)
+        macd.append(ema_f - ema_s)
+    sig = sum(macd[:signal]) / signal
+    hist = hist_prev = macd[signal - 1] - sig
+    for m in macd[signal:]:
+        sig = m * kg + sig * (1 - kg)
+        hist_prev, hist = hist, m - sig
+    return ema_f, ema_s, sig, hist, hist_prev
+
+
+def _macd_batch(P, fast: int = 12, slow: int = 26, signal: int = 9):
+    """(hist, hist_anterior) do MACD por linha, ou None sem candles suficientes."""
+    if P.shape[1] < slow + signal:
+        return None
+    return _macd_state_batch(P, fast, slow, signal)[3:]
+
+
+# ── Estado de RSI/MACD semeado da janela de candles ──
+# Wilder/EMAs são calculados em lote até o último candle FECHADO da janela e o
+# candle em formação é aplicado com um passo da recorrência. Sem estado entre
+# requests: a mesma janela dá o mesmo resultado em qualquer processo/réplica.
+_IND_RSI_P, _IND_FAST, _IND_SLOW, _IND_SIGNAL = 14, 12, 26, 9
+_IND_MIN_BARS = _IND_SLOW + _IND_SIGNAL + 1
+
+
+def _ind_step(st: dict, price: float) -> dict:
+    """Aplica um candle ao estado (recorrência de Wilder e das EMAs); retorna um novo estado."""
+    p = _IND_RSI_P
+    kf, ks, kg = 2.0 / (_IND_FAST + 1), 2.0 / (_IND_SLOW + 1), 2.0 / (_IND_SIGNAL + 1)
+    d = price - st["close"]
+    ef = price * kf + st["ef"] * (1 - kf)
+    es = price * ks + st["es"] * (1 - ks)
+    sig = (ef - es) * kg + st["sig"] * (1 - kg)
+    return {
+        "close": price,
+        "ag": (st["ag"] * (p - 1) + max(d, 0.0)) / p,
+        "al": (st["al"] * (p - 1) + max(-d, 0.0)) / p,
+        "ef": ef, "es": es, "sig": sig,
+        "hist": ef - es - sig, "hist_prev": st["hist"],
+    }
+
+
+def _ind_summary(st: dict) -> tuple:
+    """(rsi, macd) no formato usado pelo resumo de /market/indicators-all."""
+    rsi = 100.0 if st["al"] == 0 else round(100 - 100 / (1 + st["ag"] / st["al"]), 2)
+    h, hp = st["hist"], st["hist_prev"]
+    return rsi, {
+        "trend": "ALTA" if h > 0 else "BAIXA",
+        "crossover": "COMPRA" if hp <= 0 < h else ("VENDA" if hp >= 0 > h else "NEUTRO"),
+    }
+
+
+def _indicator_summaries(series: dict) -> dict:
+    """
+    (rsi, macd, bollinger) por ativo no formato de _rsi_calc/_calc_macd/_calc_bollinger
+    (macd/bollinger só com as chaves usadas no resumo). Com NumPy, ativos com o mesmo
+    nº de candles viram uma matriz e cada indicador é calculado para todos de uma vez.
+    """
+    if not NUMPY_AVAILABLE:
+        return {a: (_rsi_calc(p), _calc_macd(p), _calc_bollinger(p)) for a, p in series.items()}
+    rm = {}
+    groups: dict = {}
+    for a, p in series.items():
+        groups.setdefault(len(p), []).append(a)
+    out = {}
+    for n, names in groups.items():
+        P = np.asarray([series[a] for a in names], dtype=np.float64)
+        if n >= _IND_MIN_BARS:
+            # Semeia até o candle fechado e aplica o último (em formação)
+            C = P[:, :-1]
+            ag, al = (x.tolist() for x in _wilder_batch(C, _IND_RSI_P))
+            ef, es, sig, hist, _ = (x.tolist() for x in _macd_state_batch(C, _IND_FAST, _IND_SLOW, _IND_SIGNAL))
+            for k, a in enumerate(names):
+                p = series[a]
+                st = {
+                    "close": p[-2],
+                    "ag": ag[k], "al": al[k], "ef": ef[k], "es": es[k], "sig": sig[k],
+                    "hist": hist[k], "hist_prev": hist[k],
+                }
+                rm[a] = _ind_summary(_ind_step(st, p[-1]))
+        else:
+            rsi = np.round(_rsi_batch(P), 2).tolist()
+            macd = _macd_batch(P)
+            for k, a in enumerate(names):
+                m = {}
+                if macd is not None:
+                    h, hp = float(macd[0][k]), float(macd[1][k])
+                    m = {
+                        "trend": "ALTA" if h > 0 else "BAIXA",
+                        "crossover": "COMPRA" if hp <= 0 < h else ("VENDA" if hp >= 0 > h else "NEUTRO"),
+                    }
+                rm[a] = (rsi[k], m)
+        if n >= 20:
+            # Bandas da última janela para todas as linhas, arredondadas por coluna
+            W = P[:, -20:]
+            sma, std = W.mean(axis=1), W.std(axis=1)
+            lower = sma - 2.0 * std
+            pos = np.divide((P[:, -1] - lower) * 100, 4.0 * std, out=np.full_like(std, 50.0), where=std > 0)
+            upper_l = np.round(sma + 2.0 * std, 4).tolist()
+            lower_l = np.round(lower, 4).tolist()
+            pos_l = np.round(pos, 1).tolist()
+            has_std = (std > 0).tolist()
+        for i, a in enumerate(names):
+            b = {}
+            if n >= 20:
+                # Sem desvio a posição segue o int 50 de _calc_bollinger (não 50.0)
+                b = {"upper": upper_l[i], "lower": lower_l[i], "position": pos_l[i] if has_std[i] else 50}
+            out[a] = (*rm[a], b)
+    return out
+
+
+# Janela de candles por (ativo, intervalo) para /market/indicators-all: depois da
+# primeira carga (100 candles) só os 2 últimos são buscados e emendados na janela
+_KLINE_WINDOW = 100
+_kline_cache: dict = {}  # (ativo, intervalo) -> {"prices": deque, "ts": deque}
+
+
+def _kline_cache_fill(key: tuple, data: dict):
+    """Substitui a janela de `key` pelos candles completos (se tiverem timestamps)."""
+    px, ts = data.get("prices", []), data.get("timestamps", [])
+    if len(px) != len(ts) or not px:
+        _kline_cache.pop(key, None)
+        return
+    _kline_cache[key] = {
+        "prices": deque(px, maxlen=_KLINE_WINDOW),
+        "ts": deque(ts, maxlen=_KLINE_WINDOW),
+    }
+
+
+def _kline_cache_merge(key: tuple, data: dict) -> bool:
+    """
+    Emenda os candles recentes em `data` na janela cacheada: o candle com o mesmo
+    timestamp tem o close atualizado, os posteriores entram no fim (maxlen descarta
+    o mais antigo). False se não houver sobreposição (lacuna) → recarga completa.
+    """
+    win = _kline_cache.get(key)
+    px, ts = (data or {}).get("prices", []), (data or {}).get("timestamps", [])
+    if win is None or not ts or len(px) != len(ts) or win["ts"][-1] not in ts:
+        return False
+    last = win["ts"][-1]
+    for t, p in zip(ts, px):
+        if t == last:
+            win["prices"][-1] = p
+        elif t > last:
+            win["prices"].append(p)
+            win["ts"].append(t)
+    return True
+
+
+async def _indicator_klines(assets: list, interval: str) -> dict:
+    """Candles de /market/indicators-all via _kline_cache (2 candles por ativo quando quente)."""
+    warm = [a for a in assets if (a, interval) in _kline_cache]
+    cold = [a for a in assets if (a, interval) not in _kline_cache]
+
+    async def _fetch(group: list, limit: int) -> dict:
+        return await market_data_service.get_all_klines(group, interval, limit) if group else {}
+
+    fresh, full = await asyncio.gather(_fetch(warm, 2), _fetch(cold, _KLINE_WINDOW))
+    retry = [a for a in warm if not _kline_cache_merge((a, interval), fresh.get(a))]
+    if retry:
+        full.update(await _fetch(retry, _KLINE_WINDOW))
+    for a in cold + retry:
+        if a in full:
+            _kline_cache_fill((a, interval), full[a])
+        else:
+            _kline_cache.pop((a, interval), None)
+    out = {}
+    for a in assets:
+        win = _kline_cache.get((a, interval))
+        if win is not None:
+            out[a] = {"prices": list(win["prices"]), "timestamps": list(win["ts"])}
+        elif a in full:
+            out[a] = full[a]
+    return out
+
+
 @app.get("/market/indicators-all")
 async def get_all_indicators(interval: str = "5m"):
     """Indicadores tecnicos resumidos para TODOS os ativos."""
@@ -5708,16 +7105,16 @@ async def get_all_indicators(interval: str = "5m"):
         raise HTTPException(status_code=503, detail="Servico de dados nao disponivel")
     try:
         assets = list(settings.ALL_ASSETS)
-        klines_data = await market_data_service.get_all_klines(assets, interval, 100)
+        klines_data = await _indicator_klines(assets, interval)
         result = {}
+        series = {}
         for asset in assets:
-            d = klines_data.get(asset, {})
-            prices  = d.get("prices", [])
-            if len(prices) < 10:
-                continue
-            rsi_val = _rsi_calc(prices)
-            macd = _calc_macd(prices)
-            boll = _calc_bollinger(prices)
+            prices = klines_data.get(asset, {}).get("prices", [])
+            if len(prices) >= 10:
+                series[asset] = prices
+        summaries = _indicator_summaries(series)
+        for asset, prices in series.items():
+            rsi_val, macd, boll = summaries[asset]
             signals = 0
             if rsi_val < 30: signals += 1
             elif rsi_val > 70: signals -= 1
@@ -5759,6 +7156,60 @@ _TAX_RATES = {
     "br_isencao_crypto_mensal": 35000.0,
 }
 
+# Classificação fixa por ativo: montada no import em vez de a cada request
+_CRYPTO_SET = frozenset(c.upper() for c in settings.CRYPTO_ASSETS)
+_B3_SET = frozenset(a.upper() for a in settings.ALLOWED_ASSETS)
+_ASSET_FEE_TAX: dict = {}  # ativo -> (taxa, imposto, tipo)
+
+
+def _asset_fee_tax(asset: str) -> tuple:
+    """(fee_rate, tax_rate, asset_type) do ativo, memoizado em _ASSET_FEE_TAX."""
+    hit = _ASSET_FEE_TAX.get(asset)
+    if hit is None:
+        u = asset.upper()
+        if u in _CRYPTO_SET or "USDT" in u:
+            hit = (_FEE_RATES["crypto_taker"], _TAX_RATES["br_crypto"], "crypto")
+        elif u in _B3_SET:
+            hit = (_FEE_RATES["b3_emolumentos"] + _FEE_RATES["b3_liquidacao"], _TAX_RATES["br_daytrade"], "b3")
+        else:
+            hit = (0.0, _TAX_RATES["br_swing"], "us")
+        _ASSET_FEE_TAX[asset] = hit
+    return hit
+
+
+# Pré-popula com os ativos configurados; posições fora da lista entram sob demanda
+for _a in settings.ALL_ASSETS:
+    _asset_fee_tax(_a)
+
+
+def _portfolio_vector(positions: dict):
+    """
+    Posições como colunas NumPy (SoA): valor, taxas, imposto, PnL líquido e
+    rentabilidade calculados em operações sobre o array inteiro. None se vazio.
+    """
+    rows = [
+        (a, p.get("quantity", 0), p.get("entry_price", 0), p.get("pnl", 0), p.get("allocated", 0))
+        for a, p in positions.items()
+        if not (p.get("quantity", 0) <= 0 and p.get("allocated", 0) <= 0)
+    ]
+    if not rows:
+        return None
+    assets = [r[0] for r in rows]
+    qty, entry, pnl, alloc = np.array([r[1:] for r in rows], dtype=np.float64).T
+    fee_tax = [_asset_fee_tax(a) for a in assets]
+    fee_rate = np.fromiter((f[0] for f in fee_tax), dtype=np.float64, count=len(rows))
+    tax_rate = np.fromiter((f[1] for f in fee_tax), dtype=np.float64, count=len(rows))
+    value = np.where(alloc != 0, alloc, qty * entry)
+    fees = value * fee_rate * 2
+    tax = np.where(pnl > 0, np.maximum(0, pnl * tax_rate), 0.0)
+    net = pnl - fees - tax
+    rentab = np.divide(net * 100, value, out=np.zeros_like(net), where=value > 0)
+    return {
+        "assets": assets, "types": [f[2] for f in fee_tax],
+        "qty": qty, "entry": entry, "pnl": pnl, "value": value,
+        "fees": fees, "tax": tax, "net": net, "rentab": rentab,
+    }
+
 
 @app.get("/finance/calculator")
 async def finance_calculator():
@@ -5773,52 +7224,64 @@ async def finance_calculator():
     total_fees_estimated = 0.0
     total_tax_estimated = 0.0
 
-    crypto_set = {c.upper() for c in settings.CRYPTO_ASSETS}
-    b3_set = {a.upper() for a in settings.ALLOWED_ASSETS}
-
-    for asset, pos in positions.items():
-        qty = pos.get("quantity", 0)
-        entry = pos.get("entry_price", 0)
-        pnl = pos.get("pnl", 0)
-        alloc = pos.get("allocated", 0)
-        if qty <= 0 and alloc <= 0:
-            continue
-
-        is_crypto = asset.upper() in crypto_set or "USDT" in asset.upper()
-        is_b3 = asset.upper() in b3_set
+    vec = _portfolio_vector(positions) if NUMPY_AVAILABLE else None
+    if vec is not None:
+        # Colunas calculadas de uma vez; um único zip monta as linhas da resposta
+        total_allocated = float(vec["value"].sum())
+        total_fees_estimated = float(vec["fees"].sum())
+        total_tax_estimated = float(vec["tax"].sum())
+        # Arredonda cada coluna uma vez (np.round) em vez de round() por campo
+        for asset, qty, entry, value, pnl, fees, tax, net_pnl, rentab, asset_type in zip(
+            vec["assets"], np.round(vec["qty"], 8).tolist(), np.round(vec["entry"], 4).tolist(),
+            np.round(vec["value"], 2).tolist(), np.round(vec["pnl"], 2).tolist(),
+            np.round(vec["fees"], 4).tolist(), np.round(vec["tax"], 2).tolist(),
+            np.round(vec["net"], 2).tolist(), np.round(vec["rentab"], 2).tolist(), vec["types"],
+        ):
+            portfolio_detail.append({
+                "asset": asset,
+                "quantity": qty,
+                "entry_price": entry,
+                "allocated": value,
+                "pnl_bruto": pnl,
+                "fees_estimated": fees,
+                "tax_estimated": tax,
+                "pnl_liquido": net_pnl,
+                "rentabilidade_pct": rentab,
+                "asset_type": asset_type,
+            })
+    else:
+        for asset, pos in positions.items():
+            qty = pos.get("quantity", 0)
+            entry = pos.get("entry_price", 0)
+            pnl = pos.get("pnl", 0)
+            alloc = pos.get("allocated", 0)
+            if qty <= 0 and alloc <= 0:
+                continue
 
-        if is_crypto:
-            fee_rate = _FEE_RATES["crypto_taker"]
-            tax_rate = _TAX_RATES["br_crypto"]
-        elif is_b3:
-            fee_rate = _FEE_RATES["b3_emolumentos"] + _FEE_RATES["b3_liquidacao"]
-            tax_rate = _TAX_RATES["br_daytrade"]
-        else:
-            fee_rate = 0.0
-            tax_rate = _TAX_RATES["br_swing"]
+            fee_rate, tax_rate, asset_type = _asset_fee_tax(asset)
 
-        value = alloc if alloc else qty * entry
-        fees = value * fee_rate * 2
-        tax = max(0, pnl * tax_rate) if pnl > 0 else 0
-        net_pnl = pnl - fees - tax
-        rentab = round(net_pnl / value * 100, 2) if value > 0 else 0
+            value = alloc if alloc else qty * entry
+            fees = value * fee_rate * 2
+            tax = max(0, pnl * tax_rate) if pnl > 0 else 0
+            net_pnl = pnl - fees - tax
+            rentab = round(net_pnl / value * 100, 2) if value > 0 else 0
 
-        total_allocated += value
-        total_fees_estimated += fees
-        total_tax_estimated += tax
+            total_allocated += value
+            total_fees_estimated += fees
+            total_tax_estimated += tax
 
-        portfolio_detail.append({
-            "asset": asset,
-            "quantity": round(qty, 8),
-            "entry_price": round(entry, 4),
-            "allocated": round(value, 2),
-            "pnl_bruto": round(pnl, 2),
-            "fees_estimated": round(fees, 4),
-            "tax_estimated": round(tax, 2),
-            "pnl_liquido": round(net_pnl, 2),
-            "rentabilidade_pct": rentab,
-            "asset_type": "crypto" if is_crypto else ("b3" if is_b3 else "us"),
-        })
+            portfolio_detail.append({
+                "asset": asset,
+                "quantity": round(qty, 8),
+                "entry_price": round(entry, 4),
+                "allocated": round(value, 2),
+                "pnl_bruto": round(pnl, 2),
+                "fees_estimated": round(fees, 4),
+                "tax_estimated": round(tax, 2),
+                "pnl_liquido": round(net_pnl, 2),
+                "rentabilidade_pct": rentab,
+                "asset_type": asset_type,
+            })
 
     gross_pnl = total_pnl
     net_pnl = gross_pnl - total_fees_estimated - total_tax_estimated
@@ -5850,52 +7313,72 @@ async def finance_calculator():
 
 # ─── 4. NOTICIAS, CALENDARIO DE DIVIDENDOS & EVENTOS FINANCEIROS ────────────
 
-def _fetch_economic_calendar() -> list:
-    """Calendario economico simplificado com eventos recorrentes importantes."""
-    return [
-        {"event": "FOMC Decision", "region": "US", "impact": "alto", "frequency": "6 semanas"},
-        {"event": "Non-Farm Payrolls (NFP)", "region": "US", "impact": "alto", "frequency": "mensal (1a sexta)"},
-        {"event": "CPI (Inflacao EUA)", "region": "US", "impact": "alto", "frequency": "mensal"},
-        {"event": "Ata do Copom", "region": "BR", "impact": "alto", "frequency": "a cada 45 dias"},
-        {"event": "IPCA (Inflacao BR)", "region": "BR", "impact": "alto", "frequency": "mensal"},
-        {"event": "PIB Brasil", "region": "BR", "impact": "medio", "frequency": "trimestral"},
-        {"event": "Earnings Season", "region": "US/BR", "impact": "alto", "frequency": "trimestral"},
-        {"event": "Payroll (CAGED)", "region": "BR", "impact": "medio", "frequency": "mensal"},
-        {"event": "PCE (Deflator EUA)", "region": "US", "impact": "alto", "frequency": "mensal"},
-        {"event": "Decisao Selic (Copom)", "region": "BR", "impact": "alto", "frequency": "a cada 45 dias"},
-    ]
+# Calendario economico simplificado com eventos recorrentes importantes
+# (tupla montada uma vez no import: zero alocação por request). Os dicts são
+# devolvidos por referência e continuam mutáveis — tratar como somente leitura.
+_ECONOMIC_CALENDAR = (
+    {"event": "FOMC Decision", "region": "US", "impact": "alto", "frequency": "6 semanas"},
+    {"event": "Non-Farm Payrolls (NFP)", "region": "US", "impact": "alto", "frequency": "mensal (1a sexta)"},
+    {"event": "CPI (Inflacao EUA)", "region": "US", "impact": "alto", "frequency": "mensal"},
+    {"event": "Ata do Copom", "region": "BR", "impact": "alto", "frequency": "a cada 45 dias"},
+    {"event": "IPCA (Inflacao BR)", "region": "BR", "impact": "alto", "frequency": "mensal"},
+    {"event": "PIB Brasil", "region": "BR", "impact": "medio", "frequency": "trimestral"},
+    {"event": "Earnings Season", "region": "US/BR", "impact": "alto", "frequency": "trimestral"},
+    {"event": "Payroll (CAGED)", "region": "BR", "impact": "medio", "frequency": "mensal"},
+    {"event": "PCE (Deflator EUA)", "region": "US", "impact": "alto", "frequency": "mensal"},
+    {"event": "Decisao Selic (Copom)", "region": "BR", "impact": "alto", "frequency": "a cada 45 dias"},
+)
+
+
+# Dividendos mudam no máximo 1×/dia: resposta do Yahoo por ativo fica 6h em memória
+# ativo -> (expira_em, dados | None); None = Yahoo respondeu mas sem dividendos
+_DIV_TTL = 6 * 3600
+_div_cache: dict = {}
 
 
 async def _fetch_dividends(assets: list) -> dict:
-    """Busca dividend yield via Yahoo Finance."""
-    import httpx
+    """Busca dividend yield via Yahoo Finance (requisições em paralelo no cliente compartilhado)."""
+    async def _fetch_one(asset: str):
+        hit = _div_cache.get(asset)
+        if hit and _time_module.time() < hit[0]:
+            return asset, hit[1]
+        ticker = f"{asset}.SA" if asset in settings.ALLOWED_ASSETS else asset
+        r = await _http_client.get(
+            f"https://query1.finance.yahoo.com/v8/finance/chart/{ticker}",
+            params={"interval": "1d", "range": "1y"},
+            timeout=8,
+        )
+        if r.status_code != 200:
+            return asset, None
+        meta = r.json()["chart"]["result"][0]["meta"]
+        div_yield = meta.get("trailingAnnualDividendYield")
+        div_rate  = meta.get("trailingAnnualDividendRate")
+        data = None
+        if div_yield is not None or div_rate is not None:
+            data = {
+                "dividend_yield_pct": round(float(div_yield or 0) * 100, 2),
+                "annual_dividend": round(float(div_rate or 0), 4),
+                "price": round(float(meta.get("regularMarketPrice", 0)), 4),
+            }
+        _div_cache[asset] = (_time_module.time() + _DIV_TTL, data)
+        return asset, data
+
+    results = await asyncio.gather(*(_fetch_one(a) for a in assets[:30]), return_exceptions=True)
     dividends = {}
-    async with httpx.AsyncClient(timeout=8) as client:
-        for asset in assets[:30]:
-            ticker = asset
-            if asset in settings.ALLOWED_ASSETS:
-                ticker = f"{asset}.SA"
-            try:
-                r = await client.get(
-                    f"https://query1.finance.yahoo.com/v8/finance/chart/{ticker}",
-                    params={"interval": "1d", "range": "1y"},
-                    headers={"User-Agent": "Mozilla/5.0"},
-                )
-                if r.status_code == 200:
-                    meta = r.json()["chart"]["result"][0]["meta"]
-                    div_yield = meta.get("trailingAnnualDividendYield")
-                    div_rate  = meta.get("trailingAnnualDividendRate")
-                    if div_yield is not None or div_rate is not None:
-                        dividends[asset] = {
-                            "dividend_yield_pct": round(float(div_yield or 0) * 100, 2),
-                            "annual_dividend": round(float(div_rate or 0), 4),
-                            "price": round(float(meta.get("regularMarketPrice", 0)), 4),
-                        }
-            except Exception:
-                pass
+    for res in results:
+        if isinstance(res, BaseException):
+            continue
+        asset, data = res
+        if data is not None:
+            dividends[asset] = data
     return dividends
 
 
+def _news_items(raw: list) -> list:
+    """As 30 primeiras manchetes no formato da resposta de /market/events."""
+    return [{"title": title, "source": source} for title, source in raw[:30]]
+
+
 @app.get("/market/events")
 async def get_market_events():
     """Calendario economico, noticias RSS e eventos do mercado."""
@@ -5905,22 +7388,15 @@ async def get_market_events():
         loop = asyncio.get_event_loop()
         raw = await loop.run_in_executor(None, _fetch_news_raw)
         sentiment_map = {a: _score_news(a, raw) for a in settings.ALL_ASSETS}
-        _news_cache = {"data": sentiment_map, "ts": now}
+        _news_cache = {"data": sentiment_map, "raw": _news_items(raw), "ts": now}
 
-    raw_news = []
-    try:
-        raw = await asyncio.get_event_loop().run_in_executor(None, _fetch_news_raw)
-        for title, source in raw[:30]:
-            raw_news.append({"title": title, "source": source})
-    except Exception:
-        pass
+    raw_news = _news_cache.get("raw", [])
 
-    calendar = _fetch_economic_calendar()
     return {
         "success": True,
         "data": {
             "news": raw_news,
-            "economic_calendar": calendar,
+            "economic_calendar": _ECONOMIC_CALENDAR,
             "sentiment_by_asset": _news_cache.get("data", {}),
             "updated_at": datetime.now().isoformat(),
         },
@@ -5928,13 +7404,13 @@ async def get_market_events():
 
 
 @app.get("/market/dividends")
-async def get_dividends():
-    """Dividendos (dividend yield) dos ativos B3 + US."""
+async def get_dividends(limit: int = 50):
+    """Dividendos (dividend yield) dos ativos B3 + US — os `limit` maiores yields, em ordem."""
     try:
         b3_assets = list(settings.ALLOWED_ASSETS)
         us_top = settings.US_STOCKS[:20]
         divs = await _fetch_dividends(b3_assets + us_top)
-        ranked = dict(sorted(divs.items(), key=lambda x: x[1].get("dividend_yield_pct", 0), reverse=True))
+        ranked = dict(heapq.nlargest(max(0, limit), divs.items(), key=lambda x: x[1].get("dividend_yield_pct", 0)))
         return {"success": True, "data": ranked, "count": len(ranked)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -5942,32 +7418,120 @@ async def get_dividends():
 
 # ─── 5. SEGURANCA & COMPLIANCE ──────────────────────────────────────────────
 
-_audit_log: list = []
-_AUDIT_FILE = Path(__file__).resolve().parent.parent / "data" / "audit_log.json"
+# JSON Lines append-only: 1 linha por evento; acima de _MAX_AUDIT linhas o
+# arquivo gira para .1 (a carga lê .1 + atual e fica só com o final)
+_AUDIT_FILE = Path(__file__).resolve().parent.parent / "data" / "audit_log.jsonl"
+_AUDIT_ROTATED = _AUDIT_FILE.with_suffix(".jsonl.1")
+_AUDIT_LEGACY = _AUDIT_FILE.with_suffix(".json")
 _MAX_AUDIT = 5000
+_audit_log: deque = deque(maxlen=_MAX_AUDIT)  # append O(1), descarta o mais antigo sozinho
+_audit_lines = 0  # linhas no arquivo atual (dispara a rotação)
+# Com o lifespan rodando, eventos vão para uma fila limitada e um único writer em
+# background grava em lotes; sem writer (scripts, testes) ou com a fila cheia a
+# linha é gravada na hora. Fila criada/descartada pelo lifespan.
+_audit_queue: Optional[asyncio.Queue] = None
+_AUDIT_QUEUE_MAX = 10_000
+_AUDIT_BATCH = 50
+_AUDIT_FLUSH_S = 0.1
 
 def _load_audit():
-    global _audit_log
+    global _audit_lines
+    _audit_log.clear()
     try:
-        if _AUDIT_FILE.exists():
-            _audit_log = json.loads(_AUDIT_FILE.read_text(encoding="utf-8"))
+        if _AUDIT_LEGACY.exists() and not _AUDIT_FILE.exists():
+            # Migração do formato antigo (lista JSON inteira reescrita a cada evento)
+            legacy = json.loads(_AUDIT_LEGACY.read_text(encoding="utf-8"))
+            with _AUDIT_FILE.open("w", encoding="utf-8") as f:
+                f.writelines(db_state.dumps_compact(e) + "\n" for e in legacy[-_MAX_AUDIT:])
+        for path in (_AUDIT_ROTATED, _AUDIT_FILE):
+            if not path.exists():
+                continue
+            n = 0
+            with path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    n += 1
+                    try:
+                        _audit_log.append(db_state.loads(line))
+                    except ValueError:
+                        pass
+            if path is _AUDIT_FILE:
+                _audit_lines = n
     except Exception:
-        _audit_log = []
+        pass
 
 def _append_audit(action: str, details: dict = None, severity: str = "info"):
     entry = {
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": _brt_now().isoformat(),
         "action": action,
         "severity": severity,
         "details": details or {},
     }
     _audit_log.append(entry)
-    if len(_audit_log) > _MAX_AUDIT:
-        _audit_log[:] = _audit_log[-_MAX_AUDIT:]
+    if _audit_queue is not None:
+        try:
+            _audit_queue.put_nowait(entry)
+            return
+        except asyncio.QueueFull:
+            pass
+    _audit_flush_sync([entry])
+
+def _audit_chunk(entries: list) -> str:
+    """Gira o arquivo se passou de _MAX_AUDIT linhas e serializa o lote em JSON Lines."""
+    global _audit_lines
+    if _audit_lines >= _MAX_AUDIT:
+        _AUDIT_FILE.replace(_AUDIT_ROTATED)
+        _audit_lines = 0
+    return "".join(db_state.dumps_compact(e) + "\n" for e in entries)
+
+def _audit_flush_sync(entries: list):
+    """Mesma gravação de _audit_flush, síncrona — para quando não há writer na fila."""
+    global _audit_lines
     try:
-        _AUDIT_FILE.write_text(json.dumps(_audit_log, ensure_ascii=False, indent=1), encoding="utf-8")
-    except Exception:
-        pass
+        chunk = _audit_chunk(entries)
+        with _AUDIT_FILE.open("a", encoding="utf-8") as f:
+            f.write(chunk)
+        _audit_lines += len(entries)
+    except Exception as e:
+        print(f"[audit] Falha ao gravar {len(entries)} eventos: {e}", flush=True)
+
+async def _audit_flush(entries: list):
+    """Grava um lote de eventos no JSONL (girando o arquivo quando passa de _MAX_AUDIT)."""
+    global _audit_lines
+    try:
+        chunk = _audit_chunk(entries)
+        if AIOFILES_AVAILABLE:
+            async with aiofiles.open(_AUDIT_FILE, "a", encoding="utf-8") as f:
+                await f.write(chunk)
+        else:
+            def _write():
+                with _AUDIT_FILE.open("a", encoding="utf-8") as f:
+                    f.write(chunk)
+            await asyncio.to_thread(_write)
+        _audit_lines += len(entries)
+    except Exception as e:
+        print(f"[audit] Falha ao gravar {len(entries)} eventos: {e}", flush=True)
+
+async def _audit_writer():
+    """Writer em background: junta até _AUDIT_BATCH eventos (ou _AUDIT_FLUSH_S) por escrita."""
+    q = _audit_queue
+    while True:
+        entries = [await q.get()]
+        try:
+            await asyncio.sleep(_AUDIT_FLUSH_S)
+        finally:
+            # Cancelado no shutdown: o lote já retirado da fila ainda é gravado
+            while not q.empty() and len(entries) < _AUDIT_BATCH:
+                entries.append(q.get_nowait())
+            await _audit_flush(entries)
+
+async def _audit_drain():
+    """Grava o que ainda estiver na fila (shutdown)."""
+    entries = []
+    q = _audit_queue
+    while q is not None and not q.empty():
+        entries.append(q.get_nowait())
+    if entries:
+        await _audit_flush(entries)
 
 _load_audit()
 
@@ -5975,18 +7539,17 @@ _load_audit()
 @app.get("/security/audit")
 async def get_audit_log(limit: int = 100, severity: str = None):
     """Audit trail de acoes do sistema (compliance)."""
-    entries = _audit_log[-limit:]
+    entries = islice(reversed(_audit_log), max(0, limit))
     if severity:
-        entries = [e for e in entries if e.get("severity") == severity]
-    return {"success": True, "data": list(reversed(entries)), "total": len(_audit_log)}
+        entries = (e for e in entries if e.get("severity") == severity)
+    return {"success": True, "data": list(entries), "total": len(_audit_log)}
 
 
 @app.get("/security/status")
 async def get_security_status():
     """Status de seguranca: API keys, rate limits, protecoes ativas."""
     try:
-        from datetime import timedelta
-        cutoff = (datetime.now() - timedelta(hours=24)).isoformat()
+        cutoff = (_brt_now() - timedelta(hours=24)).isoformat()
         recent_critical = sum(1 for e in _audit_log if e.get("severity") == "critical" and e.get("timestamp", "") > cutoff)
     except Exception:
         recent_critical = 0
@@ -6037,20 +7600,26 @@ async def get_security_status():
     }
 
 
+# POSTs auditados (lookup O(1)) e trechos de rota que elevam a severidade
+_AUDITED_POSTS = frozenset({
+    "/trade/start", "/trade/stop", "/trade/capital", "/trade/cycle", "/trade/reset",
+    "/scheduler/start", "/scheduler/stop", "/brokers/connect", "/brokers/order",
+})
+_AUDIT_WARN_KEYS = ("reset", "order")
+
+
 @app.middleware("http")
 async def audit_middleware(request, call_next):
     """Registra acoes criticas no audit log."""
     response = await call_next(request)
+    if request.method != "POST":
+        return response
     path = request.url.path
-    method = request.method
-    if method == "POST" and path in ["/trade/start", "/trade/stop", "/trade/capital",
-                                       "/trade/cycle", "/trade/reset",
-                                       "/scheduler/start", "/scheduler/stop",
-                                       "/brokers/connect", "/brokers/order"]:
+    if path in _AUDITED_POSTS:
         _append_audit(
-            f"{method} {path}",
+            f"POST {path}",
             {"status_code": response.status_code},
-            severity="warning" if "reset" in path or "order" in path else "info"
+            severity="warning" if any(k in path for k in _AUDIT_WARN_KEYS) else "info"
         )
     return response
 
@@ -6209,9 +7778,20 @@ async def get_user_summary():
     positions = td.get("positions", {})
     log = td.get("log", [])
 
-    active_positions = {k: v for k, v in positions.items()
-                        if v.get("quantity", 0) > 0 or v.get("allocated", 0) > 0}
-    total_allocated = sum(p.get("allocated", 0) for p in active_positions.values())
+    # Uma passada: filtra posições ativas, formata a saída e acumula o alocado
+    total_allocated = 0.0
+    active_out = {}
+    for k, v in positions.items():
+        alloc = v.get("allocated", 0)
+        if v.get("quantity", 0) <= 0 and alloc <= 0:
+            continue
+        total_allocated += alloc
+        active_out[k] = {
+            "allocated": round(alloc, 2),
+            "pnl": round(v.get("pnl", 0), 4),
+            "entry_price": round(v.get("entry_price", 0), 4),
+            "timeframe": v.get("timeframe", "--"),
+        }
 
     cycles = perf.get("cycles", [])
     wins = perf.get("win_count", 0)
@@ -6219,11 +7799,17 @@ async def get_user_summary():
     total_trades = wins + losses
     win_rate = (wins / total_trades * 100) if total_trades > 0 else 0
 
-    pnl_5m = sum(c.get("pnl_5m", 0) for c in cycles)
-    pnl_1h = sum(c.get("pnl_1h", 0) for c in cycles)
-    pnl_1d = sum(c.get("pnl_1d", 0) for c in cycles)
+    if NUMPY_AVAILABLE:
+        # Somas direto das colunas SoA; os np.float64 vão para o orjson sem conversão
+        cols = _perf_columns()
+        pnl_5m, pnl_1h, pnl_1d = (cols[f].sum() for f in ("pnl_5m", "pnl_1h", "pnl_1d"))
+    else:
+        pnl_5m = sum(c.get("pnl_5m", 0) for c in cycles)
+        pnl_1h = sum(c.get("pnl_1h", 0) for c in cycles)
+        pnl_1d = sum(c.get("pnl_1d", 0) for c in cycles)
 
-    return {
+    # Resposta já pronta: pula o jsonable_encoder e serializa direto (orjson + NumPy)
+    return _FastJSONResponse({
         "success": True,
         "data": {
             "account": {
@@ -6235,13 +7821,8 @@ async def get_user_summary():
                 "rentabilidade_pct": round(total_pnl / capital * 100, 2) if capital > 0 else 0,
             },
             "portfolio": {
-                "active_count": len(active_positions),
-                "positions": {k: {
-                    "allocated": round(v.get("allocated", 0), 2),
-                    "pnl": round(v.get("pnl", 0), 4),
-                    "entry_price": round(v.get("entry_price", 0), 4),
-                    "timeframe": v.get("timeframe", "--"),
-                } for k, v in active_positions.items()},
+                "active_count": len(active_out),
+                "positions": active_out,
             },
             "performance": {
                 "total_cycles": _effective_total_cycles(),
@@ -6253,10 +7834,10 @@ async def get_user_summary():
                 "worst_cycle": round(perf.get("worst_day_pnl", 0), 2),
             },
             "risk": risk_manager.to_dict() if risk_manager else {},
-            "recent_activity": log[-20:] if log else [],
+            "recent_activity": _render_log(_tail(log, 20)) if log else [],
             "updated_at": datetime.now().isoformat(),
         },
-    }
+    })
 
 
 from fastapi import Request
@@ -6280,4 +7861,5 @@ if __name__ == "__main__":
     port = int(os.getenv("PORT", 8001))
     # debug desligado automaticamente em produção (Railway)
     _debug = settings.DEBUG and not os.getenv("RAILWAY_ENVIRONMENT")
-    uvicorn.run(app, host="0.0.0.0", port=port, debug=_debug)
+    uvicorn.run(app, host="0.0.0.0", port=port, debug=_debug,
+                loop="uvloop" if UVLOOP_AVAILABLE else "asyncio")
@@ -33,6 +33,9 @@ Configure via variáveis de ambiente:
 """
 
 import asyncio
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 
@@ -42,6 +45,28 @@ try:
 except ImportError:
     HTTPX_AVAILABLE = False
 
+# HTTP/2 no httpx depende do pacote h2 — sem ele o cliente fica em HTTP/1.1 keep-alive
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = HTTPX_AVAILABLE
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# orjson/NumPy opcionais: parse do payload do Yahoo e filtro dos candles nulos
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
 from app.core.config import settings
 
 # Import brokers (safe — não falha se dependências estiverem OK)
@@ -109,6 +134,56 @@ _YF_RANGE = {
     "1h": "1mo", "1d": "6mo",
 }
 
+
+def _loads(r) -> Any:
+    """Corpo JSON da resposta — orjson direto dos bytes quando disponível."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(r.content)
+    return r.json()
+
+
+def _yf_series(values: list, n: int, idx) -> List[float]:
+    """Série OHLCV alinhada aos candles válidos (None/ausente → 0.0)."""
+    if len(values) != n:
+        return [float(values[i]) if i < len(values) and values[i] is not None else 0.0 for i in idx]
+    arr = np.array(values, dtype=np.float64)[idx]
+    return np.nan_to_num(arr, nan=0.0).tolist()
+
+
+def _yf_candles(q: dict, ts_raw: list, limit: int) -> Optional[Dict[str, list]]:
+    """
+    Últimos `limit` candles com close válido. Com NumPy: None → nan no array,
+    flatnonzero no filtro e fancy indexing nas séries (loops em C).
+    """
+    closes = q.get("close",  []) or []
+    vols   = q.get("volume", []) or []
+    highs  = q.get("high",   []) or []
+    lows   = q.get("low",    []) or []
+    if NUMPY_AVAILABLE:
+        n          = len(closes)
+        closes_arr = np.array(closes, dtype=np.float64)
+        idx        = np.flatnonzero(~np.isnan(closes_arr))[-limit:]
+        if not len(idx):
+            return None
+        return {
+            "prices":  closes_arr[idx].tolist(),
+            "volumes": _yf_series(vols,  n, idx),
+            "highs":   _yf_series(highs, n, idx),
+            "lows":    _yf_series(lows,  n, idx),
+            "timestamps": [ts_raw[i] if i < len(ts_raw) else 0 for i in idx.tolist()],
+        }
+    valid = [i for i in range(len(closes)) if closes[i] is not None][-limit:]
+    if not valid:
+        return None
+    return {
+        "prices":  [float(closes[i]) for i in valid],
+        "volumes": [float(vols[i])   if vols  and vols[i]  is not None else 0.0 for i in valid],
+        "highs":   [float(highs[i])  if highs and highs[i] is not None else 0.0 for i in valid],
+        "lows":    [float(lows[i])   if lows  and lows[i]  is not None else 0.0 for i in valid],
+        "timestamps": [ts_raw[i] if i < len(ts_raw) else 0 for i in valid],
+    }
+
+
 _CRYPTO_SYMBOLS = {
     "BTC","ETH","BNB","SOL","ADA","XRP","DOGE",
     "DOT","AVAX","MATIC","LINK","LTC","UNI","ATOM","TRX",
@@ -163,6 +238,14 @@ class BrapiMarketData:
             raise ImportError("httpx nao instalado. Execute: pip install httpx")
         self.timeout = getattr(settings, "MARKET_API_TIMEOUT", 8)
         self._semaphore = asyncio.Semaphore(30)  # max 30 concurrent requests
+        self._yf_semaphore = asyncio.Semaphore(8)  # Yahoo limita rajadas: no máx. 8 em voo
+        # Cliente HTTP compartilhado (pool keep-alive) injetado pelo app via use_client();
+        # sem ele o serviço cria o próprio (lazy) e o reaproveita em todas as chamadas
+        self._client: Optional[Any] = None
+        self._own_client: Optional[Any] = None
+        # Cache LRU de candles por (ativo, intervalo, limit) → (instante, resultado):
+        # ciclos e /trade/cycle seguidos repetem a mesma consulta em segundos
+        self._klines_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
         self.token   = getattr(settings, "BRAPI_TOKEN", "").strip()
         # Populate US stock set from settings
         global _US_STOCK_SYMBOLS
@@ -226,6 +309,61 @@ class BrapiMarketData:
         print(f"[market]   Mode:        {trading_mode}", flush=True)
         print(f"[market] Assets: B3={len(getattr(settings, 'ALLOWED_ASSETS', []))} | US={len(_US_STOCK_SYMBOLS)} | Crypto={len(_CRYPTO_SYMBOLS)} | Forex={len(_FOREX_SYMBOLS)} | Commodities={len(_COMMODITY_YF_MAP)}", flush=True)
 
+    # ── cliente HTTP ──────────────────────────────────────────────────────────
+
+    def use_client(self, client: Optional[Any]) -> None:
+        """Reaproveita um httpx.AsyncClient de vida longa (o dono fecha no shutdown)."""
+        self._client = client
+
+    async def _get_client(self):
+        """Cliente injetado se houver; senão o próprio, criado no 1º uso e mantido aberto."""
+        if self._client is not None and not self._client.is_closed:
+            return self._client
+        if self._own_client is None or self._own_client.is_closed:
+            self._own_client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_keepalive_connections=32, max_connections=64, keepalive_expiry=60),
+            )
+        return self._own_client
+
+    @asynccontextmanager
+    async def _pooled_client(self):
+        """Atalho de bloco para _get_client() — o cliente não é fechado ao sair."""
+        yield await self._get_client()
+
+    async def aclose(self) -> None:
+        """Fecha o cliente próprio (o injetado via use_client é fechado pelo dono)."""
+        if self._own_client is not None:
+            await self._own_client.aclose()
+            self._own_client = None
+
+    # ── cache de candles ──────────────────────────────────────────────────────
+
+    _KLINES_CACHE_CAP = 512
+
+    @staticmethod
+    def _klines_ttl(interval: str) -> float:
+        if interval == "1d":
+            return getattr(settings, "MARKET_CACHE_TTL_DAILY", 600)
+        return getattr(settings, "MARKET_CACHE_TTL", 30)
+
+    def _klines_cached(self, key: tuple) -> Optional[Dict]:
+        hit = self._klines_cache.get(key)
+        if hit is None:
+            return None
+        if time.monotonic() - hit[0] >= self._klines_ttl(key[1]):
+            del self._klines_cache[key]
+            return None
+        self._klines_cache.move_to_end(key)
+        return hit[1]
+
+    def _klines_store(self, key: tuple, result: Dict) -> None:
+        self._klines_cache[key] = (time.monotonic(), result)
+        self._klines_cache.move_to_end(key)
+        while len(self._klines_cache) > self._KLINES_CACHE_CAP:
+            self._klines_cache.popitem(last=False)
+
     # ── helpers de símbolo ────────────────────────────────────────────────────
 
     def _is_crypto(self, asset: str) -> bool:
@@ -449,13 +587,14 @@ class BrapiMarketData:
 
     async def _yf_get_price(self, client: httpx.AsyncClient, asset: str) -> Optional[float]:
         try:
-            r = await client.get(
-                f"{_YF_BASE}/{self._yf_symbol(asset)}",
-                params={"interval": "1m", "range": "1d"},
-                headers=_YF_HEADERS,
-            )
+            async with self._yf_semaphore:
+                r = await client.get(
+                    f"{_YF_BASE}/{self._yf_symbol(asset)}",
+                    params={"interval": "1m", "range": "1d"},
+                    headers=_YF_HEADERS,
+                )
             if r.status_code == 200:
-                price = r.json()["chart"]["result"][0]["meta"].get("regularMarketPrice")
+                price = _loads(r)["chart"]["result"][0]["meta"].get("regularMarketPrice")
                 return float(price) if price is not None else None
         except Exception as e:
             print(f"[yahoo] Erro preco {asset}: {e}", flush=True)
@@ -465,34 +604,27 @@ class BrapiMarketData:
         ticker   = asset.upper()
         yf_range = _YF_RANGE.get(interval, "5d")
         try:
-            r = await client.get(
-                f"{_YF_BASE}/{self._yf_symbol(ticker)}",
-                params={"interval": interval, "range": yf_range},
-                headers=_YF_HEADERS,
-            )
+            async with self._yf_semaphore:
+                r = await client.get(
+                    f"{_YF_BASE}/{self._yf_symbol(ticker)}",
+                    params={"interval": interval, "range": yf_range},
+                    headers=_YF_HEADERS,
+                )
             if r.status_code != 200:
                 return None
-            chart_result = r.json()["chart"]["result"]
+            chart_result = _loads(r)["chart"]["result"]
             if not chart_result:
                 return None
-            res    = chart_result[0]
-            ts_raw = res.get("timestamp", [])
-            q      = res.get("indicators", {}).get("quote", [{}])[0]
-            closes = q.get("close",  [])
-            vols   = q.get("volume", [])
-            highs  = q.get("high",   [])
-            lows   = q.get("low",    [])
-            valid  = [i for i in range(len(closes)) if closes[i] is not None][-limit:]
-            if not valid:
+            res     = chart_result[0]
+            ts_raw  = res.get("timestamp", []) or []
+            q       = res.get("indicators", {}).get("quote", [{}])[0]
+            candles = _yf_candles(q, ts_raw, limit)
+            if candles is None:
                 return None
             return {
                 "asset": ticker, "symbol": ticker, "interval": interval,
-                "prices":  [float(closes[i]) for i in valid],
-                "volumes": [float(vols[i])   if vols  and vols[i]  is not None else 0.0 for i in valid],
-                "highs":   [float(highs[i])  if highs and highs[i] is not None else 0.0 for i in valid],
-                "lows":    [float(lows[i])   if lows  and lows[i]  is not None else 0.0 for i in valid],
-                "timestamps": [ts_raw[i] if i < len(ts_raw) else 0 for i in valid],
-                "count": len(valid), "source": "yahoo",
+                **candles,
+                "count": len(candles["prices"]), "source": "yahoo",
             }
         except Exception as e:
             print(f"[yahoo] Erro klines {ticker}: {e}", flush=True)
@@ -510,7 +642,7 @@ class BrapiMarketData:
           Commodities: Alpha Vantage → Yahoo
         """
         ticker = asset.upper()
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
+        async with self._pooled_client() as client:
             price = None
             source = None
 
@@ -602,7 +734,7 @@ class BrapiMarketData:
         forex_assets  = [a for a in assets if self._is_forex(a)]
         commodity_assets = [a for a in assets if self._is_commodity(a)]
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
+        async with self._pooled_client() as client:
 
             # ── Crypto: Binance Public batch (1 request, real-time) ────────
             if crypto_assets:
@@ -732,42 +864,41 @@ class BrapiMarketData:
         ticker = asset.upper()
         if interval not in self.VALID_INTERVALS:
             interval = "5m"
+        key = (ticker, interval, limit)
+        cached = self._klines_cached(key)
+        if cached is not None:
+            return cached
         async with self._semaphore:
-            if _client is not None:
-                client = _client
-            else:
-                client = httpx.AsyncClient(timeout=self.timeout)
-            try:
-                result = None
+            client = _client if _client is not None else await self._get_client()
+            result = None
 
-                if self._is_crypto(ticker):
-                    result = await self._binance_get_klines(client, ticker, interval, limit)
+            if self._is_crypto(ticker):
+                result = await self._binance_get_klines(client, ticker, interval, limit)
 
-                elif self._is_b3(ticker):
-                    # BTG → BRAPI → Yahoo
-                    if self.btg_broker and self.btg_broker.is_configured:
-                        result = await self.btg_broker.get_candles(ticker, interval, limit)
-                    if result is None and self._brapi_supported(ticker):
-                        result = await self._brapi_get_klines(client, ticker, interval, limit)
+            elif self._is_b3(ticker):
+                # BTG → BRAPI → Yahoo
+                if self.btg_broker and self.btg_broker.is_configured:
+                    result = await self.btg_broker.get_candles(ticker, interval, limit)
+                if result is None and self._brapi_supported(ticker):
+                    result = await self._brapi_get_klines(client, ticker, interval, limit)
 
-                elif self._is_us_stock(ticker) or self._is_commodity(ticker):
-                    # Alpha Vantage → Yahoo
-                    if self.alpha_vantage and self.alpha_vantage.is_configured:
-                        result = await self.alpha_vantage.get_candles(ticker, interval, limit)
+            elif self._is_us_stock(ticker) or self._is_commodity(ticker):
+                # Alpha Vantage → Yahoo
+                if self.alpha_vantage and self.alpha_vantage.is_configured:
+                    result = await self.alpha_vantage.get_candles(ticker, interval, limit)
 
-                elif self._is_forex(ticker):
-                    # Alpha Vantage → Yahoo
-                    if self.alpha_vantage and self.alpha_vantage.is_configured:
-                        result = await self.alpha_vantage.get_forex_candles(ticker, interval, limit)
+            elif self._is_forex(ticker):
+                # Alpha Vantage → Yahoo
+                if self.alpha_vantage and self.alpha_vantage.is_configured:
+                    result = await self.alpha_vantage.get_forex_candles(ticker, interval, limit)
 
-                # Fallback universal: Yahoo Finance
-                if result is None:
-                    result = await self._yf_get_klines(client, ticker, interval, limit)
+            # Fallback universal: Yahoo Finance
+            if result is None:
+                result = await self._yf_get_klines(client, ticker, interval, limit)
 
-                return result
-            finally:
-                if _client is None:
-                    await client.aclose()
+            if result:
+                self._klines_store(key, result)
+            return result
 
     async def get_all_klines(
         self,
@@ -777,35 +908,55 @@ class BrapiMarketData:
         timeout: float = 45.0,
     ) -> Dict[str, Dict]:
         """Klines de multiplos ativos. Usa asyncio.wait para coletar resultados parciais.
-        Compartilha um unico httpx.AsyncClient para reduzir overhead de conexao."""
+        Todas as tasks usam o cliente do pool (conexoes keep-alive entre chamadas)."""
         if assets is None:
             assets = settings.ALLOWED_ASSETS
+        cache_interval = interval if interval in self.VALID_INTERVALS else "5m"
+
+        # Ativos com candles no cache não geram task nem request
+        results: Dict[str, Any] = {}
+        to_fetch: List[str] = []
+        for a in assets:
+            cached = self._klines_cached((a.upper(), cache_interval, limit))
+            if cached is not None:
+                results[a] = cached
+            else:
+                to_fetch.append(a)
 
-        async with httpx.AsyncClient(timeout=self.timeout) as shared_client:
+        async with self._pooled_client() as shared_client:
             task_map = {
                 asyncio.create_task(self.get_klines(a, interval, limit, _client=shared_client)): a
-                for a in assets
+                for a in to_fetch
             }
 
-            done, pending = await asyncio.wait(task_map.keys(), timeout=timeout)
+            if task_map:
+                done, pending = await asyncio.wait(task_map.keys(), timeout=timeout)
+            else:
+                done, pending = set(), set()
 
             # Cancel tasks still running after timeout
             for t in pending:
                 t.cancel()
+            ok = len(done) + len(results)
             if pending:
-                print(f"[market] get_all_klines: {len(done)}/{len(assets)} OK, {len(pending)} timeout ({timeout}s, {interval})", flush=True)
+                print(f"[market] get_all_klines: {ok}/{len(assets)} OK ({len(results)} cache), {len(pending)} timeout ({timeout}s, {interval})", flush=True)
             else:
-                print(f"[market] get_all_klines: {len(done)}/{len(assets)} OK ({interval})", flush=True)
+                print(f"[market] get_all_klines: {ok}/{len(assets)} OK ({len(results)} cache, {interval})", flush=True)
 
-        market_data: Dict[str, Dict] = {}
         for t in done:
-            asset = task_map[t]
             try:
-                klines = t.result()
+                results[task_map[t]] = t.result()
+            except Exception:
+                pass
+
+        market_data: Dict[str, Dict] = {}
+        for asset, klines in results.items():
+            try:
                 if isinstance(klines, dict) and klines and klines.get("count", 0) > 0:
                     market_data[asset.upper()] = {
                         "prices":  klines["prices"],
                         "volumes": klines["volumes"],
+                        "timestamps": klines.get("timestamps", []),
                     }
             except Exception:
                 pass
@@ -814,7 +965,7 @@ class BrapiMarketData:
     async def get_24h_ticker(self, asset: str) -> Optional[Dict]:
         """Estatísticas de 24h. Binance (crypto) | BTG/BRAPI (B3) | Yahoo (US/fallback)."""
         ticker = asset.upper()
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
+        async with self._pooled_client() as client:
             # Binance: ticker 24h em tempo real para crypto
             if self._is_crypto(ticker):
                 try:
@@ -1098,7 +1249,7 @@ class BrapiMarketData:
 
         # Yahoo fallback
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
+            async with self._pooled_client() as client:
                 p = await self._yf_get_price(client, "USDBRL")
                 if p:
                     return p
@@ -285,7 +285,8 @@ async def run_real_backtest(
             p, v = _fake(base, limit)
             engine.data[sym] = {"prices": p, "volumes": v}
 
-    report = engine.run_backtest(rebalance_interval=rebalance_interval)
+    # Simulação é CPU pura — roda numa thread para não travar o event loop do FastAPI
+    report = await asyncio.to_thread(engine.run_backtest, rebalance_interval=rebalance_interval)
     report["data_source"] = "yahoo.finance" if fetched else "synthetic"
     report["assets"]      = assets
     report["interval"]    = interval
@@ -16,6 +16,7 @@ from app.engines import MomentumAnalyzer, RiskAnalyzer, PortfolioManager
 from app.engines.market_scanner import MarketScanner
 from app.engines.regime import RegimeDetector
 from app.core.config import settings
+from app import db_state
 
 DATA_DIR        = Path(__file__).parent / "data"
 STATE_FILE      = DATA_DIR / "trade_state.json"
@@ -103,7 +104,6 @@ async def run_cycle():
         "last_cycle": None,
     })
     perf_state = _load(PERF_FILE, {
-        "cycles": [],
         "total_pnl_history": [],
         "win_count": 0,
         "loss_count": 0,
@@ -241,14 +241,15 @@ async def run_cycle():
             cycle_pnl -= (cur_amount - rec_amount)
             sells += 1
 
-    # Salvar estado
+    # Salvar estado (horário BRT, como o app)
+    now_brt = datetime.now(db_state.BRT)
     trade_state["positions"]  = new_positions
-    trade_state["last_cycle"] = datetime.now().isoformat()
+    trade_state["last_cycle"] = now_brt.isoformat()
     trade_state["total_pnl"]  = round(trade_state.get("total_pnl", 0.0) + cycle_pnl, 4)
 
     # Log de evento
     event = {
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": now_brt.isoformat(),
         "type": "CICLO",
         "asset": "—",
         "amount": round(capital, 2),
@@ -257,19 +258,25 @@ async def run_cycle():
                  f"Regime: {_regime_result['regime']} | "
                  f"BUY:{buys} SELL:{sells}"),
     }
-    trade_state.setdefault("log", []).insert(0, event)
-    trade_state["log"] = trade_state["log"][:200]
-
-    # Performance
-    perf_state.setdefault("cycles", []).append({
-        "timestamp": datetime.now().isoformat(),
-        "pnl":     round(cycle_pnl, 4),
-        "capital": round(capital, 2),
-        "irq":     round(irq_score, 4),
-    })
-    perf_state["cycles"]             = perf_state["cycles"][-500:]
-    perf_state.setdefault("total_pnl_history", []).append(round(capital, 2))
-    perf_state["total_pnl_history"]  = perf_state["total_pnl_history"][-500:]
+    log = db_state.trade_log_buffer(trade_state.get("log"))
+    log.appendleft(event)
+    trade_state["log"] = list(log)
+
+    # Performance — ciclos vão para o log append-only (o mesmo que o app lê);
+    # performance.json guarda só os agregados. Ciclos embutidos de versões
+    # antigas migram para o log se ele ainda estiver vazio (como no app).
+    legacy = perf_state.pop("cycles", None)
+    if legacy and not db_state.load_cycles(1):
+        db_state.append_cycles(legacy)
+    db_state.append_cycle(db_state.new_cycle(
+        now_brt,
+        pnl=round(cycle_pnl, 4),
+        capital=round(capital, 2),
+        irq=round(irq_score, 4),
+    ))
+    equity = db_state.equity_buffer(perf_state.get("total_pnl_history"), max(1, settings.MAX_IN_MEMORY_CYCLES))
+    equity.append(round(capital, 2))
+    perf_state["total_pnl_history"] = list(equity)
 
     if cycle_pnl > 0:
         perf_state["win_count"] = perf_state.get("win_count", 0) + 1
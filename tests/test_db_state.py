@@ -0,0 +1,83 @@
+"""
+Persistência do db_state: log append-only de ciclos (cycles.jsonl), buffers
+limitados (deque) e gravação atômica do estado em JSON.
+"""
+
+from collections import deque
+from datetime import datetime
+
+import pytest
+
+from app import db_state
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """STATE_DIR isolado e sem PostgreSQL: só o backup JSON local."""
+    monkeypatch.setattr(db_state, "_DATA_DIR", tmp_path)
+    monkeypatch.setattr(db_state, "_USE_PG", False)
+    return tmp_path
+
+
+def test_new_cycle_has_day_and_epoch():
+    now = datetime(2026, 3, 10, 0, 0, 1, tzinfo=db_state.BRT)
+    c = db_state.new_cycle(now, pnl=1.5)
+    assert c["timestamp"] == now.isoformat()
+    assert c["day"] == now.toordinal()
+    assert c["ts"] == int(now.timestamp())
+    assert c["pnl"] == 1.5
+
+
+def test_cycles_log_round_trip(data_dir):
+    cycles = [{"timestamp": f"2026-03-10T10:0{i}:00-03:00", "pnl": float(i)} for i in range(5)]
+    db_state.append_cycles(cycles[:3])
+    for c in cycles[3:]:
+        db_state.append_cycle(c)
+    assert db_state.load_cycles(100) == cycles
+    assert db_state.load_cycles(2) == cycles[-2:]
+
+
+def test_compact_cycles_keeps_tail(data_dir):
+    cycles = [{"pnl": float(i)} for i in range(10)]
+    db_state.append_cycles(cycles)
+    db_state.compact_cycles(keep=4)
+    assert db_state.load_cycles(100) == cycles[-4:]
+    assert [p.name for p in data_dir.iterdir()] == ["cycles.jsonl"]
+
+
+def test_reset_cycles_rewrites_log(data_dir):
+    db_state.append_cycles([{"pnl": 1.0}, {"pnl": 2.0}])
+    db_state.reset_cycles([{"pnl": 3.0}])
+    assert db_state.load_cycles(100) == [{"pnl": 3.0}]
+
+
+def test_buffers_are_bounded():
+    log = db_state.trade_log_buffer([{"i": i} for i in range(db_state.TRADE_LOG_MAX + 50)])
+    assert len(log) == db_state.TRADE_LOG_MAX
+    assert log[0] == {"i": 0}  # mais recente à esquerda
+    log.appendleft({"i": -1})
+    assert len(log) == db_state.TRADE_LOG_MAX and log[0] == {"i": -1}
+
+    equity = db_state.equity_buffer(list(range(10)), keep=4)
+    assert list(equity) == [6, 7, 8, 9]
+    equity.append(10)
+    assert list(equity) == [7, 8, 9, 10]
+
+
+def test_deque_state_round_trip(data_dir):
+    state = {
+        "log": db_state.trade_log_buffer([{"type": "BUY", "amount": 1.0}]),
+        "total_pnl_history": db_state.equity_buffer([{"pnl": 0.5}], keep=500),
+    }
+    db_state.save_state("trade_state", state)
+    loaded = db_state.load_state("trade_state", {})
+    assert loaded == {"log": [{"type": "BUY", "amount": 1.0}], "total_pnl_history": [{"pnl": 0.5}]}
+    # Recarregado como lista, volta a ser buffer limitado sem perder itens
+    assert list(db_state.trade_log_buffer(loaded["log"])) == list(state["log"])
+
+
+def test_save_state_text_leaves_no_tmp(data_dir):
+    db_state.save_state_text("performance", '{"a":1}')
+    db_state.save_state_text("performance", '{"a":2}')
+    assert db_state.loads((data_dir / "performance.json").read_text()) == {"a": 2}
+    assert [p.name for p in data_dir.iterdir()] == ["performance.json"]
@@ -0,0 +1,103 @@
+"""
+Indicadores incrementais contra o recálculo completo: ATR de Wilder por candle
+(timestamp) e o resumo RSI/MACD/Bollinger em lote de /market/indicators-all.
+"""
+
+import random
+import string
+
+import pytest
+
+main = pytest.importorskip("app.main")
+
+
+def _walk(n: int, seed: int, start: float = 100.0) -> list:
+    rnd = random.Random(seed)
+    prices, p = [], start
+    for _ in range(n):
+        p = max(1.0, p * (1 + rnd.uniform(-0.02, 0.02)))
+        prices.append(round(p, 4))
+    return prices
+
+
+@pytest.fixture
+def atr_state(monkeypatch):
+    monkeypatch.setattr(main, "_atr_state", {})
+    return main._atr_state
+
+
+def test_incremental_atr_matches_full_recompute(atr_state):
+    prices = _walk(120, seed=1)
+    stamps = [1_700_000_000 + 300 * i for i in range(len(prices))]
+    start = main.settings.ATR_PERIOD + 1
+    for n in range(start, len(prices) + 1):
+        inc = main._calculate_atr_incremental(prices[:n], ("PETR4", "5m"), stamps[:n])
+        assert inc == pytest.approx(main._calculate_atr(prices[:n]), rel=1e-9)
+
+
+def test_incremental_atr_same_candle_and_repeated_price(atr_state):
+    prices = _walk(40, seed=2)
+    stamps = list(range(len(prices)))
+    key = ("VALE3", "5m")
+    first = main._calculate_atr_incremental(prices, key, stamps)
+    assert main._calculate_atr_incremental(prices, key, stamps) == first
+    # Candle novo com o mesmo close do anterior: é outro candle, não o mesmo
+    grown, grown_ts = prices + [prices[-1]], stamps + [stamps[-1] + 1]
+    inc = main._calculate_atr_incremental(grown, key, grown_ts)
+    assert inc == pytest.approx(main._calculate_atr(grown), rel=1e-9)
+    assert inc != first
+
+
+def test_incremental_atr_without_stamps_recomputes(atr_state):
+    prices = _walk(40, seed=3)
+    key = ("ITUB4", "1h")
+    assert main._calculate_atr_incremental(prices, key) == pytest.approx(main._calculate_atr(prices))
+    assert key not in atr_state
+
+
+@pytest.mark.parametrize("n", [30, 60, 100])
+def test_indicator_summaries_match_single_asset_calcs(n):
+    series = {f"A{i}": _walk(n, seed=10 + i) for i in range(4)}
+    out = main._indicator_summaries(series)
+    for a, p in series.items():
+        rsi, macd, boll = out[a]
+        assert rsi == pytest.approx(main._rsi_calc(p), abs=0.02)
+        full = main._calc_macd(p)
+        if full and abs(full["histogram"]) > 1e-6:
+            assert macd["trend"] == full["trend"]
+            assert macd["crossover"] == full["crossover"]
+        ref = main._calc_bollinger(p)
+        assert boll["upper"] == pytest.approx(ref["upper"], abs=1e-3)
+        assert boll["lower"] == pytest.approx(ref["lower"], abs=1e-3)
+        assert boll["position"] == pytest.approx(ref["position"], abs=0.11)
+
+
+def test_indicator_summaries_are_deterministic():
+    series = {"PETR4": _walk(100, seed=20), "VALE3": _walk(100, seed=21)}
+    first = main._indicator_summaries(series)
+    assert main._indicator_summaries(series) == first
+    # Sem estado entre chamadas: outro ativo no lote não muda o resultado
+    alone = main._indicator_summaries({"PETR4": series["PETR4"]})
+    assert alone["PETR4"] == first["PETR4"]
+
+
+def test_flat_series_keeps_integer_bollinger_position():
+    _, _, boll = main._indicator_summaries({"FLAT": [10.0] * 40})["FLAT"]
+    assert boll["position"] == 50 and isinstance(boll["position"], int)
+
+
+def _sample_args(template: str) -> list:
+    args = []
+    for _, field, spec, _ in string.Formatter().parse(template):
+        if field is not None:
+            args.append(1.0 if spec and spec[-1] in "fdeg%" else "X")
+    return args
+
+
+@pytest.mark.parametrize("tpl", list(main.LogTpl))
+def test_every_log_template_formats(tpl, monkeypatch):
+    monkeypatch.setattr(main, "_log_tpl_errors", set())
+    entry = {"timestamp": "t", "type": "INFO", "tpl": int(tpl), "args": _sample_args(main._LOG_TEMPLATES[tpl])}
+    out = main._render_log_entry(entry)
+    assert out["note"] and not main._log_tpl_errors
+    assert "tpl" not in out and "args" not in out
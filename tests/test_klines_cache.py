@@ -0,0 +1,68 @@
+"""
+Cache LRU com TTL dos candles no BrapiMarketData (_klines_cached/_klines_store).
+"""
+
+from collections import OrderedDict
+
+import pytest
+
+pytest.importorskip("httpx")
+market_data = pytest.importorskip("app.market_data")
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = _Clock()
+    monkeypatch.setattr(market_data, "time", c)
+    monkeypatch.setattr(market_data.settings, "MARKET_CACHE_TTL", 30)
+    monkeypatch.setattr(market_data.settings, "MARKET_CACHE_TTL_DAILY", 600)
+    return c
+
+
+@pytest.fixture
+def svc(clock):
+    s = market_data.BrapiMarketData()
+    s._klines_cache = OrderedDict()
+    return s
+
+
+def test_hit_within_ttl(svc, clock):
+    key = ("PETR4", "5m", 100)
+    svc._klines_store(key, {"prices": [1.0, 2.0]})
+    clock.now += 29
+    assert svc._klines_cached(key) == {"prices": [1.0, 2.0]}
+
+
+def test_expires_after_ttl(svc, clock):
+    key = ("PETR4", "5m", 100)
+    svc._klines_store(key, {"prices": [1.0]})
+    clock.now += 30
+    assert svc._klines_cached(key) is None
+    assert key not in svc._klines_cache
+
+
+def test_daily_interval_uses_daily_ttl(svc, clock):
+    key = ("VALE3", "1d", 100)
+    svc._klines_store(key, {"prices": [1.0]})
+    clock.now += 300
+    assert svc._klines_cached(key) is not None
+    clock.now += 300
+    assert svc._klines_cached(key) is None
+
+
+def test_lru_cap_evicts_least_recently_used(svc, monkeypatch):
+    monkeypatch.setattr(svc, "_KLINES_CACHE_CAP", 2)
+    a, b, c = (("A", "5m", 100), ("B", "5m", 100), ("C", "5m", 100))
+    svc._klines_store(a, {"a": 1})
+    svc._klines_store(b, {"b": 1})
+    assert svc._klines_cached(a) == {"a": 1}  # "a" vira o mais recente
+    svc._klines_store(c, {"c": 1})
+    assert list(svc._klines_cache) == [a, c]
@@ -0,0 +1,41 @@
+"""
+Smoke test: o app importa como usuário sem home e sem escrita no código (como o
+appuser do Dockerfile) — os kernels numba com cache=True precisam de um
+NUMBA_CACHE_DIR gravável, senão o import falha com "no locator available".
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("numba")
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _demote_to_nobody():
+    import pwd
+    nobody = pwd.getpwnam("nobody")
+    os.setgid(nobody.pw_gid)
+    os.setuid(nobody.pw_uid)
+
+
+def test_app_imports_as_non_root(tmp_path):
+    env = {k: v for k, v in os.environ.items() if k not in ("HOME", "NUMBA_CACHE_DIR")}
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    env["STATE_DIR"] = str(tmp_path)
+    preexec = None
+    if os.geteuid() == 0:
+        pytest.importorskip("pwd")
+        preexec = _demote_to_nobody
+        tmp_path.chmod(0o777)
+    proc = subprocess.run(
+        [sys.executable, "-c", "import app.main"],
+        cwd=ROOT, env=env, preexec_fn=preexec,
+        capture_output=True, text=True, timeout=300,
+    )
+    assert proc.returncode == 0, proc.stderr[-2000:]
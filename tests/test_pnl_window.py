@@ -0,0 +1,53 @@
+"""
+Regressão do P&L diário/semanal incremental (_pnl_window) na virada do dia.
+"""
+
+from collections import deque
+from datetime import datetime
+
+import pytest
+
+main = pytest.importorskip("app.main")
+
+
+def _cycle(ts: datetime, pnl: float) -> dict:
+    return {"timestamp": ts.isoformat(), "day": ts.toordinal(), "pnl": pnl}
+
+
+@pytest.fixture
+def perf(monkeypatch):
+    """Histórico de ciclos e janela vazios, isolados do estado carregado pelo app."""
+    monkeypatch.setitem(main._perf_state, "cycles", [])
+    monkeypatch.setattr(main, "_pnl_window", {
+        "day": 0, "week_ago": 0, "today_pnl": 0.0, "week_pnl": 0.0,
+        "week": deque(), "last_ts": None,
+    })
+    return main._perf_state["cycles"]
+
+
+def _record(cycles: list, cycle: dict):
+    cycles.append(cycle)
+    main._pnl_window_add(cycle)
+
+
+def test_cycle_recorded_after_midnight_counts_for_new_day(perf):
+    _record(perf, _cycle(datetime(2026, 3, 9, 23, 50), 10.0))
+    assert main._today_week_pnl(datetime(2026, 3, 9, 23, 59, 59)) == (10.0, 10.0)
+
+    # Ciclo iniciado às 23:59:59 e registrado às 00:00:01, antes de qualquer read do novo dia
+    _record(perf, _cycle(datetime(2026, 3, 10, 0, 0, 1), 5.0))
+    assert main._today_week_pnl(datetime(2026, 3, 10, 0, 0, 2)) == (5.0, 15.0)
+
+
+def test_same_day_cycles_accumulate(perf):
+    _record(perf, _cycle(datetime(2026, 3, 10, 10, 0), 2.0))
+    assert main._today_week_pnl(datetime(2026, 3, 10, 10, 1)) == (2.0, 2.0)
+    _record(perf, _cycle(datetime(2026, 3, 10, 10, 5), -0.5))
+    assert main._today_week_pnl(datetime(2026, 3, 10, 10, 6)) == (1.5, 1.5)
+
+
+def test_old_days_leave_the_week_window(perf):
+    _record(perf, _cycle(datetime(2026, 3, 1, 12, 0), 4.0))
+    assert main._today_week_pnl(datetime(2026, 3, 1, 12, 1)) == (4.0, 4.0)
+    _record(perf, _cycle(datetime(2026, 3, 10, 12, 0), 1.0))
+    assert main._today_week_pnl(datetime(2026, 3, 10, 12, 1)) == (1.0, 1.0)
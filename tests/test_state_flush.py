@@ -0,0 +1,95 @@
+"""
+Persistência adiada do estado (_mark_state_dirty + _state_flusher): rajadas
+viram uma escrita e o cancelamento no shutdown grava o que estiver pendente.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+main = pytest.importorskip("app.main")
+
+
+@pytest.fixture
+def writes(monkeypatch):
+    """Snapshot de uma chave "k" com valor mutável e as gravações capturadas."""
+    state = {"v": 0}
+    out = []
+    monkeypatch.setattr(main, "_STATE_SNAPSHOTS", {"k": lambda: dict(state)})
+    monkeypatch.setattr(main, "_dirty_state_keys", set())
+    monkeypatch.setattr(main, "_STATE_FLUSH_DELAY", 0.01)
+    monkeypatch.setattr(main.db_state, "save_state_text", lambda key, text: out.append((key, text)))
+    monkeypatch.setattr(main, "_state_dirty", None)
+    return state, out
+
+
+def _bump(state: dict):
+    state["v"] += 1
+    main._mark_state_dirty("k")
+
+
+def test_without_flusher_writes_immediately(writes):
+    state, out = writes
+    _bump(state)
+    assert [main.db_state.loads(t) for _, t in out] == [{"v": 1}]
+
+
+def test_burst_is_coalesced_into_one_write(writes, monkeypatch):
+    state, out = writes
+
+    async def run():
+        monkeypatch.setattr(main, "_state_dirty", asyncio.Event())
+        task = asyncio.create_task(main._state_flusher())
+        for _ in range(5):
+            _bump(state)
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert [main.db_state.loads(t) for _, t in out] == [{"v": 5}]
+
+
+def test_cancel_flushes_pending_keys(writes, monkeypatch):
+    state, out = writes
+
+    async def run():
+        monkeypatch.setattr(main, "_state_dirty", asyncio.Event())
+        task = asyncio.create_task(main._state_flusher())
+        await asyncio.sleep(0)
+        _bump(state)
+        task.cancel()  # ainda dentro da janela de coalescência
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert [main.db_state.loads(t) for _, t in out] == [{"v": 1}]
+
+
+def test_cancel_during_write_keeps_newest_snapshot_last(writes, monkeypatch):
+    state, out = writes
+    started = []
+
+    def slow_write(snapshots):
+        started.append(True)
+        time.sleep(0.05)
+        for key, text in snapshots:
+            out.append((key, text))
+
+    monkeypatch.setattr(main, "_write_state_snapshots", slow_write)
+
+    async def run():
+        monkeypatch.setattr(main, "_state_dirty", asyncio.Event())
+        task = asyncio.create_task(main._state_flusher())
+        _bump(state)
+        while not started:
+            await asyncio.sleep(0.005)
+        _bump(state)
+        task.cancel()  # cancela com a escrita do 1º snapshot em voo na thread
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert [main.db_state.loads(t) for _, t in out] == [{"v": 1}, {"v": 2}]